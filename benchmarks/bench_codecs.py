@@ -0,0 +1,47 @@
+"""
+Compares the JSON codecs on API payloads.
+
+Usage: python benchmarks/bench_codecs.py [recorded-response.json or cassette directory ...]
+
+Without arguments, synthetic payloads shaped like list_virtual_machines and list_images responses are used.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payloads import load_payloads  # noqa: E402
+
+from hyperstack.codecs import CODECS, get_codec  # noqa: E402
+
+
+def bench(fn, repeat=5):
+    number, _ = timeit.Timer(fn).autorange()
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main(paths):
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name}: not installed, skipping")
+
+    print(f"{'payload':<32} {'size':>9} {'codec':<8} {'loads':>10} {'dumps':>10} {'MB/s':>8}")
+    for name, body in load_payloads(paths).items():
+        obj = get_codec("json").loads(body)
+        for codec in codecs:
+            loads = bench(lambda codec=codec, body=body: codec.loads(body))
+            dumps = bench(lambda codec=codec, obj=obj: codec.dumps(obj))
+            print(
+                f"{name:<32} {len(body) / 1e6:>7.2f}MB {codec.name:<8} {loads * 1e3:>8.2f}ms {dumps * 1e3:>8.2f}ms "
+                f"{len(body) / loads / 1e6:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+"""
+Compares the memory held by VM listings decoded as dicts and as typed models.
+
+Usage: python benchmarks/bench_models.py [count ...]
+
+For each count, a synthetic list_virtual_machines response is decoded and the memory retained by the
+records is measured with tracemalloc: once as dicts, once as VirtualMachine models with their nested fields
+left unparsed, and once with every nested field accessed.
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payloads import virtual_machines_payload  # noqa: E402
+
+from hyperstack.codecs import get_codec  # noqa: E402
+from hyperstack.models import VirtualMachine, parse_many  # noqa: E402
+
+
+def as_dicts(body):
+    return get_codec().loads(body)["instances"]
+
+
+def as_models(body):
+    return parse_many(VirtualMachine, "instances")(get_codec().loads(body))
+
+
+def as_parsed_models(body):
+    models = as_models(body)
+    for model in models:
+        for name in model._nested:
+            getattr(model, name)
+    return models
+
+
+def measure(build, body):
+    # Timed separately, since tracing every allocation slows the build down
+    start = time.perf_counter()
+    build(body)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    records = build(body)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return retained, elapsed
+
+
+def main(counts):
+    codec = get_codec()
+    print(f"{'records':>8} {'mode':<16} {'retained':>12} {'per record':>11} {'build':>9} {'vs dicts':>9}")
+    for count in counts:
+        body = codec.dumps(virtual_machines_payload(count))
+        baseline = None
+        for mode, build in (("dicts", as_dicts), ("models", as_models), ("models, parsed", as_parsed_models)):
+            retained, elapsed = measure(build, body)
+            baseline = baseline or retained
+            print(
+                f"{count:>8} {mode:<16} {retained / 1e6:>10.1f}MB {retained / count:>10.0f}B "
+                f"{elapsed * 1e3:>7.0f}ms {retained / baseline:>8.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(count) for count in sys.argv[1:]] or [1000, 20000])
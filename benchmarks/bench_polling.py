@@ -0,0 +1,84 @@
+"""
+Compares poll strategies for wait_for_vm_active on simulated boot times.
+
+Usage: python benchmarks/bench_polling.py [vms]
+
+Boot times are drawn around 45 seconds, with one VM in ten taking about three times longer. For each strategy,
+the time from the VM becoming ACTIVE until a poll sees it, the number of polls and the number of waits that
+gave up are reported. The adaptive strategy learns from the first 20 boots before it is measured.
+"""
+
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hyperstack.polling import (  # noqa: E402
+    AdaptivePolling,
+    BootTimeStore,
+    DeadlinePolling,
+    ExponentialBackoff,
+)
+
+KEY = "n3-A100x1|Ubuntu Server 22.04 LTS R535 CUDA 12.2"
+
+
+def boot_times(count, rng):
+    return [rng.gauss(45, 5) * (3 if rng.random() < 0.1 else 1) for _ in range(count)]
+
+
+def default_schedule(boot):
+    # wait_for_vm_active(initial_delay=20, delay=10, backoff_factor=1.5, max_attempts=4)
+    polls = [20, 40, 50, 75]
+    for count, at in enumerate(polls, 1):
+        if at >= boot:
+            return at - boot, count
+    return None, len(polls)
+
+
+def run_strategy(strategy, boot):
+    at = 0
+    count = 1
+    for delay in strategy.delays(KEY):
+        if at >= boot:
+            break
+        at += delay
+        count += 1
+    if at < boot:
+        return None, count
+    strategy.record(KEY, at)
+    return at - boot, count
+
+
+def report(name, outcomes):
+    latencies = [latency for latency, _ in outcomes if latency is not None]
+    polls = [count for _, count in outcomes]
+    print(
+        f"{name:<22} detection p50 {statistics.median(latencies):6.1f}s  max {max(latencies):6.1f}s  "
+        f"polls mean {statistics.mean(polls):5.1f}  timeouts {len(outcomes) - len(latencies)}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(0)
+    random.seed(0)
+    boots = boot_times(count, rng)
+
+    report("default (4 attempts)", [default_schedule(boot) for boot in boots])
+    for name, strategy in [
+        ("exponential", ExponentialBackoff(timeout=900)),
+        ("deadline (10s)", DeadlinePolling(timeout=900, interval=10)),
+    ]:
+        report(name, [run_strategy(strategy, boot) for boot in boots])
+
+    adaptive = AdaptivePolling(store=BootTimeStore(), timeout=900)
+    for boot in boot_times(20, rng):
+        run_strategy(adaptive, boot)
+    report("adaptive", [run_strategy(adaptive, boot) for boot in boots])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Synthetic API payloads shaped like real Hyperstack responses, for benchmarks."""
+
+import json
+import os
+import sys
+
+
+def virtual_machine(vm_id):
+    return {
+        "id": vm_id,
+        "name": f"vm-{vm_id}",
+        "status": "ACTIVE",
+        "power_state": "RUNNING",
+        "vm_state": "active",
+        "fixed_ip": f"10.0.{vm_id // 256 % 256}.{vm_id % 256}",
+        "floating_ip": f"185.0.{vm_id // 256 % 256}.{vm_id % 256}",
+        "floating_ip_status": "ATTACHED",
+        "environment": {"id": 1, "name": "default-NORWAY-1", "org_id": 1, "region": "NORWAY-1"},
+        "image": {"name": "Ubuntu Server 22.04 LTS R535 CUDA 12.2"},
+        "flavor": {
+            "id": 95,
+            "name": "n3-A100x1",
+            "cpu": 28,
+            "ram": 120.0,
+            "disk": 100,
+            "gpu": "A100-80G-PCIe",
+            "gpu_count": 1,
+        },
+        "keypair": {"name": "development-key"},
+        "volume_attachments": [],
+        "security_rules": [
+            {
+                "id": vm_id * 10 + port,
+                "direction": "ingress",
+                "protocol": "tcp",
+                "ethertype": "IPv4",
+                "remote_ip_prefix": "0.0.0.0/0",
+                "port_range_min": port,
+                "port_range_max": port,
+                "status": "SUCCESS",
+                "created_at": "2024-08-01T10:00:00",
+            }
+            for port in (22, 8888)
+        ],
+        "labels": ["team-ml", f"batch-{vm_id % 7}"],
+        "created_at": "2024-08-01T10:00:00",
+    }
+
+
+def virtual_machines_payload(count):
+    return {
+        "status": True,
+        "message": "Getting instances success",
+        "instances": [virtual_machine(i) for i in range(1, count + 1)],
+    }
+
+
+def images_payload(count):
+    images = [
+        {
+            "id": i,
+            "name": f"Ubuntu Server 22.04 LTS R535 CUDA 12.2 v{i}",
+            "region_name": "NORWAY-1" if i % 2 else "CANADA-1",
+            "type": "Ubuntu",
+            "version": "22.04",
+            "size": 12.5,
+            "display_size": "12.5 GB",
+            "description": "Ubuntu Server with NVIDIA drivers and CUDA preinstalled. " * 4,
+            "is_public": True,
+            "labels": [{"id": i, "label": "cuda"}],
+        }
+        for i in range(1, count + 1)
+    ]
+    return {
+        "status": True,
+        "message": "Getting images success",
+        "images": [
+            {
+                "region_name": region,
+                "type": "Ubuntu",
+                "logo": "",
+                "images": [image for image in images if image["region_name"] == region],
+            }
+            for region in ("NORWAY-1", "CANADA-1")
+        ],
+    }
+
+
+PAYLOADS = {
+    "list_virtual_machines_100": lambda: virtual_machines_payload(100),
+    "list_virtual_machines_5000": lambda: virtual_machines_payload(5000),
+    "list_images_2000": lambda: images_payload(2000),
+}
+
+
+def load_payloads(paths=()):
+    """
+    Returns named payloads as JSON bytes.
+
+    :param paths: Recorded response bodies, or cassette directories recorded with hyperstack.cassette, to use
+                  instead of the synthetic payloads. The GET responses of a cassette are used.
+    """
+    if paths:
+        payloads = {}
+        for path in paths:
+            if os.path.isdir(path):
+                from hyperstack.cassette import Cassette
+
+                with Cassette(path) as cassette:
+                    for interaction, body in cassette.interactions():
+                        if interaction["method"] == "GET" and interaction["status"] == 200:
+                            payloads[interaction["url"]] = bytes(body)
+                continue
+            with open(path, "rb") as f:
+                payloads[path] = f.read()
+        return payloads
+    return {name: json.dumps(build()).encode() for name, build in PAYLOADS.items()}
+
+
+if __name__ == "__main__":
+    for name, body in load_payloads(sys.argv[1:]).items():
+        print(f"{name}: {len(body) / 1e6:.2f} MB")
@@ -0,0 +1,166 @@
+"""
+Benchmarks the client against the in-process mock API server.
+
+Usage: python benchmarks/run.py [--latency 0.02] [--scenario single --scenario fanout ...]
+
+Every scenario reports the number of operations, throughput and p50/p99 latency. Deploy flows poll the VM
+status and the floating IP every few seconds while a real VM takes tens of seconds to boot, so the deploy
+scenario runs with the simulated boot time and the poll interval both scaled down by --time-scale.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hyperstack  # noqa: E402
+from hyperstack import deploy  # noqa: E402
+from hyperstack.testing import IMAGE_NAME, MockAPIServer  # noqa: E402
+
+ENVIRONMENT = "default-NORWAY-1"
+# Typical boot time of a real VM and the default poll interval of the deploy flows, scaled by --time-scale
+DEPLOY_BOOT_TIME = 45
+DEPLOY_POLL_INTERVAL = 5
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def report(name, latencies, elapsed, extra=""):
+    print(
+        f"{name:<24} {len(latencies):>6} ops {len(latencies) / elapsed:>10.1f} ops/s "
+        f"p50 {percentile(latencies, 0.5) * 1e3:>8.2f}ms p99 {percentile(latencies, 0.99) * 1e3:>8.2f}ms {extra}"
+    )
+
+
+def bench_single(server, args):
+    client = server.client()
+    client.environment = ENVIRONMENT
+    (vm,) = server.add_virtual_machines(1)
+    start = time.perf_counter()
+    latencies = [timed(lambda: client.retrieve_vm_details(vm["id"])) for _ in range(args.operations)]
+    report("single retrieve_vm", latencies, time.perf_counter() - start, str(client.transport_stats()))
+
+
+def bench_catalog(server, args):
+    for name, cache in (("catalog uncached", False), ("catalog cached", True)):
+        client = server.client(cache=cache)
+        start = time.perf_counter()
+        latencies = [timed(client.list_flavors) for _ in range(args.operations)]
+        report(name, latencies, time.perf_counter() - start)
+
+
+def bench_list(server, args):
+    server.add_virtual_machines(args.vms * 10)
+    client = server.client()
+    client.environment = ENVIRONMENT
+    start = time.perf_counter()
+    latencies = [timed(client.list_virtual_machines) for _ in range(max(args.operations // 10, 1))]
+    report(f"list {args.vms * 10} vms", latencies, time.perf_counter() - start)
+
+
+def bench_fanout(server, args):
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(args.vms)]
+    client = server.client(pool_maxsize=args.workers)
+    client.environment = ENVIRONMENT
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        start = time.perf_counter()
+        latencies = list(
+            executor.map(lambda vm_id: timed(lambda: client.retrieve_vm_details(vm_id)), vm_ids * args.rounds)
+        )
+        elapsed = time.perf_counter() - start
+    report(f"fanout x{args.workers}", latencies, elapsed, str(client.transport_stats()))
+
+
+def bench_waiter(server, args):
+    client = server.client()
+    client.environment = ENVIRONMENT
+    response = client.create_vm("bench", IMAGE_NAME, "n3-A100x1", count=args.vms)
+    vm_ids = [instance["id"] for instance in response["instances"]]
+    polls_before = server.request_count("GET", "core/virtual-machines$")
+    created = time.perf_counter()
+    latencies = []
+    for _ in client.wait_for_vms(vm_ids, poll_interval=args.poll_interval, timeout=60):
+        latencies.append(time.perf_counter() - created - server.boot_time)
+    polls = server.request_count("GET", "core/virtual-machines$") - polls_before
+    report(f"wait_for_vms x{args.vms}", latencies, time.perf_counter() - created, f"list calls {polls}")
+
+
+def bench_deploy(server, args):
+    client = server.client()
+    spec = {
+        "deployment_type": "ollama",
+        "name": "bench",
+        "environment": ENVIRONMENT,
+        "flavor_name": "n3-A100x1",
+        "key_name": "development-key",
+        "poll_interval": DEPLOY_POLL_INTERVAL * args.time_scale,
+    }
+    server.boot_time = DEPLOY_BOOT_TIME * args.time_scale
+    durations = {}
+
+    def progress(name, phase, vm_id):
+        if phase == "creating":
+            durations[name] = time.perf_counter()
+        elif phase in ("ready", "failed"):
+            durations[name] = time.perf_counter() - durations[name]
+
+    with patch.object(hyperstack, "_hyperstack", client), open(os.devnull, "w") as devnull, patch(
+        "sys.stdout", devnull
+    ):
+        start = time.perf_counter()
+        results = deploy.deploy_fleet(spec, replicas=args.vms, max_workers=args.workers, progress=progress)
+        elapsed = time.perf_counter() - start
+    errors = [result.error for result in results if not result.ok]
+    report(
+        f"deploy_fleet x{args.vms}",
+        list(durations.values()),
+        elapsed,
+        f"failed {len(errors)}{f' ({errors[0]!r})' if errors else ''}, boot and polling scaled by {args.time_scale}",
+    )
+
+
+SCENARIOS = {
+    "single": bench_single,
+    "catalog": bench_catalog,
+    "list": bench_list,
+    "fanout": bench_fanout,
+    "waiter": bench_waiter,
+    "deploy": bench_deploy,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Hyperstack client against the mock API server")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenarios to run (default all)")
+    parser.add_argument("--latency", type=float, default=0.005, help="Server latency per request in seconds")
+    parser.add_argument("--operations", type=int, default=200, help="Sequential operations per scenario")
+    parser.add_argument("--vms", type=int, default=50, help="Number of VMs for fan-out, waiter and deploy scenarios")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent workers for fan-out and deploy")
+    parser.add_argument("--rounds", type=int, default=4, help="Fan-out rounds over all VMs")
+    parser.add_argument("--boot-time", type=float, default=1.0, help="Seconds a mock VM takes to boot")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="Waiter poll interval in seconds")
+    parser.add_argument(
+        "--time-scale", type=float, default=0.01, help="Factor applied to the deploy boot time and poll interval"
+    )
+    args = parser.parse_args(argv)
+
+    for name in args.scenario or SCENARIOS:
+        with MockAPIServer(latency=args.latency, boot_time=args.boot_time, transition_time=args.boot_time) as server:
+            SCENARIOS[name](server, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,114 @@
+import threading
+
 from .api.regions import Region
-from .client import Hyperstack
 
-# Singleton instance
-_hyperstack = Hyperstack()
+# Singleton instance, created on first use so that importing the package needs neither an API key nor requests
+_hyperstack = None
+_hyperstack_lock = threading.Lock()
 
 # Expose Region enum
 Region = Region
 
+
+def __getattr__(name):
+    # Load the clients, and with them requests and aiohttp, only when they are first used
+    if name == "Hyperstack":
+        from .client import Hyperstack
+
+        return Hyperstack
+    if name == "AsyncHyperstack":
+        from .async_client import AsyncHyperstack
+
+        return AsyncHyperstack
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get_client():
+    global _hyperstack
+    if _hyperstack is None:
+        with _hyperstack_lock:
+            if _hyperstack is None:
+                from .client import Hyperstack
+
+                _hyperstack = Hyperstack()
+    return _hyperstack
+
+
+def _forward(name):
+    def method(*args, **kwargs):
+        return getattr(_get_client(), name)(*args, **kwargs)
+
+    method.__name__ = method.__qualname__ = name
+    method.__doc__ = f"Calls Hyperstack.{name} on the module-level client."
+    return method
+
+
 # Expose methods at the module level
-create_profile = _hyperstack.create_profile
-list_profiles = _hyperstack.list_profiles
-retrieve_profile = _hyperstack.retrieve_profile
-delete_profile = _hyperstack.delete_profile
+create_profile = _forward("create_profile")
+list_profiles = _forward("list_profiles")
+iter_profiles = _forward("iter_profiles")
+retrieve_profile = _forward("retrieve_profile")
+delete_profile = _forward("delete_profile")
 
 # Expose region methods
-list_regions = _hyperstack.list_regions
-get_region_enum = _hyperstack.get_region_enum
+list_regions = _forward("list_regions")
+get_region_enum = _forward("get_region_enum")
 
 # Expose environment methods
-create_environment = _hyperstack.create_environment
-list_environments = _hyperstack.list_environments
-get_environment = _hyperstack.get_environment
-set_environment = _hyperstack.set_environment
-delete_environment = _hyperstack.delete_environment
-update_environment = _hyperstack.update_environment
+create_environment = _forward("create_environment")
+list_environments = _forward("list_environments")
+get_environment = _forward("get_environment")
+set_environment = _forward("set_environment")
+using_environment = _forward("using_environment")
+delete_environment = _forward("delete_environment")
+update_environment = _forward("update_environment")
 
 # Expose flavor methods
-list_flavors = _hyperstack.list_flavors
-get_flavor_enum = _hyperstack.get_flavor_enum
+list_flavors = _forward("list_flavors")
+get_flavor_enum = _forward("get_flavor_enum")
 
 # Expose image methods
-list_images = _hyperstack.list_images
-get_image_enum = _hyperstack.get_image_enum
+list_images = _forward("list_images")
+iter_images = _forward("iter_images")
+get_image_enum = _forward("get_image_enum")
 
 # Expose network methods
-attach_public_ip = _hyperstack.attach_public_ip
-detach_public_ip = _hyperstack.detach_public_ip
-set_sg_rules = _hyperstack.set_sg_rules
-delete_sg_rules = _hyperstack.delete_sg_rules
-retrieve_vnc_path = _hyperstack.retrieve_vnc_path
-retrieve_vnc_url = _hyperstack.retrieve_vnc_url
+attach_public_ip = _forward("attach_public_ip")
+detach_public_ip = _forward("detach_public_ip")
+set_sg_rules = _forward("set_sg_rules")
+apply_sg_rules = _forward("apply_sg_rules")
+delete_sg_rules = _forward("delete_sg_rules")
+retrieve_vnc_path = _forward("retrieve_vnc_path")
+retrieve_vnc_url = _forward("retrieve_vnc_url")
 
 # Expose stock methods
-retrieve_gpu_stock = _hyperstack.retrieve_gpu_stock
+retrieve_gpu_stock = _forward("retrieve_gpu_stock")
+
+# Expose placement methods
+plan_placement = _forward("plan_placement")
 
 # Expose virtual machine methods
-create_vm = _hyperstack.create_vm
-list_virtual_machines = _hyperstack.list_virtual_machines
-retrieve_vm_details = _hyperstack.retrieve_vm_details
-start_virtual_machine = _hyperstack.start_virtual_machine
-stop_virtual_machine = _hyperstack.stop_virtual_machine
-hard_reboot_virtual_machine = _hyperstack.hard_reboot_virtual_machine
-hibernate_virtual_machine = _hyperstack.hibernate_virtual_machine
-restore_hibernated_virtual_machine = _hyperstack.restore_hibernated_virtual_machine
-delete_virtual_machine = _hyperstack.delete_virtual_machine
-resize_virtual_machine = _hyperstack.resize_virtual_machine
-update_virtual_machine_labels = _hyperstack.update_virtual_machine_labels
-get_floating_ip = _hyperstack.get_floating_ip
-wait_for_vm_active = _hyperstack.wait_for_vm_active
+create_vm = _forward("create_vm")
+list_virtual_machines = _forward("list_virtual_machines")
+iter_virtual_machines = _forward("iter_virtual_machines")
+retrieve_vm_details = _forward("retrieve_vm_details")
+start_virtual_machine = _forward("start_virtual_machine")
+stop_virtual_machine = _forward("stop_virtual_machine")
+hard_reboot_virtual_machine = _forward("hard_reboot_virtual_machine")
+hibernate_virtual_machine = _forward("hibernate_virtual_machine")
+restore_hibernated_virtual_machine = _forward("restore_hibernated_virtual_machine")
+delete_virtual_machine = _forward("delete_virtual_machine")
+resize_virtual_machine = _forward("resize_virtual_machine")
+update_virtual_machine_labels = _forward("update_virtual_machine_labels")
+get_floating_ip = _forward("get_floating_ip")
+wait_for_vm_active = _forward("wait_for_vm_active")
+wait_for_vms = _forward("wait_for_vms")
+bulk_vm_action = _forward("bulk_vm_action")
 
 # Expose volume methods
-create_volume = _hyperstack.create_volume
-list_volumes = _hyperstack.list_volumes
-list_volume_types = _hyperstack.list_volume_types
-get_volume = _hyperstack.get_volume
-delete_volume = _hyperstack.delete_volume
+create_volume = _forward("create_volume")
+list_volumes = _forward("list_volumes")
+iter_volumes = _forward("iter_volumes")
+list_volume_types = _forward("list_volume_types")
+get_volume = _forward("get_volume")
+delete_volume = _forward("delete_volume")
@@ -1,13 +1,21 @@
-from . import environments, flavors, images, network, profiles, regions, stock, virtual_machines, volumes
+import importlib
 
 __all__ = [
     'environments',
     'flavors',
     'images',
     'network',
+    'placement',
     'profiles',
     'regions',
     'stock',
     'virtual_machines',
     'volumes',
 ]
+
+
+def __getattr__(name):
+    # Import the api modules on first use, so that importing one of them (e.g. regions for Region) doesn't load all
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+
 from .regions import get_region_enum
+from ..context import pop_environment, push_environment
 
 
 def create_environment(self, name, region_str):
@@ -48,6 +51,28 @@ def set_environment(self, environment_name):
     print(f"Environment set to: {environment_name}")
 
 
+@contextmanager
+def using_environment(self, environment_name):
+    """
+    Sets the environment for the calls made in a ``with`` block, in the current thread or asyncio task only.
+
+    Unlike set_environment, this doesn't change the environment seen by other threads and tasks sharing the
+    client, so work on several environments can run concurrently. Thread pools of the client, such as those of
+    bulk_vm_action and apply_sg_rules, carry the environment over to their workers.
+
+    :param environment_name: The name of the environment. None leaves the environment as it is.
+    :return: A context manager yielding the environment in use.
+    """
+    if environment_name is None:
+        yield self.environment
+        return
+    token = push_environment(self, environment_name)
+    try:
+        yield environment_name
+    finally:
+        pop_environment(token)
+
+
 def delete_environment(self, environment_id):
     """
     Deletes a specific environment.
@@ -68,3 +93,50 @@ def update_environment(self, environment_id, name):
     """
     payload = {"name": name}
     return self.put(f"core/environments/{environment_id}", data=payload)
+
+
+def environment_names(response):
+    """Returns the names of the environments in a list_environments response."""
+    return [environment["name"] for environment in response.get("environments") or []]
+
+
+def environment_items(response, key, environment):
+    """
+    Returns the items of a list response for one environment, each tagged with it.
+
+    Items without an environment get ``{"name": environment}``, and items of other environments are dropped, so
+    the result is right whether or not the API filtered by the ``environment`` parameter. Tagged items are
+    copies, as the response may be shared with other callers through the cache or coalesced requests.
+    """
+    items = []
+    for item in response.get(key) or []:
+        tag = item.get("environment")
+        if tag is None:
+            items.append({**item, "environment": {"name": environment}})
+        elif not isinstance(tag, dict) or tag.get("name") == environment:
+            items.append(item)
+    return items
+
+
+def merge_environments(key, outcomes):
+    """
+    Merges the listings of several environments into one response.
+
+    :param key: The key of the list in the response, e.g. "instances".
+    :param outcomes: (environment, items or the exception raised while listing them) pairs.
+    :return: A dict with the items of every environment under ``key``, in the order of the environments, the
+             "environments" that were listed, and the environments that "failed" with their error.
+    """
+    merged = {key: [], "environments": [], "failed": []}
+    for environment, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            merged["failed"].append({"environment": environment, "error": outcome})
+        else:
+            merged[key].extend(outcome)
+            merged["environments"].append(environment)
+    return merged
+
+
+def parse_merged(parse, key):
+    """Wraps a parser of a list response so that it parses a merged response, keeping its other keys."""
+    return lambda response: {**response, key: parse(response)}
@@ -1,11 +1,13 @@
 from .regions import Region
+from ..models import Flavor, parse_grouped
 
 
-def list_flavors(self, region=None):
+def list_flavors(self, region=None, typed=False):
     """
     Lists all available regions or filters by a specific region.
 
     :param region: Optional. The region to filter (enum: Region.NORWAY_1 or Region.CANADA_1).
+    :param typed: Whether to return a flat list of Flavor models instead of the response (default False).
     :return: The response from the API call.
     """
     params = {}
@@ -15,7 +17,10 @@ def list_flavors(self, region=None):
                 f"Invalid region specified. Use Region enum: {', '.join([r.value for r in Region])}"
             ) from None
         params['region'] = region.value
-    return self.get("core/flavors", params=params)
+    response = self.get("core/flavors", params=params)
+    if typed:
+        return self._typed(response, parse_grouped(Flavor, "data", "flavors"))
+    return response
 
 
 def get_flavor_enum(region_string):
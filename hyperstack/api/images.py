@@ -1,13 +1,36 @@
 from .regions import Region
+from ..models import Image, parse_grouped, parse_many
 
 
-def list_images(self, region=None):
+def list_images(self, region=None, typed=False):
     """
     Lists all available regions or filters by a specific region.
 
     :param region: Optional. The region to filter (enum: Region.NORWAY_1 or Region.CANADA_1).
+    :param typed: Whether to return a flat list of Image models instead of the response (default False).
     :return: The response from the API call.
     """
+    response = self.get("core/images", params=_region_params(region))
+    if typed:
+        return self._typed(response, parse_grouped(Image, "images", "images"))
+    return response
+
+
+def iter_images(self, region=None, typed=False):
+    """
+    Iterates over the image groups returned by list_images, decoding the response as it is received.
+
+    :param region: Optional. The region to filter (enum: Region.NORWAY_1 or Region.CANADA_1).
+    :param typed: Whether to yield the Image models of each group instead of the groups (default False).
+    :return: An iterator of image groups, each holding its list of images (an async iterator on AsyncHyperstack).
+    """
+    items = self.iter_items("core/images", "images", params=_region_params(region))
+    if typed:
+        return self._typed_iter(items, parse_many(Image, "images"))
+    return items
+
+
+def _region_params(region):
     params = {}
     if region:
         if not isinstance(region, Region):
@@ -15,7 +38,7 @@ def list_images(self, region=None):
                 f"Invalid region specified. Use Region enum: {', '.join([r.value for r in Region])}"
             ) from None
         params['region'] = region.value
-    return self.get("core/images", params=params)
+    return params
 
 
 def get_image_enum(region_string):
@@ -1,13 +1,64 @@
-def attach_public_ip(self, vm_id):
-    self._check_environment_set()
+from ..context import ContextThreadPoolExecutor
+
+_SG_RULE_DEFAULTS = {
+    "remote_ip_prefix": "0.0.0.0/0",
+    "direction": "ingress",
+    "ethertype": "IPv4",
+    "protocol": "tcp",
+    "port_range_min": None,
+    "port_range_max": None,
+}
+
+
+def attach_public_ip(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.post(f"core/virtual-machines/{vm_id}/attach-floatingip")
 
 
-def detach_public_ip(self, vm_id):
-    self._check_environment_set()
+def detach_public_ip(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.post(f"core/virtual-machines/{vm_id}/detach-floatingip")
 
 
+def _sg_rule_key(rule):
+    rule = {**_SG_RULE_DEFAULTS, **{field: value for field, value in rule.items() if field in _SG_RULE_DEFAULTS}}
+    return (
+        rule["remote_ip_prefix"],
+        (rule["direction"] or "").lower(),
+        rule["ethertype"],
+        (rule["protocol"] or "").lower(),
+        rule["port_range_min"],
+        rule["port_range_max"],
+    )
+
+
+def plan_sg_rules(instances, vm_ids, rules):
+    """
+    Works out which security group rules still need to be created on each VM.
+
+    :param instances: VM records, as returned in the "instances" of list_virtual_machines.
+    :param vm_ids: The IDs of the VMs the rules should be applied to.
+    :param rules: The rules to apply, as dicts of set_sg_rules arguments.
+    :return: A tuple of (pending, skipped) lists of (vm_id, rule) pairs. Rules the VM already has, or that
+             appear twice in rules, are skipped.
+    """
+    existing = {
+        str(instance["id"]): {_sg_rule_key(rule) for rule in instance.get("security_rules") or []}
+        for instance in instances
+    }
+    pending, skipped = [], []
+    for vm_id in vm_ids:
+        seen = set(existing.get(str(vm_id), ()))
+        for rule in rules:
+            key = _sg_rule_key(rule)
+            if key in seen:
+                skipped.append((vm_id, rule))
+            else:
+                seen.add(key)
+                pending.append((vm_id, rule))
+    return pending, skipped
+
+
 def set_sg_rules(
     self,
     vm_id,
@@ -17,8 +68,9 @@ def set_sg_rules(
     protocol="tcp",
     port_range_min=None,
     port_range_max=None,
+    environment=None,
 ):
-    self._check_environment_set()
+    self._check_environment_set(environment)
 
     payload = {
         "remote_ip_prefix": remote_ip_prefix,
@@ -35,23 +87,73 @@ def set_sg_rules(
     return self.post(f"core/virtual-machines/{vm_id}/sg-rules", data=payload)
 
 
-def delete_sg_rules(self, vm_id, sg_rule_id):
-    self._check_environment_set()
+def apply_sg_rules(self, vm_ids, rules, max_workers=8, instances=None, environment=None):
+    """
+    Applies a set of security group rules to many virtual machines.
+
+    The VMs' current rules are fetched with a single list call unless their records are given, rules they
+    already have are skipped, and the remaining rules are created concurrently.
+
+    :param vm_ids: The IDs of the virtual machines.
+    :param rules: The rules to apply, as dicts of set_sg_rules arguments,
+                  e.g. [{"port_range_min": 22, "port_range_max": 22}, {"protocol": "icmp"}].
+    :param max_workers: Maximum number of rules created at the same time (default 8).
+    :param instances: The VM records to read the current rules from, e.g. from retrieve_vm_details, instead
+                      of listing all VMs.
+    :param environment: The environment of the VMs instead of the current one.
+    :return: A report dict with "applied", "skipped" and "failed" lists. Each entry is a dict with the
+             "vm_id" and "rule", plus the API "response" for applied rules or the "error" for failed ones.
+    """
+    self._check_environment_set(environment)
+    if instances is None:
+        instances = self.list_virtual_machines(environment=environment).get("instances", [])
+    pending, skipped = plan_sg_rules(instances, vm_ids, rules)
+
+    def apply(job):
+        vm_id, rule = job
+        try:
+            return vm_id, rule, True, self.set_sg_rules(vm_id, environment=environment, **rule)
+        except Exception as e:
+            return vm_id, rule, False, e
+
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sg_rules_report(executor.map(apply, pending), skipped)
+
+
+def sg_rules_report(outcomes, skipped):
+    """
+    Builds the report of apply_sg_rules.
+
+    :param outcomes: (vm_id, rule, ok, response or error) tuples, one per rule created.
+    :param skipped: The (vm_id, rule) pairs skipped by plan_sg_rules.
+    """
+    report = {"applied": [], "skipped": [{"vm_id": vm_id, "rule": rule} for vm_id, rule in skipped], "failed": []}
+    for vm_id, rule, ok, outcome in outcomes:
+        if ok:
+            report["applied"].append({"vm_id": vm_id, "rule": rule, "response": outcome})
+        else:
+            report["failed"].append({"vm_id": vm_id, "rule": rule, "error": outcome})
+    return report
+
+
+def delete_sg_rules(self, vm_id, sg_rule_id, environment=None):
+    self._check_environment_set(environment)
     return self.delete(f"core/virtual-machines/{vm_id}/sg-rules/{sg_rule_id}")
 
 
-def retrieve_vnc_path(self, vm_id):
-    self._check_environment_set()
+def retrieve_vnc_path(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.get(f"core/virtual-machines/{vm_id}/request-console")
 
 
-def retrieve_vnc_url(self, vm_id, job_id):
+def retrieve_vnc_url(self, vm_id, job_id, environment=None):
     """
     Retrieves the VNC URL for a specific virtual machine.
 
     :param vm_id: The ID of the virtual machine for which to retrieve the VNC console.
     :param job_id: The ID of the job corresponding to the VNC console.
+    :param environment: The environment to use for this call instead of the current one.
     :return: The response from the API call.
     """
-    self._check_environment_set()
+    self._check_environment_set(environment)
     return self.post(f"core/virtual-machines/{vm_id}/console/{job_id}")
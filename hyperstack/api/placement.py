@@ -0,0 +1,203 @@
+from dataclasses import dataclass, field
+
+from .regions import Region
+
+REQUIREMENTS = ("gpu", "regions", "image", "gpus_per_vm", "min_cpu", "min_ram", "min_disk")
+
+
+@dataclass
+class Allocation:
+    region: str
+    flavor_name: str
+    gpu: str
+    gpus_per_vm: int
+    vms: int
+
+    @property
+    def gpus(self):
+        return self.gpus_per_vm * self.vms
+
+
+@dataclass
+class Placement:
+    allocations: list = field(default_factory=list)
+
+    @property
+    def gpus(self):
+        return sum(allocation.gpus for allocation in self.allocations)
+
+    @property
+    def vms(self):
+        return sum(allocation.vms for allocation in self.allocations)
+
+    @property
+    def regions(self):
+        return list(dict.fromkeys(allocation.region for allocation in self.allocations))
+
+    @property
+    def gpu_models(self):
+        return list(dict.fromkeys(allocation.gpu for allocation in self.allocations))
+
+
+class PlacementCatalog:
+    """
+    Flavors, stock and images joined by region and GPU model, built once from the catalog responses.
+
+    ``pools`` maps (region, GPU model) to the GPU flavors of that model in the region, largest first,
+    ``stock`` maps (region, GPU model) to the number of available GPUs and the number of VMs available per
+    GPU count (a GPU count missing from a non-empty configuration has none), and ``images`` maps a region to the
+    names of its images.
+    """
+
+    def __init__(self, flavors, stock, images):
+        """
+        :param flavors: The response of list_flavors.
+        :param stock: The response of retrieve_gpu_stock.
+        :param images: The response of list_images.
+        """
+        self.pools = {}
+        for group in flavors.get("data") or []:
+            for flavor in group.get("flavors") or []:
+                if flavor.get("gpu_count") and flavor.get("stock_available", True):
+                    key = (flavor.get("region_name") or group.get("region_name"), flavor.get("gpu") or group["gpu"])
+                    self.pools.setdefault(key, []).append(flavor)
+        for pool in self.pools.values():
+            pool.sort(key=lambda flavor: -flavor["gpu_count"])
+
+        self.stock = {}
+        for region in stock.get("stocks") or []:
+            for model in region.get("models") or []:
+                configurations = {}
+                for size, vms in (model.get("configurations") or {}).items():
+                    configurations[int(size.rstrip("x"))] = int(vms or 0)
+                self.stock[(region["region"], model["model"])] = (int(model.get("available") or 0), configurations)
+
+        self.images = {}
+        for group in images.get("images") or []:
+            for image in group.get("images") or []:
+                region = image.get("region_name") or group.get("region_name")
+                self.images.setdefault(region, set()).add(image["name"])
+
+
+def solve_placement(catalog, requirements, count):
+    """
+    Finds the ways to place a number of GPUs on the flavors in stock, best first.
+
+    Each GPU model of each region is filled on its own, then each region, then all regions together, taking the
+    largest flavors first within the available stock. Placements are ranked by number of regions, then of GPU
+    models, then of VMs, then by the order of the requested regions.
+
+    :param catalog: A PlacementCatalog.
+    :param requirements: A dict of constraints, see plan_placement.
+    :param count: The total number of GPUs to place.
+    :return: A list of Placement, empty if the GPUs cannot be placed with the current stock.
+    """
+    unknown = set(requirements) - set(REQUIREMENTS)
+    if unknown:
+        raise ValueError(f"Unknown placement requirements: {', '.join(sorted(unknown))}")
+    if not isinstance(count, int) or count < 1:
+        raise ValueError("'count' must be a positive integer.")
+
+    gpus = requirements.get("gpu")
+    gpus = [gpus] if isinstance(gpus, str) else gpus
+    regions = [
+        region.value if isinstance(region, Region) else region for region in requirements.get("regions") or Region
+    ]
+    sizes = requirements.get("gpus_per_vm")
+    image = requirements.get("image")
+
+    def usable(flavor):
+        return (
+            (sizes is None or flavor["gpu_count"] in sizes)
+            and (flavor.get("cpu") or 0) >= (requirements.get("min_cpu") or 0)
+            and (flavor.get("ram") or 0) >= (requirements.get("min_ram") or 0)
+            and (flavor.get("disk") or 0) >= (requirements.get("min_disk") or 0)
+        )
+
+    pools = []
+    for region in regions:
+        if image is not None and image not in catalog.images.get(region, ()):
+            continue
+        region_pools = []
+        for (pool_region, gpu), flavors in catalog.pools.items():
+            if pool_region != region or (gpus is not None and gpu not in gpus):
+                continue
+            available, configurations = catalog.stock.get((region, gpu), (0, {}))
+            flavors = [
+                flavor
+                for flavor in flavors
+                if usable(flavor) and (not configurations or configurations.get(flavor["gpu_count"]))
+            ]
+            if available and flavors:
+                region_pools.append((region, gpu, flavors, available, configurations))
+        # Preferred GPU models first, otherwise the largest stock first
+        region_pools.sort(key=lambda pool: gpus.index(pool[1]) if gpus is not None else -pool[3])
+        pools.extend(region_pools)
+
+    candidates = [[pool] for pool in pools]
+    candidates += [[pool for pool in pools if pool[0] == region] for region in regions]
+    candidates.append(pools)
+
+    placements = {}
+    for candidate in candidates:
+        placement = _fill(candidate, count)
+        if placement is None:
+            # Filling the pools that only have large flavors first leaves the remainder to the finer-grained ones
+            placement = _fill(sorted(candidate, key=lambda pool: -pool[2][-1]["gpu_count"]), count)
+        if placement is not None:
+            key = tuple((a.region, a.flavor_name, a.vms) for a in placement.allocations)
+            placements.setdefault(key, placement)
+
+    return sorted(
+        placements.values(),
+        key=lambda placement: (
+            len(placement.regions),
+            len(placement.gpu_models),
+            placement.vms,
+            [regions.index(region) for region in placement.regions],
+        ),
+    )
+
+
+def _fill(pools, count):
+    remaining = count
+    allocations = []
+    for region, gpu, flavors, available, configurations in pools:
+        used = {}
+        for flavor in flavors:
+            size = flavor["gpu_count"]
+            vms = min(remaining // size, available // size)
+            if configurations:
+                vms = min(vms, configurations.get(size, 0) - used.get(size, 0))
+            if vms <= 0:
+                continue
+            used[size] = used.get(size, 0) + vms
+            allocations.append(Allocation(region, flavor["name"], gpu, size, vms))
+            remaining -= size * vms
+            available -= size * vms
+        if not remaining:
+            return Placement(allocations)
+    return None
+
+
+def plan_placement(self, requirements=None, count=1):
+    """
+    Plans where to create VMs for a number of GPUs, using the flavor, stock and image catalogs.
+
+    The catalogs come from the client's response cache when fresh, and their join is kept until one of them
+    changes, so repeated plans take no API call.
+
+    :param requirements: A dict of constraints, all optional: "gpu" (a GPU model or list of models, in order of
+                         preference), "regions" (Region values or names, in order of preference), "image" (an
+                         image name that must exist in the region), "gpus_per_vm" (allowed GPU counts per VM),
+                         "min_cpu", "min_ram" and "min_disk" (per VM).
+    :param count: The total number of GPUs to place (default 1).
+    :return: A list of Placement, best first, empty if the GPUs cannot be placed with the current stock.
+    """
+    responses = (self.list_flavors(), self.retrieve_gpu_stock(), self.list_images())
+    cached = self._placement_catalog
+    # The response cache hands back the same objects for as long as the catalogs don't change
+    if cached is None or any(cached[0][i] is not responses[i] for i in range(len(responses))):
+        cached = (responses, PlacementCatalog(*responses))
+        self._placement_catalog = cached
+    return solve_placement(cached[1], requirements or {}, count)
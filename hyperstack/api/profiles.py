@@ -1,3 +1,6 @@
+from ..models import Profile, parse_each, parse_many, parse_one
+
+
 def create_profile(
     self,
     name,
@@ -57,23 +60,44 @@ def create_profile(
     return self.post("core/profiles", json=payload)
 
 
-def list_profiles(self):
+def list_profiles(self, typed=False):
     """
     Lists all profiles.
 
+    :param typed: Whether to return a list of Profile models instead of the response (default False).
     :return: The response from the API call.
     """
-    return self.get("core/profiles")
+    response = self.get("core/profiles")
+    if typed:
+        return self._typed(response, parse_many(Profile, "profiles"))
+    return response
+
+
+def iter_profiles(self, typed=False):
+    """
+    Iterates over all profiles, decoding the response as it is received.
+
+    :param typed: Whether to yield Profile models instead of dicts (default False).
+    :return: An iterator of profiles (an async iterator on AsyncHyperstack).
+    """
+    items = self.iter_items("core/profiles", "profiles")
+    if typed:
+        return self._typed_iter(items, parse_each(Profile))
+    return items
 
 
-def retrieve_profile(self, profile_id):
+def retrieve_profile(self, profile_id, typed=False):
     """
     Retrieves details of a specific profile.
 
     :param profile_id: The unique identifier of the profile.
+    :param typed: Whether to return a Profile model instead of the response (default False).
     :return: The response from the API call.
     """
-    return self.get(f"core/profiles/{profile_id}")
+    response = self.get(f"core/profiles/{profile_id}")
+    if typed:
+        return self._typed(response, parse_one(Profile, "profile"))
+    return response
 
 
 def delete_profile(self, profile_id):
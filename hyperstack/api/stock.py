@@ -1,7 +1,15 @@
-def retrieve_gpu_stock(self):
+from ..models import Stock, parse_grouped
+
+
+def retrieve_gpu_stock(self, typed=False):
     """
     Retrieves the current GPU stock information.
 
+    :param typed: Whether to return a flat list of Stock models, one per region and GPU model, instead of
+                  the response (default False).
     :return: The response from the API call.
     """
-    return self.get("core/stocks")
+    response = self.get("core/stocks")
+    if typed:
+        return self._typed(response, parse_grouped(Stock, "stocks", "models", inherit=("region",)))
+    return response
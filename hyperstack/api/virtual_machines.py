@@ -1,5 +1,10 @@
 import time
 
+from .environments import parse_merged
+from ..context import ContextThreadPoolExecutor
+from ..models import VirtualMachine, parse_each, parse_many, parse_one
+from ..polling import boot_key
+
 
 def create_vm(
     self,
@@ -11,12 +16,13 @@ def create_vm(
     create_bootable_volume=False,
     assign_floating_ip=False,
     count=1,
+    environment=None,
 ):
-    self._check_environment_set()
+    self._check_environment_set(environment)
 
     payload = {
         "name": name,
-        "environment_name": self.environment,
+        "environment_name": environment or self.environment,
         "image_name": image_name,
         "create_bootable_volume": create_bootable_volume,
         "flavor_name": flavor_name,
@@ -29,54 +35,98 @@ def create_vm(
     return self.post("core/virtual-machines", data=payload)
 
 
-def list_virtual_machines(self):
-    self._check_environment_set()
-    return self.get("core/virtual-machines")
-
-
-def retrieve_vm_details(self, vm_id):
-    self._check_environment_set()
-    return self.get(f"core/virtual-machines/{vm_id}")
-
-
-def start_virtual_machine(self, vm_id):
-    self._check_environment_set()
+def list_virtual_machines(self, typed=False, environments=None, environment=None):
+    """
+    Lists the virtual machines in the current environment, or in several environments at once.
+
+    :param typed: Whether to return VirtualMachine models instead of dicts (default False).
+    :param environments: Names of environments to list concurrently instead of the current one, or "*" for all of
+                         them. The VMs are merged under "instances", each tagged with its environment, and the
+                         environments that could not be listed are reported under "failed" (see
+                         merge_environments).
+    :param environment: The environment to use for this call instead of the current one.
+    :return: The response from the API call.
+    """
+    if environments is not None:
+        response = self._across_environments("core/virtual-machines", "instances", environments)
+    else:
+        self._check_environment_set(environment)
+        response = self.get("core/virtual-machines", params={"environment": environment or self.environment})
+    if typed:
+        parse = parse_many(VirtualMachine, "instances")
+        return self._typed(response, parse_merged(parse, "instances") if environments is not None else parse)
+    return response
+
+
+def iter_virtual_machines(self, page_size=100, prefetch=True, typed=False, environment=None):
+    """
+    Iterates over the virtual machines in the current environment, requesting them one page at a time.
+
+    :param page_size: The number of virtual machines to request per page (default 100).
+    :param prefetch: Whether to request the next page while the current one is processed (default True).
+    :param typed: Whether to yield VirtualMachine models instead of dicts (default False).
+    :param environment: The environment to use for this call instead of the current one.
+    :return: An iterator of virtual machines (an async iterator on AsyncHyperstack).
+    """
+    self._check_environment_set(environment)
+    items = self.iter_pages(
+        "core/virtual-machines",
+        "instances",
+        page_size=page_size,
+        params={"environment": environment or self.environment},
+        prefetch=prefetch,
+    )
+    if typed:
+        return self._typed_iter(items, parse_each(VirtualMachine))
+    return items
+
+
+def retrieve_vm_details(self, vm_id, typed=False, environment=None):
+    self._check_environment_set(environment)
+    response = self.get(f"core/virtual-machines/{vm_id}")
+    if typed:
+        return self._typed(response, parse_one(VirtualMachine, "instance"))
+    return response
+
+
+def start_virtual_machine(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.get(f"core/virtual-machines/{vm_id}/start")
 
 
-def stop_virtual_machine(self, vm_id):
-    self._check_environment_set()
+def stop_virtual_machine(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.get(f"core/virtual-machines/{vm_id}/stop")
 
 
-def hard_reboot_virtual_machine(self, vm_id):
-    self._check_environment_set()
+def hard_reboot_virtual_machine(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.get(f"core/virtual-machines/{vm_id}/hard-reboot")
 
 
-def hibernate_virtual_machine(self, vm_id):
-    self._check_environment_set()
+def hibernate_virtual_machine(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.get(f"core/virtual-machines/{vm_id}/hibernate")
 
 
-def restore_hibernated_virtual_machine(self, vm_id):
-    self._check_environment_set()
+def restore_hibernated_virtual_machine(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.get(f"core/virtual-machines/{vm_id}/hibernate-restore")
 
 
-def delete_virtual_machine(self, vm_id):
-    self._check_environment_set()
+def delete_virtual_machine(self, vm_id, environment=None):
+    self._check_environment_set(environment)
     return self.delete(f"core/virtual-machines/{vm_id}")
 
 
-def resize_virtual_machine(self, vm_id, flavor):
-    self._check_environment_set()
+def resize_virtual_machine(self, vm_id, flavor, environment=None):
+    self._check_environment_set(environment)
     payload = {'flavor_name': flavor}
     return self.post(f"core/virtual-machines/{vm_id}/resize", data=payload)
 
 
-def update_virtual_machine_labels(self, vm_id, labels: list):
-    self._check_environment_set()
+def update_virtual_machine_labels(self, vm_id, labels: list, environment=None):
+    self._check_environment_set(environment)
     payload = {'labels': labels}
     return self.put(f"core/virtual-machines/{vm_id}/label", data=payload)
 
@@ -86,7 +136,19 @@ def get_floating_ip(self, vm_id):
     return response['instance']['floating_ip']
 
 
-def wait_for_vm_active(self, vm_id, max_attempts=4, initial_delay=20, delay=10, backoff_factor=1.5):
+def wait_for_vm_active(self, vm_id, max_attempts=4, initial_delay=20, delay=10, backoff_factor=1.5, strategy=None):
+    """
+    Waits until a virtual machine is ACTIVE.
+
+    By default, waits initial_delay seconds, then polls up to max_attempts times with growing delays.
+
+    :param strategy: A poll strategy from hyperstack.polling, used instead of the default schedule. The VM is
+                     polled right away, then after each delay the strategy gives, e.g. AdaptivePolling() to poll
+                     around the usual boot time of the VM's flavor and image.
+    :return: True once the VM is ACTIVE.
+    """
+    if strategy is not None:
+        return _wait_with_strategy(self, vm_id, strategy)
     current_delay = initial_delay
     time.sleep(current_delay)
     for attempt in range(max_attempts):
@@ -107,3 +169,225 @@ def wait_for_vm_active(self, vm_id, max_attempts=4, initial_delay=20, delay=10,
         current_delay = delay + (delay * backoff_factor * attempt)
 
     raise TimeoutError(f"VM {vm_id} did not become active within the specified time")
+
+
+def _wait_with_strategy(self, vm_id, strategy):
+    start = time.monotonic()
+    instance = self.retrieve_vm_details(vm_id)['instance']
+    key = boot_key(instance)
+    delays = strategy.delays(key)
+    booting = instance['status'] != 'ACTIVE'
+    while not is_active(vm_id, instance):
+        delay = next(delays, None)
+        if delay is None:
+            raise TimeoutError(f"VM {vm_id} did not become active within the specified time")
+        time.sleep(delay)
+        instance = self.retrieve_vm_details(vm_id)['instance']
+    if booting:
+        strategy.record(key, time.monotonic() - start)
+    return True
+
+
+def is_active(vm_id, instance):
+    if instance['status'] == 'ERROR':
+        raise Exception(f"VM {vm_id} entered ERROR state")
+    return instance['status'] == 'ACTIVE'
+
+
+def wait_for_vms(
+    self,
+    vm_ids,
+    target_status="ACTIVE",
+    timeout=600,
+    poll_interval=10,
+    initial_delay=0,
+    raise_on_error=True,
+    environment=None,
+):
+    """
+    Waits for several virtual machines at once, polling all of them with one list call per tick.
+
+    VMs are yielded as soon as they reach the target status, so callers can carry on with each VM
+    without waiting for the slowest one.
+
+    :param vm_ids: The IDs of the virtual machines to wait for.
+    :param target_status: The status to wait for (default "ACTIVE").
+    :param timeout: Maximum number of seconds to wait for all VMs (default 600).
+    :param poll_interval: Seconds to wait between list calls (default 10).
+    :param initial_delay: Seconds to wait before the first list call (default 0).
+    :param raise_on_error: Raise as soon as a VM enters the ERROR state. If False, the VM is yielded
+                           with its ERROR status instead (default True).
+    :param environment: The environment of the VMs instead of the current one.
+    :return: A generator of (vm_id, instance) tuples in the order the VMs reach the target status. With the
+             "DELETED" target status, VMs are yielded with a None instance once they're no longer listed.
+    """
+    self._check_environment_set(environment)
+    pending = {str(vm_id): vm_id for vm_id in vm_ids}
+    deadline = time.monotonic() + timeout
+    if initial_delay:
+        time.sleep(initial_delay)
+
+    while pending:
+        response = self.list_virtual_machines(environment=environment)
+        yield from settled_vms(response, pending, target_status, raise_on_error)
+        if not pending:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise wait_timeout(pending, target_status)
+        time.sleep(min(poll_interval, remaining))
+
+
+def settled_vms(response, pending, target_status, raise_on_error):
+    """
+    Pops the VMs of ``pending`` (keyed by string ID) that one list response shows done, for wait_for_vms.
+
+    :return: A generator of (vm_id, instance) tuples, with a None instance for VMs deleted as targeted.
+    """
+    for instance in response.get('instances', []):
+        key = str(instance['id'])
+        if key not in pending:
+            continue
+        status = instance['status']
+        if status == target_status:
+            yield pending.pop(key), instance
+        elif status == 'ERROR':
+            vm_id = pending.pop(key)
+            if raise_on_error:
+                raise Exception(f"VM {vm_id} entered ERROR state")
+            yield vm_id, instance
+    if target_status == "DELETED":
+        for vm_id in deleted_vms(response, pending):
+            yield vm_id, None
+
+
+def wait_timeout(pending, target_status):
+    return TimeoutError(f"VMs {', '.join(pending)} did not reach {target_status} within the specified time")
+
+
+def deleted_vms(response, pending):
+    """Pops the VMs of ``pending`` (keyed by string ID) missing from a list response and returns their IDs."""
+    listed = {str(instance['id']) for instance in response.get('instances', [])}
+    return [pending.pop(key) for key in list(pending) if key not in listed]
+
+
+# Bulk action name: (method applied to each VM, status the VM ends up in)
+VM_ACTIONS = {
+    "start": ("start_virtual_machine", "ACTIVE"),
+    "stop": ("stop_virtual_machine", "SHUTOFF"),
+    "hibernate": ("hibernate_virtual_machine", "HIBERNATED"),
+    "restore": ("restore_hibernated_virtual_machine", "ACTIVE"),
+    "hard-reboot": ("hard_reboot_virtual_machine", "ACTIVE"),
+    "delete": ("delete_virtual_machine", "DELETED"),
+    "resize": ("resize_virtual_machine", "ACTIVE"),
+}
+
+
+def plan_bulk_action(action, vm_ids, labels):
+    """Validates the arguments of bulk_vm_action. Returns the method name and target status of the action."""
+    if action not in VM_ACTIONS:
+        raise ValueError(f"Invalid action specified. Choose from: {', '.join(VM_ACTIONS)}")
+    if (vm_ids is None) == (labels is None):
+        raise ValueError("Pass either 'vm_ids' or 'labels'.")
+    return VM_ACTIONS[action]
+
+
+def select_vms(response, labels):
+    """Returns the IDs of the VMs of a list response that carry all of the given labels."""
+    labels = set(labels)
+    return [instance['id'] for instance in response.get('instances', []) if labels <= set(instance.get('labels') or [])]
+
+
+def bulk_report(outcomes, states, target_status, timeout):
+    """
+    Builds the report of bulk_vm_action.
+
+    :param outcomes: (vm_id, ok, response or error) tuples, one per VM.
+    :param states: The final instance of each VM that reached the target status, or None when not waiting.
+    """
+    report = {"succeeded": [], "failed": []}
+    for vm_id, ok, outcome in outcomes:
+        if not ok:
+            report["failed"].append({"vm_id": vm_id, "error": outcome})
+            continue
+        entry = {"vm_id": vm_id, "response": outcome}
+        if states is not None:
+            if vm_id not in states:
+                entry["error"] = TimeoutError(f"VM {vm_id} did not reach {target_status} within {timeout} seconds")
+            elif states[vm_id] is not None and states[vm_id]['status'] == 'ERROR':
+                entry["error"] = Exception(f"VM {vm_id} entered ERROR state")
+            else:
+                entry["instance"] = states[vm_id]
+        report["failed" if "error" in entry else "succeeded"].append(entry)
+    return report
+
+
+def bulk_vm_action(
+    self,
+    action,
+    vm_ids=None,
+    labels=None,
+    max_workers=8,
+    rate_limit=None,
+    wait=False,
+    timeout=600,
+    poll_interval=10,
+    environment=None,
+    **kwargs,
+):
+    """
+    Applies a lifecycle action to many virtual machines at once.
+
+    :param action: One of "start", "stop", "hibernate", "restore", "hard-reboot", "delete" or "resize".
+    :param vm_ids: The IDs of the virtual machines.
+    :param labels: Instead of vm_ids, act on every virtual machine in the environment that has all these labels.
+    :param max_workers: Maximum number of actions requested at the same time (default 8).
+    :param rate_limit: Maximum number of actions requested per second, spaced evenly, on top of the client's own
+                       rate limit.
+    :param wait: Whether to wait until the VMs reach the status the action leads to (e.g. "HIBERNATED"), polling
+                 all of them with wait_for_vms.
+    :param timeout: Maximum number of seconds to wait (default 600).
+    :param poll_interval: Seconds to wait between list calls while waiting (default 10).
+    :param environment: The environment of the VMs instead of the current one.
+    :param kwargs: Passed on to the single-VM function, e.g. flavor="n3-A100x2" for "resize".
+    :return: A report dict with "succeeded" and "failed" lists, in the order of the VMs. Each entry is a dict
+             with the "vm_id", plus the API "response" if the action was accepted, the "error" for failed VMs
+             and, when waiting, the final "instance" of succeeded VMs (None once deleted).
+    """
+    from ..transport import TokenBucket
+
+    method, target_status = plan_bulk_action(action, vm_ids, labels)
+    self._check_environment_set(environment)
+    if labels is not None:
+        vm_ids = select_vms(self.list_virtual_machines(environment=environment), labels)
+    function = getattr(self, method)
+    bucket = TokenBucket(rate_limit, capacity=1) if rate_limit else None
+
+    def run(vm_id):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return vm_id, True, function(vm_id, environment=environment, **kwargs)
+        except Exception as e:
+            return vm_id, False, e
+
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(run, vm_ids))
+
+    states = None
+    if wait:
+        states = {}
+        accepted = [vm_id for vm_id, ok, _ in outcomes if ok]
+        try:
+            for vm_id, instance in self.wait_for_vms(
+                accepted,
+                target_status,
+                timeout=timeout,
+                poll_interval=poll_interval,
+                raise_on_error=False,
+                environment=environment,
+            ):
+                states[vm_id] = instance
+        except TimeoutError:
+            pass
+    return bulk_report(outcomes, states, target_status, timeout)
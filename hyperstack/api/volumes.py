@@ -1,4 +1,10 @@
-def create_volume(self, name, volume_type, size=50, image_id=None, description=None, callback_url=None):
+from .environments import parse_merged
+from ..models import Volume, parse_each, parse_many, parse_one
+
+
+def create_volume(
+    self, name, volume_type, size=50, image_id=None, description=None, callback_url=None, environment=None
+):
     """
     Creates a new volume with the given parameters.
 
@@ -8,11 +14,17 @@ def create_volume(self, name, volume_type, size=50, image_id=None, description=N
     :param image_id: The ID of the image to use for the volume (optional).
     :param description: A description for the volume (optional).
     :param callback_url: A callback URL (optional).
+    :param environment: The environment to use for this call instead of the current one.
     :return: The response from the API call.
     """
-    self._check_environment_set()
+    self._check_environment_set(environment)
 
-    payload = {"name": name, "environment_name": self.environment, "volume_type": volume_type, "size": size}
+    payload = {
+        "name": name,
+        "environment_name": environment or self.environment,
+        "volume_type": volume_type,
+        "size": size,
+    }
 
     if image_id is not None:
         payload["image_id"] = image_id
@@ -24,14 +36,48 @@ def create_volume(self, name, volume_type, size=50, image_id=None, description=N
     return self.post("core/volumes", data=payload)
 
 
-def list_volumes(self):
+def list_volumes(self, typed=False, environments=None, environment=None):
     """
-    Lists all volumes in the current environment.
+    Lists all volumes in the current environment, or in several environments at once.
 
+    :param typed: Whether to return a list of Volume models instead of the response (default False).
+    :param environments: Names of environments to list concurrently instead of the current one, or "*" for all of
+                         them. The volumes are merged under "volumes" as for list_virtual_machines.
+    :param environment: The environment to use for this call instead of the current one.
     :return: The response from the API call, containing the list of volumes.
     """
-    self._check_environment_set()
-    return self.get("core/volumes")
+    if environments is not None:
+        response = self._across_environments("core/volumes", "volumes", environments)
+    else:
+        self._check_environment_set(environment)
+        response = self.get("core/volumes", params={"environment": environment or self.environment})
+    if typed:
+        parse = parse_many(Volume, "volumes")
+        return self._typed(response, parse_merged(parse, "volumes") if environments is not None else parse)
+    return response
+
+
+def iter_volumes(self, page_size=100, prefetch=True, typed=False, environment=None):
+    """
+    Iterates over the volumes in the current environment, requesting them one page at a time.
+
+    :param page_size: The number of volumes to request per page (default 100).
+    :param prefetch: Whether to request the next page while the current one is processed (default True).
+    :param typed: Whether to yield Volume models instead of dicts (default False).
+    :param environment: The environment to use for this call instead of the current one.
+    :return: An iterator of volumes (an async iterator on AsyncHyperstack).
+    """
+    self._check_environment_set(environment)
+    items = self.iter_pages(
+        "core/volumes",
+        "volumes",
+        page_size=page_size,
+        params={"environment": environment or self.environment},
+        prefetch=prefetch,
+    )
+    if typed:
+        return self._typed_iter(items, parse_each(Volume))
+    return items
 
 
 def list_volume_types(self):
@@ -43,23 +89,29 @@ def list_volume_types(self):
     return self.get("core/volume-types")
 
 
-def get_volume(self, volume_id):
+def get_volume(self, volume_id, typed=False, environment=None):
     """
     Retrieves details of a specific volume.
 
     :param volume_id: The ID of the volume to retrieve.
+    :param typed: Whether to return a Volume model instead of the response (default False).
+    :param environment: The environment to use for this call instead of the current one.
     :return: The response from the API call, containing the volume details.
     """
-    self._check_environment_set()
-    return self.get(f"core/volumes/{volume_id}")
+    self._check_environment_set(environment)
+    response = self.get(f"core/volumes/{volume_id}")
+    if typed:
+        return self._typed(response, parse_one(Volume, "volume"))
+    return response
 
 
-def delete_volume(self, volume_id):
+def delete_volume(self, volume_id, environment=None):
     """
     Deletes a specific volume.
 
     :param volume_id: The ID of the volume to delete.
+    :param environment: The environment to use for this call instead of the current one.
     :return: The response from the API call.
     """
-    self._check_environment_set()
+    self._check_environment_set(environment)
     return self.delete(f"core/volumes/{volume_id}")
@@ -0,0 +1,322 @@
+import asyncio
+
+from .api.environments import environment_items, environment_names, merge_environments
+from .api.network import plan_sg_rules, sg_rules_report
+from .api.placement import PlacementCatalog, solve_placement
+from .api.virtual_machines import (
+    bulk_report,
+    is_active,
+    plan_bulk_action,
+    select_vms,
+    settled_vms,
+    wait_timeout,
+)
+from .client import _HyperstackBase
+from .codecs import get_codec
+from .pagination import JSONArrayParser, is_last_page
+from .polling import boot_key
+from .transport import TokenBucket
+
+
+class AsyncHyperstack(_HyperstackBase):
+    """
+    Asyncio client for the Hyperstack API.
+
+    Every API method available on Hyperstack is available here as a coroutine, built from the same api
+    functions as the sync client. Requests share one aiohttp connection pool, and at most
+    ``max_concurrency`` of them are in flight at any time.
+
+    Requires the optional aiohttp dependency: ``pip install hyperstack[async]``.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        pool_maxsize=100,
+        pool_maxsize_per_host=10,
+        keep_alive_timeout=15,
+        max_concurrency=20,
+        codec=None,
+    ):
+        """
+        Creates an asyncio client for the Hyperstack API.
+
+        :param api_key: The API key. Defaults to the HYPERSTACK_API_KEY environment variable.
+        :param pool_maxsize: Maximum number of connections kept open in total (default 100).
+        :param pool_maxsize_per_host: Maximum number of connections kept open per host (default 10).
+        :param keep_alive_timeout: Seconds an idle connection is kept open for reuse (default 15).
+        :param max_concurrency: Maximum number of requests in flight at once (default 20).
+        :param codec: JSON codec for request and response bodies: a JSONCodec, "orjson", "ujson" or "json".
+                      Defaults to the fastest one installed.
+        """
+        super().__init__(api_key)
+        self.pool_maxsize = pool_maxsize
+        self.pool_maxsize_per_host = pool_maxsize_per_host
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_concurrency = max_concurrency
+        self._session = None
+        self._semaphore = None
+        self.codec = get_codec(codec)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes all pooled connections held by the client."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        # The session and semaphore have to be created inside the running event loop
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError as e:
+                raise ImportError(
+                    "AsyncHyperstack requires aiohttp. Install it with: pip install hyperstack[async]"
+                ) from e
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                limit_per_host=self.pool_maxsize_per_host,
+                keepalive_timeout=self.keep_alive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _request(self, method, endpoint, **kwargs):
+        url = f"{self.base_url}{endpoint}"
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        if "json" in kwargs:
+            body = kwargs.pop("json")
+            if body is not None:
+                kwargs["data"] = self.codec.dumps(body)
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.request(method, url, headers=headers, **kwargs) as response:
+                response.raise_for_status()
+                return await response.read()
+
+    async def get(self, endpoint, **kwargs):
+        """Send a GET request."""
+        return self.codec.loads(await self._request("GET", endpoint, **kwargs))
+
+    async def post(self, endpoint, data=None, **kwargs):
+        """Send a POST request."""
+        return self.codec.loads(await self._request("POST", endpoint, json=data, **kwargs))
+
+    async def put(self, endpoint, data=None, **kwargs):
+        """Send a PUT request."""
+        return self.codec.loads(await self._request("PUT", endpoint, json=data, **kwargs))
+
+    async def delete(self, endpoint, **kwargs):
+        """Send a DELETE request."""
+        return self.codec.loads(await self._request("DELETE", endpoint, **kwargs))
+
+    async def _typed(self, response, parse):
+        return parse(await response)
+
+    async def _typed_iter(self, items, parse):
+        async for item in items:
+            for model in parse(item):
+                yield model
+
+    async def _across_environments(self, endpoint, key, environments):
+        names = environment_names(await self.list_environments()) if environments == "*" else list(environments)
+
+        async def fetch(name):
+            try:
+                return name, environment_items(await self.get(endpoint, params={"environment": name}), key, name)
+            except Exception as e:
+                return name, e
+
+        return merge_environments(key, await asyncio.gather(*(fetch(name) for name in names)))
+
+    async def iter_pages(self, endpoint, key, page_size=100, params=None, prefetch=True):
+        """Iterates over the items of a paginated list endpoint, see Hyperstack.iter_pages."""
+
+        async def fetch(page):
+            return await self.get(endpoint, params={**(params or {}), "page": page, "pageSize": page_size})
+
+        next_response = None
+        try:
+            page, response = 1, await fetch(1)
+            while True:
+                last = is_last_page(response, key, page, page_size)
+                if prefetch and not last:
+                    next_response = asyncio.ensure_future(fetch(page + 1))
+                for item in response.get(key) or []:
+                    yield item
+                if last:
+                    return
+                page += 1
+                response = await next_response if next_response is not None else await fetch(page)
+                next_response = None
+        finally:
+            if next_response is not None:
+                next_response.cancel()
+
+    async def iter_items(self, endpoint, key, params=None, chunk_size=65536):
+        """Iterates over the items of a list endpoint, decoding the body as it arrives, see Hyperstack.iter_items."""
+        session = self._get_session()
+        parser = JSONArrayParser(key)
+        async with self._semaphore:
+            async with session.get(f"{self.base_url}{endpoint}", headers=self.headers, params=params) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    for item in parser.feed(chunk):
+                        yield item
+                    if parser.done:
+                        return
+                for item in parser.feed(b"", final=True):
+                    yield item
+
+    async def get_floating_ip(self, vm_id):
+        response = await self.retrieve_vm_details(vm_id)
+        return response['instance']['floating_ip']
+
+    async def wait_for_vm_active(
+        self, vm_id, max_attempts=4, initial_delay=20, delay=10, backoff_factor=1.5, strategy=None
+    ):
+        if strategy is not None:
+            return await self._wait_with_strategy(vm_id, strategy)
+        current_delay = initial_delay
+        await asyncio.sleep(current_delay)
+        for attempt in range(max_attempts):
+            vm_details = await self.retrieve_vm_details(vm_id)
+            status = vm_details['instance']['status']
+
+            if status == 'ACTIVE':
+                return True
+            elif status == 'ERROR':
+                raise Exception(f"VM {vm_id} entered ERROR state")
+
+            print(
+                f"Attempt {attempt + 1}/{max_attempts}: VM {vm_id} status is {status}. Waiting for {current_delay} seconds."
+            )
+            await asyncio.sleep(current_delay)
+
+            # Increase the delay for the next iteration
+            current_delay = delay + (delay * backoff_factor * attempt)
+
+        raise TimeoutError(f"VM {vm_id} did not become active within the specified time")
+
+    async def _wait_with_strategy(self, vm_id, strategy):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        instance = (await self.retrieve_vm_details(vm_id))['instance']
+        key = boot_key(instance)
+        delays = strategy.delays(key)
+        booting = instance['status'] != 'ACTIVE'
+        while not is_active(vm_id, instance):
+            delay = next(delays, None)
+            if delay is None:
+                raise TimeoutError(f"VM {vm_id} did not become active within the specified time")
+            await asyncio.sleep(delay)
+            instance = (await self.retrieve_vm_details(vm_id))['instance']
+        if booting:
+            strategy.record(key, loop.time() - start)
+        return True
+
+    async def wait_for_vms(
+        self,
+        vm_ids,
+        target_status="ACTIVE",
+        timeout=600,
+        poll_interval=10,
+        initial_delay=0,
+        raise_on_error=True,
+        environment=None,
+    ):
+        self._check_environment_set(environment)
+        pending = {str(vm_id): vm_id for vm_id in vm_ids}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+
+        while pending:
+            response = await self.list_virtual_machines(environment=environment)
+            for vm_id, instance in settled_vms(response, pending, target_status, raise_on_error):
+                yield vm_id, instance
+            if not pending:
+                return
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise wait_timeout(pending, target_status)
+            await asyncio.sleep(min(poll_interval, remaining))
+
+    async def apply_sg_rules(self, vm_ids, rules, max_workers=8, instances=None, environment=None):
+        self._check_environment_set(environment)
+        if instances is None:
+            instances = (await self.list_virtual_machines(environment=environment)).get("instances", [])
+        pending, skipped = plan_sg_rules(instances, vm_ids, rules)
+        limit = asyncio.Semaphore(max_workers)
+
+        async def apply(vm_id, rule):
+            async with limit:
+                try:
+                    return vm_id, rule, True, await self.set_sg_rules(vm_id, environment=environment, **rule)
+                except Exception as e:
+                    return vm_id, rule, False, e
+
+        return sg_rules_report(await asyncio.gather(*(apply(vm_id, rule) for vm_id, rule in pending)), skipped)
+
+    async def bulk_vm_action(
+        self,
+        action,
+        vm_ids=None,
+        labels=None,
+        max_workers=8,
+        rate_limit=None,
+        wait=False,
+        timeout=600,
+        poll_interval=10,
+        environment=None,
+        **kwargs,
+    ):
+        method, target_status = plan_bulk_action(action, vm_ids, labels)
+        self._check_environment_set(environment)
+        if labels is not None:
+            vm_ids = select_vms(await self.list_virtual_machines(environment=environment), labels)
+        function = getattr(self, method)
+        bucket = TokenBucket(rate_limit, capacity=1) if rate_limit else None
+        limit = asyncio.Semaphore(max_workers)
+
+        async def run(vm_id):
+            async with limit:
+                if bucket is not None:
+                    await asyncio.sleep(bucket.reserve())
+                try:
+                    return vm_id, True, await function(vm_id, environment=environment, **kwargs)
+                except Exception as e:
+                    return vm_id, False, e
+
+        outcomes = await asyncio.gather(*(run(vm_id) for vm_id in vm_ids))
+
+        states = None
+        if wait:
+            states = {}
+            accepted = [vm_id for vm_id, ok, _ in outcomes if ok]
+            try:
+                async for vm_id, instance in self.wait_for_vms(
+                    accepted,
+                    target_status,
+                    timeout=timeout,
+                    poll_interval=poll_interval,
+                    raise_on_error=False,
+                    environment=environment,
+                ):
+                    states[vm_id] = instance
+            except TimeoutError:
+                pass
+        return bulk_report(outcomes, states, target_status, timeout)
+
+    async def plan_placement(self, requirements=None, count=1):
+        catalogs = await asyncio.gather(self.list_flavors(), self.retrieve_gpu_stock(), self.list_images())
+        return solve_placement(PlacementCatalog(*catalogs), requirements or {}, count)
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a catalog response stays fresh. Stock changes quickly, the rest of the catalog rarely does.
+DEFAULT_TTLS = {
+    "core/stocks": 30,
+    "core/regions": 24 * 3600,
+    "core/volume-types": 24 * 3600,
+    "core/flavors": 3600,
+    "core/images": 3600,
+}
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "etag", "last_modified")
+
+    def __init__(self, value, expires_at, etag=None, last_modified=None):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self):
+        """Returns the conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    LRU cache for GET responses with per-endpoint TTLs.
+
+    Only endpoints with a TTL are cached. Once an entry expires it is revalidated with
+    If-None-Match/If-Modified-Since if the server sent an ETag or Last-Modified header, so an
+    unchanged catalog costs a 304 instead of a full download.
+
+    Cached values are shared between callers and should be treated as read-only.
+
+    With a SnapshotStore, responses are also kept on disk, so a new process answers from the stored response while
+    it is fresh and revalidates it with its ETag once it expires.
+    """
+
+    def __init__(self, ttls=None, maxsize=128, store=None):
+        """
+        :param ttls: Mapping of endpoint to TTL in seconds. Defaults to DEFAULT_TTLS.
+        :param maxsize: Maximum number of responses to keep (default 128).
+        :param store: A SnapshotStore keeping responses between processes. None keeps them in memory only.
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.maxsize = maxsize
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.restored = 0
+
+    def ttl_for(self, endpoint):
+        """Returns the TTL for an endpoint, or None if its responses are not cached."""
+        return self.ttls.get(endpoint)
+
+    def fetch(self, endpoint, params, send, decode):
+        """
+        Returns the response for a GET request to a cached endpoint, from the cache when possible.
+
+        :param endpoint: The endpoint being requested.
+        :param params: The query string parameters of the request.
+        :param send: Callable taking a dict of extra headers, which sends the request and returns the response.
+        :param decode: Callable turning a response into the value to return.
+        :return: The decoded response.
+        """
+        ttl = self.ttl_for(endpoint)
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.store is not None:
+            entry = self._restore(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            with self._lock:
+                self.hits += 1
+            return entry.value
+
+        response = send(entry.validators() if entry is not None else {})
+        if entry is not None and response.status_code == 304:
+            with self._lock:
+                entry.expires_at = time.monotonic() + ttl
+                self.revalidations += 1
+            self._persist(key, entry)
+            return entry.value
+
+        value = decode(response)
+        new_entry = CacheEntry(
+            value,
+            time.monotonic() + ttl,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = new_entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        self._persist(key, new_entry)
+        return value
+
+    def _restore(self, key):
+        stored = self.store.load_response(key)
+        if stored is None:
+            return None
+        value, expires_at, etag, last_modified = stored
+        entry = CacheEntry(value, time.monotonic() + expires_at - time.time(), etag, last_modified)
+        with self._lock:
+            self.restored += 1
+            self._entries.setdefault(key, entry)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def _persist(self, key, entry):
+        if self.store is not None:
+            expires_at = time.time() + entry.expires_at - time.monotonic()
+            self.store.save_response(key, entry.value, expires_at, entry.etag, entry.last_modified)
+
+    def invalidate(self, endpoint=None):
+        """
+        Removes cached responses.
+
+        :param endpoint: Only remove responses for this endpoint. If None, the whole cache is cleared.
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == endpoint]:
+                    del self._entries[key]
+        if self.store is not None:
+            self.store.delete_responses(endpoint)
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        :return: A dict with hits, misses, revalidations, evictions and the current size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,246 @@
+import gzip
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .transport import PooledHTTPAdapter
+
+# Headers and query parameters that are never written to a cassette
+REDACTED_HEADERS = frozenset({"api_key", "authorization", "cookie", "set-cookie", "x-api-key"})
+# Keys whose values are replaced in recorded JSON response bodies
+REDACTED_FIELDS = frozenset({"api_key", "password", "private_key", "secret", "token"})
+REDACTED = "REDACTED"
+
+_INDEX = "interactions.json.gz"
+_BODIES = "bodies.bin"
+
+
+class Cassette:
+    """
+    Request/response pairs recorded from the API, kept in a directory for replaying later without a network.
+
+    The directory holds a gzipped index of the interactions and one file with their bodies back to back. Bodies
+    smaller than ``mmap_threshold`` are stored zlib-compressed. Larger ones are stored as they are, and memory
+    mapped on replay, so a multi-MB listing is decoded straight from the page cache without being copied.
+
+    Nothing identifying the account is stored: request headers and bodies are not recorded, and the API key
+    and other secrets are removed from query strings, response headers and JSON response bodies.
+    """
+
+    def __init__(self, path, record=False, realtime=False, mmap_threshold=1 << 20):
+        """
+        :param path: The cassette directory.
+        :param record: Whether to record the requests made through the client instead of replaying them.
+        :param realtime: Whether to replay each response after its recorded latency. By default responses are
+                         returned as fast as possible.
+        :param mmap_threshold: Size in bytes from which bodies are stored uncompressed and memory mapped on replay
+                               (default 1 MiB).
+        """
+        self.path = path
+        self.record = record
+        self.realtime = realtime
+        self.mmap_threshold = mmap_threshold
+        self._lock = threading.Lock()
+        self._interactions = []
+        self._queues = None
+        self._bodies_file = None
+        self._offset = 0
+        self._map = None
+
+    def append(self, method, url, status, reason, headers, body, elapsed):
+        """Records an interaction. Its body is written out straight away, the index on save()."""
+        body = _redact_body(body)
+        if len(body) >= self.mmap_threshold:
+            encoding, data = "identity", body
+        else:
+            encoding, data = "zlib", zlib.compress(body)
+        with self._lock:
+            if self._bodies_file is None:
+                os.makedirs(self.path, exist_ok=True)
+                # Appended to when the adapter was closed in between, e.g. to drop idle connections
+                self._bodies_file = open(os.path.join(self.path, _BODIES), "ab" if self._offset else "wb")
+            offset = self._offset
+            self._bodies_file.write(data)
+            self._offset += len(data)
+            self._interactions.append(
+                {
+                    "method": method,
+                    "url": _redact_url(url),
+                    "status": status,
+                    "reason": reason,
+                    "headers": {name: value for name, value in headers.items() if name.lower() not in REDACTED_HEADERS},
+                    "elapsed": round(elapsed, 6),
+                    "body": [offset, len(data), encoding],
+                }
+            )
+
+    def save(self):
+        """Writes the index of the recorded interactions."""
+        with self._lock:
+            if self._bodies_file is None:
+                return
+            self._bodies_file.flush()
+            with gzip.open(os.path.join(self.path, _INDEX), "wt") as f:
+                json.dump(self._interactions, f)
+
+    def close(self):
+        """Writes the index of a recording and closes its files, or unmaps the bodies of a replay."""
+        if self.record:
+            self.save()
+            with self._lock:
+                if self._bodies_file is not None:
+                    self._bodies_file.close()
+                    self._bodies_file = None
+            return
+        with self._lock:
+            if isinstance(self._map, mmap.mmap):
+                try:
+                    self._map.close()
+                except BufferError:
+                    # Bodies handed out still point into it, and it's unmapped once the last one is released
+                    pass
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _load(self):
+        if self._queues is None:
+            with gzip.open(os.path.join(self.path, _INDEX), "rt") as f:
+                interactions = json.load(f)
+            queues = {}
+            for interaction in interactions:
+                queues.setdefault(_match_key(interaction["method"], interaction["url"]), deque()).append(interaction)
+            self._queues = queues
+        return self._queues
+
+    def _bodies(self):
+        # Mapped again after close(), e.g. when the adapter dropped its connections in between
+        if self._map is None:
+            with open(os.path.join(self.path, _BODIES), "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        return self._map
+
+    def next(self, method, url):
+        """
+        Returns the next recorded interaction for a request and its body.
+
+        Requests to the same method, path and query are answered in the order they were recorded. Once only the
+        last one is left it answers every further request, as a poll would see the final state again.
+
+        :raises LookupError: If no request like it was recorded.
+        """
+        with self._lock:
+            queue = self._load().get(_match_key(method, _redact_url(url)))
+            if not queue:
+                raise LookupError(f"No recorded response for {method} {url} in {self.path}")
+            interaction = queue.popleft() if len(queue) > 1 else queue[0]
+            return interaction, self._body(interaction)
+
+    def interactions(self):
+        """Yields every recorded interaction and its body, in the order they were recorded."""
+        with gzip.open(os.path.join(self.path, _INDEX), "rt") as f:
+            interactions = json.load(f)
+        for interaction in interactions:
+            with self._lock:
+                body = self._body(interaction)
+            yield interaction, body
+
+    def _body(self, interaction):
+        offset, length, encoding = interaction["body"]
+        data = memoryview(self._bodies())[offset : offset + length]
+        if encoding == "zlib":
+            data = zlib.decompress(data)
+        return data
+
+
+class CassetteAdapter(PooledHTTPAdapter):
+    """HTTP adapter recording the requests sent through it to a Cassette, or answering them from one."""
+
+    def __init__(self, cassette, *args, **kwargs):
+        self.cassette = cassette
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        if self.cassette.record:
+            started = time.monotonic()
+            response = super().send(request, stream=stream, **kwargs)
+            # Reading the body here keeps it available to the caller, streamed or not
+            body = response.content
+            self.cassette.append(
+                request.method,
+                request.url,
+                response.status_code,
+                response.reason,
+                response.headers,
+                body,
+                time.monotonic() - started,
+            )
+            return response
+
+        with self._stats_lock:
+            self.requests_sent += 1
+        interaction, body = self.cassette.next(request.method, request.url)
+        if self.cassette.realtime:
+            time.sleep(interaction["elapsed"])
+        response = Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction["reason"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        super().close()
+        self.cassette.close()
+
+
+def _redact_url(url):
+    parts = urlsplit(url)
+    query = [
+        (name, REDACTED if name.lower() in REDACTED_HEADERS else value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return parts.path + ("?" + "&".join(f"{name}={value}" for name, value in sorted(query)) if query else "")
+
+
+def _match_key(method, url):
+    return f"{method} {url}"
+
+
+def _redact_body(body):
+    if not any(f'"{field}"'.encode() in body for field in REDACTED_FIELDS):
+        return body
+    try:
+        value = json.loads(body)
+    except ValueError:
+        return body
+    return json.dumps(_redact_value(value)).encode()
+
+
+def _redact_value(value):
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key.lower() in REDACTED_FIELDS and item is not None else _redact_value(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_value(item) for item in value]
+    return value
@@ -1,12 +1,31 @@
-import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
-from .api import environments, flavors, images, network, profiles, regions, stock, virtual_machines, volumes
+from .api import environments, flavors, images, network, placement, profiles, regions, stock, virtual_machines, volumes
+from .api.environments import environment_items, environment_names, merge_environments
+from .cache import ResponseCache
+from .cassette import CassetteAdapter
+from .codecs import get_codec
+from .context import scoped_environment
+from .inventory import Inventory
+from .pagination import JSONArrayParser, is_last_page
+from .snapshot import SnapshotStore
+from .transport import PooledHTTPAdapter, RetryPolicy, SingleFlight, TokenBucket
 
 
-class Hyperstack:
+class _HyperstackBase:
+    """
+    Configuration and API methods shared by the sync and async clients.
+
+    The functions in the api modules only build a payload and hand it to ``self.get``/``post``/``put``/``delete``.
+    Forwarding them here means both clients use the same payload-building code: on the sync client they
+    return the decoded response, on the async client they return an awaitable of it.
+    """
+
     def __init__(self, api_key=None):
         self.api_key = api_key or os.environ.get("HYPERSTACK_API_KEY")
         if not self.api_key:
@@ -16,35 +35,23 @@ class Hyperstack:
         self.valid_regions = ["NORWAY-1", "CANADA-1"]
         self.environment = None
 
-    def _check_environment_set(self):
-        if self.environment is None:
-            raise EnvironmentError("Environment is not set. Please set the environment using set_environment().")
+    @property
+    def environment(self):
+        """The current environment: the one set with using_environment in this context, else set_environment's."""
+        return scoped_environment(self) or self._environment
 
-    def _request(self, method, endpoint, **kwargs):
-        url = f"{self.base_url}{endpoint}"
-        response = requests.request(method, url, headers=self.headers, **kwargs)
-        response.raise_for_status()
-        return response
-
-    def get(self, endpoint, **kwargs):
-        """Send a GET request."""
-        return json.loads(self._request("GET", endpoint, **kwargs).content)
+    @environment.setter
+    def environment(self, environment_name):
+        self._environment = environment_name
 
-    def post(self, endpoint, data=None, **kwargs):
-        """Send a POST request."""
-        return json.loads(self._request("POST", endpoint, json=data, **kwargs).content)
-
-    def put(self, endpoint, data=None, **kwargs):
-        """Send a PUT request."""
-        return json.loads(self._request("PUT", endpoint, json=data, **kwargs).content)
-
-    def delete(self, endpoint, **kwargs):
-        """Send a DELETE request."""
-        return json.loads(self._request("DELETE", endpoint, **kwargs).content)
+    def _check_environment_set(self, environment=None):
+        if environment is None and self.environment is None:
+            raise EnvironmentError("Environment is not set. Please set the environment using set_environment().")
 
     # Forward methods from profiles module
     create_profile = profiles.create_profile
     list_profiles = profiles.list_profiles
+    iter_profiles = profiles.iter_profiles
     retrieve_profile = profiles.retrieve_profile
     delete_profile = profiles.delete_profile
 
@@ -57,6 +64,7 @@ class Hyperstack:
     list_environments = environments.list_environments
     get_environment = environments.get_environment
     set_environment = environments.set_environment
+    using_environment = environments.using_environment
     delete_environment = environments.delete_environment
     update_environment = environments.update_environment
 
@@ -66,6 +74,7 @@ class Hyperstack:
 
     # Forward methods from images module
     list_images = images.list_images
+    iter_images = images.iter_images
     get_image_enum = images.get_image_enum
 
     # Forward methods from network module
@@ -82,6 +91,7 @@ class Hyperstack:
     # Forward methods from virtual_machines module
     create_vm = virtual_machines.create_vm
     list_virtual_machines = virtual_machines.list_virtual_machines
+    iter_virtual_machines = virtual_machines.iter_virtual_machines
     retrieve_vm_details = virtual_machines.retrieve_vm_details
     start_virtual_machine = virtual_machines.start_virtual_machine
     stop_virtual_machine = virtual_machines.stop_virtual_machine
@@ -91,12 +101,321 @@ class Hyperstack:
     delete_virtual_machine = virtual_machines.delete_virtual_machine
     resize_virtual_machine = virtual_machines.resize_virtual_machine
     update_virtual_machine_labels = virtual_machines.update_virtual_machine_labels
-    get_floating_ip = virtual_machines.get_floating_ip
-    wait_for_vm_active = virtual_machines.wait_for_vm_active
 
     # Forward methods from volumes module
     create_volume = volumes.create_volume
     list_volumes = volumes.list_volumes
+    iter_volumes = volumes.iter_volumes
     list_volume_types = volumes.list_volume_types
     get_volume = volumes.get_volume
     delete_volume = volumes.delete_volume
+
+
+class Hyperstack(_HyperstackBase):
+    def __init__(
+        self,
+        api_key=None,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        idle_timeout=None,
+        cache=True,
+        retry=True,
+        rate_limit=None,
+        coalesce=True,
+        codec=None,
+        inventory=True,
+        instrumentation=None,
+        snapshot=None,
+        cassette=None,
+    ):
+        """
+        Creates a client for the Hyperstack API.
+
+        Requests are sent through a pooled session, so consecutive calls to the same host reuse
+        an open keep-alive connection instead of paying a new TCP and TLS handshake every time.
+
+        :param api_key: The API key. Defaults to the HYPERSTACK_API_KEY environment variable.
+        :param pool_connections: Number of per-host connection pools to keep (default 10).
+        :param pool_maxsize: Maximum number of connections kept open per host (default 10).
+        :param pool_block: Whether to block when all connections to a host are in use instead of
+                           opening a temporary one (default False).
+        :param keep_alive: Whether to keep connections open between requests (default True).
+        :param idle_timeout: Seconds a pooled connection may sit idle before it is dropped instead of
+                             reused. None keeps idle connections until the server closes them.
+        :param cache: Response cache for catalog endpoints. True uses a ResponseCache with the default TTLs,
+                      False or None disables caching, or pass your own ResponseCache.
+        :param retry: Retry policy for failed requests. True uses a RetryPolicy with the defaults, False or None
+                      disables retries, or pass your own RetryPolicy.
+        :param rate_limit: Maximum number of requests per second, shared by all threads using the client.
+                           Pass a number, your own TokenBucket, or None for no limit.
+        :param coalesce: Whether concurrent identical GET requests share a single in-flight request (default True).
+        :param codec: JSON codec for request and response bodies: a JSONCodec, "orjson", "ujson" or "json".
+                      Defaults to the fastest one installed.
+        :param inventory: Index of resources by name, label and environment, kept up to date by the requests made
+                          through this client. True uses an Inventory with the default max age, False or None
+                          disables it, or pass your own Inventory.
+        :param instrumentation: An Instrumentation recording latency histograms, status and error counters and
+                                running hooks around every request. None (the default) records nothing.
+        :param snapshot: A SnapshotStore keeping the inventory and the cached catalog responses on disk, so that a
+                         new process starts warm. Pass a path to an SQLite file, True for default_snapshot_path(),
+                         or None (the default) to keep them in memory only.
+        :param cassette: A Cassette to record the requests made by this client to, or to answer them from instead
+                         of the API, for tests and profiling without a network. None (the default) sends every
+                         request to the API.
+        """
+        super().__init__(api_key)
+        self.idle_timeout = idle_timeout
+        pool = {"pool_connections": pool_connections, "pool_maxsize": pool_maxsize, "pool_block": pool_block}
+        self._pool_maxsize = pool_maxsize
+        self._adapter = CassetteAdapter(cassette, **pool) if cassette is not None else PooledHTTPAdapter(**pool)
+        self._session = requests.Session()
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+        if not keep_alive:
+            self._session.headers["Connection"] = "close"
+        self._idle_lock = threading.Lock()
+        self._last_request_at = None
+        self.cache = ResponseCache() if cache is True else (cache or None)
+        self.retry = RetryPolicy() if retry is True else (retry or None)
+        if isinstance(rate_limit, (int, float)):
+            rate_limit = TokenBucket(rate_limit)
+        self.rate_limiter = rate_limit
+        self._counters_lock = threading.Lock()
+        self._counters = {"retries": 0, "throttled": 0, "rate_limited": 0, "rate_limit_wait": 0.0}
+        self._single_flight = SingleFlight() if coalesce else None
+        self.codec = get_codec(codec)
+        self.inventory = Inventory() if inventory is True else (inventory or None)
+        if self.inventory is not None and self.inventory.client is None:
+            self.inventory.client = self
+        self.instrumentation = instrumentation
+        if snapshot is not None and snapshot is not False:
+            if not isinstance(snapshot, SnapshotStore):
+                snapshot = SnapshotStore(None if snapshot is True else snapshot, codec=self.codec)
+            snapshot.set_api_key(self.api_key)
+            for component in (self.cache, self.inventory):
+                if component is not None and component.store is None:
+                    component.store = snapshot
+        self.snapshot = snapshot or None
+        # The catalog responses plan_placement last joined, and their PlacementCatalog
+        self._placement_catalog = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes all pooled connections held by the client."""
+        self._session.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    def transport_stats(self):
+        """
+        Returns counters describing how the client's connections have been used.
+
+        :return: A dict with the number of requests sent, new connections opened and connections reused,
+                 the number of retries, of 429 responses ("throttled"), of requests held back by the rate
+                 limiter ("rate_limited"), the total seconds they waited ("rate_limit_wait") and the number of
+                 GET requests served by an identical request already in flight ("coalesced").
+        """
+        coalesced = self._single_flight.coalesced if self._single_flight is not None else 0
+        with self._counters_lock:
+            return {**self._adapter.stats(), **self._counters, "coalesced": coalesced}
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def _drop_idle_connections(self):
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        with self._idle_lock:
+            if self._last_request_at is not None and now - self._last_request_at > self.idle_timeout:
+                self._adapter.close()
+            self._last_request_at = now
+
+    def _request(self, method, endpoint, **kwargs):
+        url = f"{self.base_url}{endpoint}"
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        if "json" in kwargs:
+            body = kwargs.pop("json")
+            if body is not None:
+                kwargs["data"] = self.codec.dumps(body)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire()
+                if waited:
+                    self._count("rate_limited")
+                    self._count("rate_limit_wait", waited)
+            self._drop_idle_connections()
+            try:
+                response = self._send(method, endpoint, url, headers, kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.retry is None or not self.retry.should_retry(method, attempt):
+                    raise
+                delay = self.retry.backoff(attempt)
+            else:
+                if response.status_code == 429:
+                    self._count("throttled")
+                if self.retry is None or not self.retry.should_retry(method, attempt, response):
+                    response.raise_for_status()
+                    return response
+                delay = self.retry.backoff(attempt, response)
+                # Release the connection of a streamed response before trying again
+                response.close()
+                if response.status_code == 429 and self.rate_limiter is not None:
+                    # Hold back every thread sharing the limiter, this one included, until the server is ready
+                    self.rate_limiter.pause(delay)
+                    delay = 0
+            self._count("retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def _send(self, method, endpoint, url, headers, kwargs):
+        if self.instrumentation is None:
+            return self._session.request(method, url, headers=headers, **kwargs)
+        info = self.instrumentation.start(method, endpoint)
+        try:
+            response = self._session.request(method, url, headers=headers, **kwargs)
+        except Exception as e:
+            self.instrumentation.finish(info, error=e)
+            raise
+        self.instrumentation.finish(info, response=response)
+        return response
+
+    def get(self, endpoint, **kwargs):
+        """
+        Send a GET request.
+
+        Responses from catalog endpoints are served from the cache when fresh, and concurrent identical
+        requests share one in-flight request and its decoded response.
+        """
+        if self._single_flight is None or set(kwargs) - {"params"}:
+            return self._get(endpoint, **kwargs)
+        try:
+            key = (endpoint, tuple(sorted((kwargs.get("params") or {}).items())))
+            hash(key)
+        except TypeError:
+            return self._get(endpoint, **kwargs)
+        return self._single_flight.do(key, lambda: self._get(endpoint, **kwargs))
+
+    def _get(self, endpoint, **kwargs):
+        if self.cache is None or self.cache.ttl_for(endpoint) is None:
+            return self.codec.loads(self._request("GET", endpoint, **kwargs).content)
+        return self.cache.fetch(
+            endpoint,
+            kwargs.get("params"),
+            lambda headers: self._request("GET", endpoint, headers=headers, **kwargs),
+            lambda response: self.codec.loads(response.content),
+        )
+
+    def post(self, endpoint, data=None, **kwargs):
+        """Send a POST request."""
+        response = self.codec.loads(self._request("POST", endpoint, json=data, **kwargs).content)
+        self._observe("POST", endpoint, data, response)
+        return response
+
+    def put(self, endpoint, data=None, **kwargs):
+        """Send a PUT request."""
+        response = self.codec.loads(self._request("PUT", endpoint, json=data, **kwargs).content)
+        self._observe("PUT", endpoint, data, response)
+        return response
+
+    def delete(self, endpoint, **kwargs):
+        """Send a DELETE request."""
+        response = self.codec.loads(self._request("DELETE", endpoint, **kwargs).content)
+        self._observe("DELETE", endpoint, None, response)
+        return response
+
+    def _observe(self, method, endpoint, data, response):
+        if self.inventory is not None and isinstance(response, dict):
+            self.inventory.observe(method, endpoint, data, response)
+
+    def _typed(self, response, parse):
+        return parse(response)
+
+    def _typed_iter(self, items, parse):
+        for item in items:
+            yield from parse(item)
+
+    def _across_environments(self, endpoint, key, environments):
+        names = environment_names(self.list_environments()) if environments == "*" else list(environments)
+
+        def fetch(name):
+            try:
+                return name, environment_items(self.get(endpoint, params={"environment": name}), key, name)
+            except Exception as e:
+                return name, e
+
+        if not names:
+            return merge_environments(key, [])
+        # One request per environment at once, each over its own pooled connection
+        with ThreadPoolExecutor(max_workers=min(len(names), self._pool_maxsize)) as executor:
+            return merge_environments(key, executor.map(fetch, names))
+
+    def iter_pages(self, endpoint, key, page_size=100, params=None, prefetch=True):
+        """
+        Iterates over the items of a paginated list endpoint, requesting one page at a time.
+
+        :param endpoint: The list endpoint, e.g. "core/virtual-machines".
+        :param key: The key holding the list of items in each page, e.g. "instances".
+        :param page_size: The number of items to request per page (default 100).
+        :param params: Additional query parameters.
+        :param prefetch: Whether to request the next page in the background while the caller processes
+                         the current one (default True).
+        :return: A generator of items.
+        """
+
+        def fetch(page):
+            return self.get(endpoint, params={**(params or {}), "page": page, "pageSize": page_size})
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page, response = 1, fetch(1)
+            while True:
+                last = is_last_page(response, key, page, page_size)
+                next_response = executor.submit(fetch, page + 1) if executor is not None and not last else None
+                yield from response.get(key) or []
+                if last:
+                    return
+                page += 1
+                response = next_response.result() if next_response is not None else fetch(page)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def iter_items(self, endpoint, key, params=None, chunk_size=65536):
+        """
+        Iterates over the items of a list endpoint that returns everything in one body, decoding the body
+        incrementally as it is received instead of loading it whole.
+
+        :param endpoint: The list endpoint, e.g. "core/profiles".
+        :param key: The top-level key holding the list of items, e.g. "profiles".
+        :param params: Query parameters.
+        :param chunk_size: The number of bytes read from the connection at a time (default 64 KiB).
+        :return: A generator of items.
+        """
+        response = self._request("GET", endpoint, params=params, stream=True)
+        parser = JSONArrayParser(key)
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                yield from parser.feed(chunk)
+                if parser.done:
+                    return
+            yield from parser.feed(b"", final=True)
+        finally:
+            response.close()
+
+    # Forward methods that post-process a response, which the async client implements separately
+    get_floating_ip = virtual_machines.get_floating_ip
+    wait_for_vm_active = virtual_machines.wait_for_vm_active
+    wait_for_vms = virtual_machines.wait_for_vms
+    bulk_vm_action = virtual_machines.bulk_vm_action
+    apply_sg_rules = network.apply_sg_rules
+    plan_placement = placement.plan_placement
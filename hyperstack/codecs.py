@@ -0,0 +1,90 @@
+import json
+from abc import ABC, abstractmethod
+
+
+class JSONCodec(ABC):
+    """
+    Encodes request bodies and decodes response bodies.
+
+    Subclasses decode directly from the bytes of the response body, so a large response is never copied into
+    an intermediate str when the underlying parser can read bytes.
+    """
+
+    name = "json"
+
+    @abstractmethod
+    def loads(self, data):
+        """Decodes a JSON document from bytes, bytearray or memoryview."""
+
+    @abstractmethod
+    def dumps(self, obj):
+        """Encodes an object to JSON bytes."""
+
+
+class StdlibCodec(JSONCodec):
+    name = "json"
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj).encode()
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+
+class UjsonCodec(JSONCodec):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+
+    def loads(self, data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return self._ujson.loads(data)
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False).encode()
+
+
+CODECS = {"orjson": OrjsonCodec, "ujson": UjsonCodec, "json": StdlibCodec}
+
+
+def get_codec(codec=None):
+    """
+    Returns a JSON codec.
+
+    :param codec: A JSONCodec instance, the name of a codec ("orjson", "ujson" or "json"), or None to use the
+                  fastest installed codec.
+    :return: A JSONCodec instance.
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is not None:
+        if codec not in CODECS:
+            raise ValueError(f"Invalid codec specified. Use one of: {', '.join(CODECS)}")
+        return CODECS[codec]()
+    for codec_class in CODECS.values():
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+    return StdlibCodec()
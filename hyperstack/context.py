@@ -0,0 +1,33 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Environments set with using_environment in the current thread or task, by id() of the client. A mapping
+# replaced on every change, so that each scope only sees its own and its callers' environments.
+_scoped_environments = contextvars.ContextVar("hyperstack_scoped_environments", default=None)
+
+
+def scoped_environment(client):
+    """Returns the environment set for a client with using_environment in the current context, or None."""
+    scoped = _scoped_environments.get()
+    return scoped.get(id(client)) if scoped else None
+
+
+def push_environment(client, environment):
+    """Sets the environment of a client in the current context. Returns a token for pop_environment."""
+    return _scoped_environments.set({**(_scoped_environments.get() or {}), id(client): environment})
+
+
+def pop_environment(token):
+    _scoped_environments.reset(token)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Thread pool running each task in a copy of the context it was submitted from.
+
+    Worker threads don't inherit context variables, so without this a using_environment scope would not reach
+    the calls a pool makes on its caller's behalf.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
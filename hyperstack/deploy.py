@@ -1,8 +1,329 @@
+import http.client
+import socket
 import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
 
 import hyperstack
 
+from .context import ContextThreadPoolExecutor
+
+SSH_RULE = {"port_range_min": 22, "port_range_max": 22}
+ICMP_RULE = {"protocol": "icmp"}
+OLLAMA_RULE = {"port_range_min": 11434, "port_range_max": 11434}
+JUPYTER_PORT = 8888
+OLLAMA_PORT = 11434
+
+OLLAMA_USER_DATA = "#!/bin/bash\n\n# Set up docker\n\n## Add Docker's official GPG key:\nsudo apt-get update\nsudo apt-get install -y ca-certificates curl gnupg\nsudo install -m 0755 -d /etc/apt/keyrings\ncurl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --yes --dearmor -o /etc/apt/keyrings/docker.gpg\nsudo chmod a+r /etc/apt/keyrings/docker.gpg\n\n## Add the repository to Apt sources:\necho \\\n\"deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] https://download.docker.com/linux/ubuntu \\\n$(. /etc/os-release && echo $VERSION_CODENAME) stable\" | \\\nsudo tee /etc/apt/sources.list.d/docker.list > /dev/null\nsudo apt-get update\n\n## Install docker\nsudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin\n\n## Add docker group to ubuntu user\nsudo usermod -aG docker ubuntu\nsudo usermod -aG docker $USER\n\nsudo apt-get install nvidia-container-toolkit -y\n\n## Configure docker\n\nsudo nvidia-ctk runtime configure --runtime=docker\n\nsudo systemctl restart docker\n\nnewgrp docker\ndocker run -d --gpus all -v /usr/lib/x86_64-linux-gnu:/usr/lib/x86_64-linux-gnu -v /usr/bin/nvidia-smi:/usr/bin/nvidia-smi -v ollama:/root/.ollama -p 11434:11434 -e OLLAMA_HOST=0.0.0.0 --name ollama ollama/ollama"
+
+
+def _apply_sg_rules(instance, rules):
+    # The VM record from the wait for it to be active has its current rules, so no VMs need to be listed
+    report = hyperstack.apply_sg_rules([instance["id"]], rules, instances=[instance])
+    if report["failed"]:
+        raise report["failed"][0]["error"]
+
+
+def _probe_rules(rules, probes):
+    # Open the ports the probes connect to, or they could never pass
+    ports = {rule.get("port_range_min") for rule in rules}
+    extra = []
+    for probe in probes or ():
+        port = getattr(probe, "port", None)
+        if port is not None and port not in ports:
+            ports.add(port)
+            extra.append({"port_range_min": port, "port_range_max": port})
+    return list(rules) + extra
+
+
+def _report(progress, name, phase, vm_id=None):
+    if progress is not None:
+        progress(name, phase, vm_id)
+
+
+@contextmanager
+def _timed(phase, timings, instrumentation):
+    if instrumentation is None:
+        # Record into the module-level client's instrumentation, if it has one
+        instrumentation = getattr(hyperstack._hyperstack, "instrumentation", None)
+    start = time.monotonic()
+    yield
+    duration = time.monotonic() - start
+    if timings is not None:
+        timings[phase] = duration
+    if instrumentation is not None:
+        instrumentation.record_phase(phase, duration)
+
+
+def _wait_until(probe, message, poll_interval, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        value = probe()
+        if value:
+            return value
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"{message} within {timeout} seconds")
+        time.sleep(poll_interval)
+
+
+def _vm_active(vm_id):
+    instance = hyperstack.retrieve_vm_details(vm_id)['instance']
+    if instance['status'] == 'ERROR':
+        raise Exception(f"VM {vm_id} entered ERROR state")
+    return instance if instance['status'] == 'ACTIVE' else None
+
+
+class Pipeline:
+    """
+    Runs named steps as soon as the steps they come after are done, independent steps at the same time.
+
+    Each step is called with a dict of the results of the steps that finished before it started, and the
+    time it takes is recorded like a deployment phase. The first step to fail stops new steps from starting,
+    and its error is raised once the running steps are done.
+    """
+
+    def __init__(self):
+        self.steps = {}
+
+    def add(self, name, func, after=()):
+        """
+        Adds a step.
+
+        :param name: The name of the step, also used for its timing.
+        :param func: Called as func(results) with the results of the finished steps by name.
+        :param after: Names of the steps that must finish first. They must already be added.
+        :return: The pipeline, so that calls can be chained.
+        """
+        unknown = [step for step in after if step not in self.steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' comes after unknown steps: {', '.join(unknown)}")
+        self.steps[name] = (func, tuple(after))
+        return self
+
+    def run(self, timings=None, instrumentation=None):
+        """
+        Runs all steps.
+
+        :param timings: Optional dict, filled with the seconds taken by each step.
+        :param instrumentation: Instrumentation recording the duration of each step. Defaults to the
+                                instrumentation of the module-level client, if any.
+        :return: A dict of the results of the steps by name.
+        """
+        results = {}
+        pending = dict(self.steps)
+        running = {}
+        error = None
+        with ContextThreadPoolExecutor(max_workers=max(len(self.steps), 1)) as executor:
+            while running or (pending and error is None):
+                if error is None:
+                    for name, (func, after) in list(pending.items()):
+                        if all(step in results for step in after):
+                            del pending[name]
+                            future = executor.submit(_run_step, name, func, dict(results), timings, instrumentation)
+                            running[future] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        error = error or e
+        if error is not None:
+            raise error
+        return results
+
+
+@dataclass
+class TCPProbe:
+    """Ready once a TCP connection to the port is accepted."""
+
+    port: int
+
+    def __call__(self, host, timeout=5):
+        try:
+            with socket.create_connection((host, self.port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+
+@dataclass
+class HTTPProbe:
+    """Ready once a GET on the port is answered with a status below 500, so a login redirect counts."""
+
+    port: int
+    path: str = "/"
+
+    def __call__(self, host, timeout=5):
+        connection = http.client.HTTPConnection(host, self.port, timeout=timeout)
+        try:
+            connection.request("GET", self.path)
+            return connection.getresponse().status < 500
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            connection.close()
+
+
+@dataclass
+class SSHProbe:
+    """Ready once the SSH server sends its version banner."""
+
+    port: int = 22
+
+    def __call__(self, host, timeout=5):
+        try:
+            with socket.create_connection((host, self.port), timeout=timeout) as connection:
+                return connection.recv(256).startswith(b"SSH-")
+        except OSError:
+            return False
+
+
+SERVICE_PROBES = {
+    "pytorch": [SSHProbe(), HTTPProbe(JUPYTER_PORT)],
+    "ollama": [SSHProbe(), HTTPProbe(OLLAMA_PORT)],
+}
+
+
+class ServiceNotReadyError(TimeoutError):
+    """Raised when the services of a deployed VM don't answer in time. The VM is left running."""
+
+    def __init__(self, message, vm_id, floating_ip):
+        super().__init__(message)
+        self.vm_id = vm_id
+        self.floating_ip = floating_ip
+
+
+def wait_until_ready(host, probes, timeout=900, delay=2, max_delay=30, backoff_factor=2, probe_timeout=5):
+    """
+    Waits until the services of a VM answer, e.g. after its Docker image has been pulled.
+
+    :param host: The floating IP or host name of the VM.
+    :param probes: Callables run as probe(host, timeout) until they return True, one after the other, e.g.
+                   [SSHProbe(), HTTPProbe(11434)]. SERVICE_PROBES has the probes of each deployment type.
+    :param timeout: Maximum number of seconds to wait for all probes (default 900).
+    :param delay: Seconds to wait after the first failed attempt of a probe (default 2).
+    :param max_delay: Maximum number of seconds between attempts (default 30).
+    :param backoff_factor: Factor the delay grows by after each failed attempt (default 2).
+    :param probe_timeout: Seconds each attempt may take (default 5).
+    :return: The seconds it took until all probes passed.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    for probe in probes:
+        current_delay = delay
+        while not probe(host, timeout=probe_timeout):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{probe} did not pass on {host} within {timeout} seconds")
+            time.sleep(min(current_delay, remaining))
+            current_delay = min(current_delay * backoff_factor, max_delay)
+    return time.monotonic() - start
+
+
+def wait_for_services(hosts, probes, max_workers=32, **kwargs):
+    """
+    Waits for the services of many VMs at once.
+
+    :param hosts: The floating IPs or host names of the VMs.
+    :param probes: The probes to run on each host, see wait_until_ready.
+    :param max_workers: Maximum number of hosts probed at the same time (default 32).
+    :param kwargs: Passed on to wait_until_ready, e.g. timeout.
+    :return: A report dict with "ready" and "failed" lists. Each entry is a dict with the "host", plus the
+             "seconds" it took for ready hosts or the "error" for failed ones.
+    """
+
+    def probe(host):
+        try:
+            return host, wait_until_ready(host, probes, **kwargs), None
+        except Exception as e:
+            return host, None, e
+
+    report = {"ready": [], "failed": []}
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        for host, seconds, error in executor.map(probe, hosts):
+            if error is None:
+                report["ready"].append({"host": host, "seconds": seconds})
+            else:
+                report["failed"].append({"host": host, "error": error})
+    return report
+
+
+def _run_step(name, func, results, timings, instrumentation):
+    with _timed(name, timings, instrumentation):
+        return func(results)
+
+
+def _deploy_vm(
+    name,
+    flavor_name,
+    key_name,
+    image_name,
+    user_data,
+    rules,
+    progress,
+    timings,
+    instrumentation,
+    poll_interval,
+    timeout,
+    probes=None,
+    ready_timeout=900,
+):
+    def create(results):
+        _report(progress, name, "creating")
+        response = hyperstack.create_vm(
+            name=name,
+            image_name=image_name,
+            flavor_name=flavor_name,
+            assign_floating_ip=True,
+            key_name=key_name,
+            user_data=results["user-data"],
+        )
+        vm_id = response['instances'][0]['id']
+        print(f"Booting {vm_id}")
+        _report(progress, name, "booting", vm_id)
+        return vm_id
+
+    def wait_active(results):
+        vm_id = results["create"]
+        instance = _wait_until(lambda: _vm_active(vm_id), f"VM {vm_id} did not become active", poll_interval, timeout)
+        print(f"Machine {vm_id} Ready")
+        _report(progress, name, "configuring", vm_id)
+        return instance
+
+    def floating_ip(results):
+        vm_id = results["create"]
+        return _wait_until(
+            lambda: hyperstack.get_floating_ip(vm_id), f"VM {vm_id} got no floating IP", poll_interval, timeout
+        )
+
+    def service_ready(results):
+        vm_id, host = results["create"], results["floating-ip"]
+        try:
+            return wait_until_ready(host, probes, timeout=ready_timeout)
+        except TimeoutError as e:
+            raise ServiceNotReadyError(f"VM {vm_id} is running but not ready: {e}", vm_id, host) from e
+
+    rules = _probe_rules(rules, probes)
+
+    pipeline = Pipeline()
+    pipeline.add("user-data", lambda results: user_data())
+    pipeline.add("create", create, after=["user-data"])
+    pipeline.add("wait-active", wait_active, after=["create"])
+    # The rules and the floating IP only need an active VM, so they're set up at the same time
+    pipeline.add("sg-rules", lambda results: _apply_sg_rules(results["wait-active"], rules), after=["wait-active"])
+    pipeline.add("floating-ip", floating_ip, after=["wait-active"])
+    if probes:
+        pipeline.add("service-ready", service_ready, after=["sg-rules", "floating-ip"])
+    results = pipeline.run(timings, instrumentation)
+
+    print(f"Public IP: {results['floating-ip']}")
+    _report(progress, name, "ready", results["create"])
+    return results["create"], results["floating-ip"]
+
 
 def create_pytorch_vm(
     name,
@@ -13,11 +334,33 @@ def create_pytorch_vm(
     username=None,
     password=None,
     docker_image=None,
+    progress=None,
+    timings=None,
+    instrumentation=None,
+    poll_interval=5,
+    timeout=600,
+    wait_ready=False,
+    ready_timeout=900,
 ):
     """
     password is the password created for the user within the Docker container. It's randomly generated and printed out in the std out if not entered.
+
+    progress is an optional callable, called as progress(name, phase, vm_id) when the deployment moves to the
+    "creating", "booting", "configuring" and "ready" phases.
+
+    The deployment runs as a Pipeline: the security rules and the floating IP are set up at the same time once
+    the VM is active. The VM status and the floating IP are polled every poll_interval seconds until they're
+    ready, for at most timeout seconds each.
+
+    timings is an optional dict, filled with the seconds taken by the "user-data", "create", "wait-active",
+    "sg-rules" and "floating-ip" steps. The same durations are recorded by instrumentation, which defaults to
+    the instrumentation of the module-level client.
+
+    With wait_ready, the deployment only returns once SSH and Jupyter answer, for at most ready_timeout seconds,
+    which adds a "service-ready" step and opens the Jupyter port for the probe. Otherwise they come up some
+    minutes after it returns. If they don't answer in time, ServiceNotReadyError is raised with the vm_id and
+    floating_ip of the VM, which is left running.
     """
-    hyperstack.set_environment(environment)
     if password is None:
         USER_PASSWORD = uuid.uuid4()
     else:
@@ -33,62 +376,151 @@ def create_pytorch_vm(
     else:
         DOCKER_IMAGE = docker_image
 
-    response = hyperstack.create_vm(
-        name=name,
-        image_name=image_name,
-        flavor_name=flavor_name,
-        assign_floating_ip=True,
-        key_name=key_name,
-        user_data=f"#!/bin/bash\n\n# Set up docker\n\n## Add Docker's official GPG key:\nsudo apt-get update\nsudo apt-get install -y ca-certificates curl gnupg\nsudo install -m 0755 -d /etc/apt/keyrings\ncurl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --yes --dearmor -o /etc/apt/keyrings/docker.gpg\nsudo chmod a+r /etc/apt/keyrings/docker.gpg\n\n## Add the repository to Apt sources:\necho \\\n\"deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] https://download.docker.com/linux/ubuntu \\\n$(. /etc/os-release && echo $VERSION_CODENAME) stable\" | \\\nsudo tee /etc/apt/sources.list.d/docker.list > /dev/null\nsudo apt-get update\n\n## Install docker\nsudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin\n\n## Add docker group to ubuntu user\nsudo usermod -aG docker ubuntu\nsudo usermod -aG docker $USER\n\nsudo apt-get install nvidia-container-toolkit -y\n\n## Configure docker\n\nsudo nvidia-ctk runtime configure --runtime=docker\n\nsudo systemctl restart docker\n\n# New verification step\necho 'Verifying NVIDIA runtime...'\nmax_attempts=6\nattempt=0\nwhile ! docker info | grep -i nvidia > /dev/null; do\n    attempt=$((attempt+1))\n    if [ $attempt -eq $max_attempts ]; then\n        echo 'NVIDIA runtime not detected after $max_attempts attempts. Please check your installation.'\n        exit 1\n    fi\n    echo 'NVIDIA runtime not detected. Waiting... (Attempt $attempt of $max_attempts)'\n    sleep 10\ndone\necho 'NVIDIA runtime detected successfully.'\nnewgrp docker\ndocker run -d -t --gpus all -v /usr/lib/x86_64-linux-gnu:/usr/lib/x86_64-linux-gnu -v /usr/bin/nvidia-smi:/usr/bin/nvidia-smi -p 8888:8888 -e USER_NAME={USER_NAME} -e USER_PASSWORD={USER_PASSWORD} --name pytorch {DOCKER_IMAGE}",
-    )
-
-    vm_id = response['instances'][0]['id']
-    print(f"Booting {vm_id}")
-    hyperstack.wait_for_vm_active(vm_id, max_attempts=4, initial_delay=30, delay=10, backoff_factor=1.5)
-    hyperstack.set_sg_rules(vm_id=vm_id, port_range_min=22, port_range_max=22)
-    hyperstack.set_sg_rules(vm_id=vm_id, protocol="icmp")
-    print(f"Machine {vm_id} Ready")
-    time.sleep(5)
-    floating_ip = hyperstack.get_floating_ip(vm_id)
-    print(f"Public IP: {floating_ip}")
+    def user_data():
+        return f"#!/bin/bash\n\n# Set up docker\n\n## Add Docker's official GPG key:\nsudo apt-get update\nsudo apt-get install -y ca-certificates curl gnupg\nsudo install -m 0755 -d /etc/apt/keyrings\ncurl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --yes --dearmor -o /etc/apt/keyrings/docker.gpg\nsudo chmod a+r /etc/apt/keyrings/docker.gpg\n\n## Add the repository to Apt sources:\necho \\\n\"deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] https://download.docker.com/linux/ubuntu \\\n$(. /etc/os-release && echo $VERSION_CODENAME) stable\" | \\\nsudo tee /etc/apt/sources.list.d/docker.list > /dev/null\nsudo apt-get update\n\n## Install docker\nsudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin\n\n## Add docker group to ubuntu user\nsudo usermod -aG docker ubuntu\nsudo usermod -aG docker $USER\n\nsudo apt-get install nvidia-container-toolkit -y\n\n## Configure docker\n\nsudo nvidia-ctk runtime configure --runtime=docker\n\nsudo systemctl restart docker\n\n# New verification step\necho 'Verifying NVIDIA runtime...'\nmax_attempts=6\nattempt=0\nwhile ! docker info | grep -i nvidia > /dev/null; do\n    attempt=$((attempt+1))\n    if [ $attempt -eq $max_attempts ]; then\n        echo 'NVIDIA runtime not detected after $max_attempts attempts. Please check your installation.'\n        exit 1\n    fi\n    echo 'NVIDIA runtime not detected. Waiting... (Attempt $attempt of $max_attempts)'\n    sleep 10\ndone\necho 'NVIDIA runtime detected successfully.'\nnewgrp docker\ndocker run -d -t --gpus all -v /usr/lib/x86_64-linux-gnu:/usr/lib/x86_64-linux-gnu -v /usr/bin/nvidia-smi:/usr/bin/nvidia-smi -p 8888:8888 -e USER_NAME={USER_NAME} -e USER_PASSWORD={USER_PASSWORD} --name pytorch {DOCKER_IMAGE}"
+
+    with hyperstack.using_environment(environment):
+        vm_id, floating_ip = _deploy_vm(
+            name,
+            flavor_name,
+            key_name,
+            image_name,
+            user_data,
+            [SSH_RULE, ICMP_RULE],
+            progress,
+            timings,
+            instrumentation,
+            poll_interval,
+            timeout,
+            SERVICE_PROBES["pytorch"] if wait_ready else None,
+            ready_timeout,
+        )
     print(f"In container credentials:\nusername: dockeruser\nPassword: {USER_PASSWORD}")
     return vm_id, floating_ip
 
 
-def create_ollama_vm(name, flavor_name, environment, key_name, image_name="Ubuntu Server 22.04 LTS R535 CUDA 12.2"):
-    hyperstack.set_environment(environment)
-
-    response = hyperstack.create_vm(
-        name=name,
-        image_name=image_name,
-        flavor_name=flavor_name,
-        assign_floating_ip=True,
-        key_name=key_name,
-        user_data="#!/bin/bash\n\n# Set up docker\n\n## Add Docker's official GPG key:\nsudo apt-get update\nsudo apt-get install -y ca-certificates curl gnupg\nsudo install -m 0755 -d /etc/apt/keyrings\ncurl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo gpg --yes --dearmor -o /etc/apt/keyrings/docker.gpg\nsudo chmod a+r /etc/apt/keyrings/docker.gpg\n\n## Add the repository to Apt sources:\necho \\\n\"deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] https://download.docker.com/linux/ubuntu \\\n$(. /etc/os-release && echo $VERSION_CODENAME) stable\" | \\\nsudo tee /etc/apt/sources.list.d/docker.list > /dev/null\nsudo apt-get update\n\n## Install docker\nsudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin\n\n## Add docker group to ubuntu user\nsudo usermod -aG docker ubuntu\nsudo usermod -aG docker $USER\n\nsudo apt-get install nvidia-container-toolkit -y\n\n## Configure docker\n\nsudo nvidia-ctk runtime configure --runtime=docker\n\nsudo systemctl restart docker\n\nnewgrp docker\ndocker run -d --gpus all -v /usr/lib/x86_64-linux-gnu:/usr/lib/x86_64-linux-gnu -v /usr/bin/nvidia-smi:/usr/bin/nvidia-smi -v ollama:/root/.ollama -p 11434:11434 -e OLLAMA_HOST=0.0.0.0 --name ollama ollama/ollama",
-    )
-
-    vm_id = response['instances'][0]['id']
-
-    print(f'Virtual Machine {vm_id} booting up')
-    hyperstack.wait_for_vm_active(vm_id, max_attempts=4, initial_delay=30, delay=10, backoff_factor=1.5)
-    hyperstack.set_sg_rules(vm_id=vm_id, port_range_min=22, port_range_max=22)
-    hyperstack.set_sg_rules(vm_id=vm_id, port_range_min=11434, port_range_max=11434)
-    hyperstack.set_sg_rules(vm_id=vm_id, protocol="icmp")
-
-    print(f"Machine {vm_id} Ready")
-    time.sleep(5)
-    floating_ip = hyperstack.get_floating_ip(vm_id)
-    print(f"Public IP: {floating_ip}")
+def create_ollama_vm(
+    name,
+    flavor_name,
+    environment,
+    key_name,
+    image_name="Ubuntu Server 22.04 LTS R535 CUDA 12.2",
+    progress=None,
+    timings=None,
+    instrumentation=None,
+    poll_interval=5,
+    timeout=600,
+    wait_ready=False,
+    ready_timeout=900,
+):
+    """
+    Deploys a VM running Ollama. progress, timings, instrumentation, poll_interval, timeout, wait_ready and
+    ready_timeout are as for create_pytorch_vm, wait_ready waiting for SSH and the Ollama API.
+    """
+    with hyperstack.using_environment(environment):
+        vm_id, floating_ip = _deploy_vm(
+            name,
+            flavor_name,
+            key_name,
+            image_name,
+            lambda: OLLAMA_USER_DATA,
+            [SSH_RULE, OLLAMA_RULE, ICMP_RULE],
+            progress,
+            timings,
+            instrumentation,
+            poll_interval,
+            timeout,
+            SERVICE_PROBES["ollama"] if wait_ready else None,
+            ready_timeout,
+        )
     print('DONE')
     return vm_id, floating_ip
 
 
 def deploy(
-    deployment_type, name, environment, flavor_name, key_name, image_name="Ubuntu Server 22.04 LTS R535 CUDA 12.2"
+    deployment_type,
+    name,
+    environment,
+    flavor_name,
+    key_name,
+    image_name="Ubuntu Server 22.04 LTS R535 CUDA 12.2",
+    wait_ready=False,
 ):
     if deployment_type == "pytorch":
-        return create_pytorch_vm(name, flavor_name, environment, key_name, image_name)
+        return create_pytorch_vm(name, flavor_name, environment, key_name, image_name, wait_ready=wait_ready)
     elif deployment_type == "ollama":
-        return create_ollama_vm(name, flavor_name, environment, key_name, image_name)
+        return create_ollama_vm(name, flavor_name, environment, key_name, image_name, wait_ready=wait_ready)
     else:
         raise ValueError("Invalid deployment type. Choose 'pytorch' or 'ollama'.")
+
+
+_DEPLOYERS = {"pytorch": create_pytorch_vm, "ollama": create_ollama_vm}
+
+
+@dataclass
+class DeploymentResult:
+    """Outcome of deploying one VM as part of a fleet."""
+
+    name: str
+    vm_id: Optional[int] = None
+    floating_ip: Optional[str] = None
+    error: Optional[Exception] = None
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def deploy_fleet(spec, replicas=1, max_workers=8, progress=None, instrumentation=None):
+    """
+    Deploys many VMs concurrently.
+
+    Each VM is deployed in its own worker, so a slow VM doesn't hold back the others, and a failed
+    deployment is reported in its result instead of stopping the rest of the fleet.
+
+    :param spec: The deploy() arguments for a VM as a dict, e.g. {"deployment_type": "ollama", "name": "ollama",
+                 "environment": "your-environment", "flavor_name": "n2-RTX-A5000x1", "key_name": "your-key"}.
+                 A list of such dicts deploys each of them.
+    :param replicas: Number of VMs to deploy per spec. Replicas are named "<name>-1", "<name>-2" and so on.
+    :param max_workers: Maximum number of VMs deployed at the same time (default 8).
+    :param progress: Optional callable, called as progress(name, phase, vm_id) as each VM moves through the
+                     "creating", "booting", "configuring", "ready" and "failed" phases.
+    :param instrumentation: Instrumentation recording the duration of each deployment step. Defaults to the
+                            instrumentation of the module-level client, if any.
+    :return: A list of DeploymentResult, one per VM, in the order of the specs and replicas.
+    """
+    specs = [spec] if isinstance(spec, dict) else list(spec)
+    jobs = []
+    for item in specs:
+        options = dict(item)
+        deployment_type = options.pop("deployment_type")
+        if deployment_type not in _DEPLOYERS:
+            raise ValueError("Invalid deployment type. Choose 'pytorch' or 'ollama'.")
+        name = options.pop("name")
+        for replica in range(1, replicas + 1):
+            replica_name = f"{name}-{replica}" if replicas > 1 else name
+            jobs.append((_DEPLOYERS[deployment_type], replica_name, options))
+
+    def run(job):
+        deployer, name, options = job
+        result = DeploymentResult(name=name)
+
+        def track(name, phase, vm_id):
+            if vm_id is not None:
+                result.vm_id = vm_id
+            _report(progress, name, phase, vm_id)
+
+        try:
+            result.vm_id, result.floating_ip = deployer(
+                name=name, progress=track, timings=result.timings, instrumentation=instrumentation, **options
+            )
+        except Exception as e:
+            result.error = e
+            if isinstance(e, ServiceNotReadyError):
+                result.floating_ip = e.floating_ip
+            _report(progress, name, "failed", result.vm_id)
+        return result
+
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, jobs))
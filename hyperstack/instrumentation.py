@@ -0,0 +1,264 @@
+import bisect
+import functools
+import re
+import threading
+import time
+
+# Upper bounds in seconds, as in the default buckets of the Prometheus client libraries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+PHASE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$")
+
+
+@functools.lru_cache(maxsize=1024)
+def template_endpoint(endpoint):
+    """
+    Replaces the IDs in an endpoint with a placeholder, so that requests for different resources share metrics.
+
+    :param endpoint: The endpoint, e.g. "core/virtual-machines/123/start".
+    :return: The templated endpoint, e.g. "core/virtual-machines/{id}/start".
+    """
+    return "/".join("{id}" if _ID_SEGMENT.match(part) else part for part in endpoint.strip("/").split("/"))
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, in the manner of a Prometheus histogram."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Returns (upper bound, count of observations less than or equal to it) pairs, ending with +Inf."""
+        pairs = []
+        total = 0
+        for index, bound in enumerate(self.buckets + (float("inf"),)):
+            total += self.counts[index]
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Estimates a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class RequestInfo:
+    """One HTTP request as seen by the instrumentation hooks."""
+
+    __slots__ = ("method", "endpoint", "template", "started_at", "duration", "status", "error", "span")
+
+    def __init__(self, method, endpoint):
+        self.method = method
+        self.endpoint = endpoint
+        self.template = template_endpoint(endpoint)
+        self.started_at = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.error = None
+        self.span = None
+
+
+class Instrumentation:
+    """
+    Latency histograms, status and error counters, and hooks around every request sent by a client.
+
+    Pass one to ``Hyperstack(instrumentation=...)``. Each HTTP attempt, retries included, is recorded under its
+    method and templated endpoint. A client without instrumentation skips all of this.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, phase_buckets=PHASE_BUCKETS, tracing=False):
+        """
+        :param buckets: Upper bounds in seconds of the request latency histogram buckets.
+        :param phase_buckets: Upper bounds in seconds of the deployment phase histogram buckets.
+        :param tracing: Whether to record an OpenTelemetry span per request. Requires the optional
+                        opentelemetry-api dependency: ``pip install hyperstack[tracing]``.
+        """
+        self.buckets = buckets
+        self.phase_buckets = phase_buckets
+        self._lock = threading.Lock()
+        self._before = []
+        self._after = []
+        self.latency = {}
+        self.responses = {}
+        self.errors = {}
+        self.phases = {}
+        self._tracer = None
+        if tracing:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError(
+                    "Tracing requires opentelemetry-api. Install it with: pip install hyperstack[tracing]"
+                ) from e
+            self._tracer = trace.get_tracer("hyperstack")
+
+    def add_hooks(self, before=None, after=None):
+        """
+        Registers callables run around every request.
+
+        :param before: Called as before(info) with a RequestInfo just before the request is sent.
+        :param after: Called as after(info) once the response or error is in, with ``info.duration`` in seconds
+                      and ``info.status`` or ``info.error`` set.
+        """
+        if before is not None:
+            self._before.append(before)
+        if after is not None:
+            self._after.append(after)
+
+    def start(self, method, endpoint):
+        info = RequestInfo(method, endpoint)
+        if self._tracer is not None:
+            info.span = self._tracer.start_span(
+                f"{method} {info.template}",
+                attributes={"http.request.method": method, "url.template": info.template},
+            )
+        for hook in self._before:
+            hook(info)
+        return info
+
+    def finish(self, info, response=None, error=None):
+        info.duration = time.perf_counter() - info.started_at
+        key = (info.method, info.template)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(self.buckets)
+            histogram.observe(info.duration)
+            if response is not None:
+                info.status = response.status_code
+                status_key = key + (info.status,)
+                self.responses[status_key] = self.responses.get(status_key, 0) + 1
+            if error is not None:
+                info.error = error
+                error_key = key + (type(error).__name__,)
+                self.errors[error_key] = self.errors.get(error_key, 0) + 1
+        if info.span is not None:
+            if info.status is not None:
+                info.span.set_attribute("http.response.status_code", info.status)
+            if error is not None:
+                info.span.record_exception(error)
+            info.span.end()
+        for hook in self._after:
+            hook(info)
+
+    def record_phase(self, phase, duration):
+        """
+        Records how long a deployment phase took.
+
+        :param phase: The phase, e.g. "create", "wait-active", "sg-rules" or "floating-ip".
+        :param duration: The duration in seconds.
+        """
+        with self._lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram(self.phase_buckets)
+            histogram.observe(duration)
+
+    def stats(self):
+        """
+        Returns a summary of the recorded requests per method and templated endpoint.
+
+        :return: A dict mapping "METHOD endpoint" to its request count, total and p50/p99 latency (bucket upper
+                 bounds), response counts by status and error counts by exception type.
+        """
+        with self._lock:
+            summary = {}
+            for (method, template), histogram in self.latency.items():
+                summary[f"{method} {template}"] = {
+                    "count": histogram.count,
+                    "total": histogram.sum,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                    "statuses": {
+                        status: count
+                        for (m, t, status), count in self.responses.items()
+                        if (m, t) == (method, template)
+                    },
+                    "errors": {
+                        error: count for (m, t, error), count in self.errors.items() if (m, t) == (method, template)
+                    },
+                }
+            return summary
+
+    def to_prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _histogram_lines(
+                lines,
+                "hyperstack_request_duration_seconds",
+                "Duration of Hyperstack API requests.",
+                ("method", "endpoint"),
+                self.latency,
+            )
+            _counter_lines(
+                lines,
+                "hyperstack_responses_total",
+                "Hyperstack API responses by status code.",
+                ("method", "endpoint", "status"),
+                self.responses,
+            )
+            _counter_lines(
+                lines,
+                "hyperstack_request_errors_total",
+                "Hyperstack API requests that failed without a response.",
+                ("method", "endpoint", "error"),
+                self.errors,
+            )
+            _histogram_lines(
+                lines,
+                "hyperstack_deploy_phase_duration_seconds",
+                "Duration of deployment phases.",
+                ("phase",),
+                {(phase,): histogram for phase, histogram in self.phases.items()},
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(values[index])}"' for index, name in enumerate(names)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _histogram_lines(lines, name, help_text, names, histograms):
+    if not histograms:
+        return
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for values, histogram in histograms.items():
+        for bound, total in histogram.cumulative():
+            le = '"+Inf"' if bound == float("inf") else f'"{float(bound)!r}"'
+            lines.append(f"{name}_bucket{_labels(names, values, 'le=' + le)} {total}")
+        lines.append(f"{name}_sum{_labels(names, values)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(names, values)} {histogram.count}")
+
+
+def _counter_lines(lines, name, help_text, names, counters):
+    if not counters:
+        return
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for values, count in counters.items():
+        lines.append(f"{name}{_labels(names, values)} {count}")
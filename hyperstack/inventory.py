@@ -0,0 +1,284 @@
+import threading
+import time
+
+# kind: (list endpoint, key of the list in the response, key of one item in a create response, paginated)
+KINDS = {
+    "virtual_machines": ("core/virtual-machines", "instances", "instance", True),
+    "volumes": ("core/volumes", "volumes", "volume", True),
+    "profiles": ("core/profiles", "profiles", "profile", False),
+    "environments": ("core/environments", "environments", "environment", False),
+}
+_KIND_BY_ENDPOINT = {endpoint: kind for kind, (endpoint, *_) in KINDS.items()}
+
+
+class _Index:
+    def __init__(self, records=()):
+        self.records = {}
+        self.by_name = {}
+        self.by_label = {}
+        self.by_environment = {}
+        for record in records:
+            self.add(record)
+
+    @staticmethod
+    def _link(index, value, key):
+        if value is not None:
+            index.setdefault(value, {})[key] = None
+
+    @staticmethod
+    def _unlink(index, value, key):
+        keys = index.get(value)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del index[value]
+
+    def add(self, record):
+        key = str(record["id"])
+        self.remove(key)
+        self.records[key] = record
+        self._link(self.by_name, record.get("name"), key)
+        for label in record.get("labels") or []:
+            self._link(self.by_label, label, key)
+        self._link(self.by_environment, _environment_name(record), key)
+
+    def remove(self, key):
+        key = str(key)
+        record = self.records.pop(key, None)
+        if record is None:
+            return
+        self._unlink(self.by_name, record.get("name"), key)
+        for label in record.get("labels") or []:
+            self._unlink(self.by_label, label, key)
+        self._unlink(self.by_environment, _environment_name(record), key)
+
+    def set_labels(self, key, labels):
+        record = self.records.get(str(key))
+        if record is not None:
+            self.add({**record, "labels": list(labels)})
+
+    def lookup(self, index, value):
+        return [self.records[key] for key in index.get(value, ())]
+
+
+def _environment_name(record):
+    environment = record.get("environment")
+    if isinstance(environment, dict):
+        return environment.get("name")
+    return record.get("environment_name")
+
+
+class Inventory:
+    """
+    Client-side index of VMs, volumes, profiles and environments by name, label and environment.
+
+    Each kind of resource is listed once, on its first lookup, and again only when its index is older than
+    ``max_age``. Creates, deletes, renames and label updates made through the client update the index in place,
+    so lookups answer from memory without an API call.
+
+    With a SnapshotStore, the indexes are also kept on disk. A new process then starts from the stored records
+    while they are younger than ``max_age``, and each refresh only writes the records that changed.
+    """
+
+    def __init__(self, client=None, max_age=300, store=None):
+        """
+        :param client: The Hyperstack client used to list resources. Set by the client when it creates or is
+                       given the inventory.
+        :param max_age: Seconds after which an index is refreshed on its next lookup (default 300).
+        :param store: A SnapshotStore keeping the indexes between processes. None keeps them in memory only.
+        """
+        self.client = client
+        self.max_age = max_age
+        self.store = store
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._loaded_at = {}
+        self._journals = {}
+        self.refreshes = 0
+        self.changes = {}
+
+    def refresh(self, kind=None):
+        """
+        Lists resources again and rebuilds their index.
+
+        :param kind: "virtual_machines", "volumes", "profiles" or "environments". None refreshes all of them.
+        """
+        for name in [kind] if kind else KINDS:
+            self._refresh(name)
+
+    def invalidate(self, kind=None):
+        """
+        Drops an index so that it is rebuilt on its next lookup.
+
+        :param kind: The kind of resource, or None to drop every index.
+        """
+        with self._lock:
+            for name in [kind] if kind else list(self._indexes):
+                self._indexes.pop(name, None)
+                self._loaded_at.pop(name, None)
+        if self.store is not None:
+            self.store.expire(kind)
+
+    def records(self, kind):
+        """Returns all resources of a kind, as last listed or created."""
+        return self._lookup(kind, "records", None)
+
+    def by_name(self, kind, name):
+        """
+        Returns the resource with the given name, or None.
+
+        :param kind: The kind of resource, e.g. "virtual_machines".
+        :param name: The name of the resource.
+        :return: The resource as last listed or created, or None if there is no such resource.
+        :raises ValueError: If several resources have this name.
+        """
+        records = self._lookup(kind, "by_name", name)
+        if len(records) > 1:
+            ids = ", ".join(str(record["id"]) for record in records)
+            raise ValueError(f"Several {kind.replace('_', ' ')} are named {name!r}: {ids}")
+        return records[0] if records else None
+
+    def by_label(self, kind, label):
+        """Returns the resources carrying a label."""
+        return self._lookup(kind, "by_label", label)
+
+    def in_environment(self, kind, environment):
+        """Returns the resources of an environment, given its name."""
+        return self._lookup(kind, "by_environment", environment)
+
+    def vm_by_name(self, name):
+        """Returns the VM with the given name, or None."""
+        return self.by_name("virtual_machines", name)
+
+    def vms_by_label(self, label):
+        """Returns the VMs carrying a label."""
+        return self.by_label("virtual_machines", label)
+
+    def vms_in_environment(self, environment):
+        """Returns the VMs of an environment, given its name."""
+        return self.in_environment("virtual_machines", environment)
+
+    def volume_by_name(self, name):
+        """Returns the volume with the given name, or None."""
+        return self.by_name("volumes", name)
+
+    def volumes_in_environment(self, environment):
+        """Returns the volumes of an environment, given its name."""
+        return self.in_environment("volumes", environment)
+
+    def profile_by_name(self, name):
+        """Returns the profile with the given name, or None."""
+        return self.by_name("profiles", name)
+
+    def environment_by_name(self, name):
+        """Returns the environment with the given name, or None."""
+        return self.by_name("environments", name)
+
+    def observe(self, method, endpoint, data, response):
+        """
+        Updates the indexes after a successful request made through the client.
+
+        :param method: The HTTP method.
+        :param endpoint: The endpoint, e.g. "core/virtual-machines/12/label".
+        :param data: The request body.
+        :param response: The decoded response.
+        """
+        parts = endpoint.strip("/").split("/")
+        kind = _KIND_BY_ENDPOINT.get("/".join(parts[:2]))
+        if kind is None:
+            return
+        _, list_key, item_key, _ = KINDS[kind]
+        if method == "POST" and len(parts) == 2:
+            records = response.get(list_key) or [response.get(item_key)]
+
+            def change(index):
+                for record in records:
+                    if isinstance(record, dict) and "id" in record:
+                        index.add(record)
+
+        elif method == "PUT" and len(parts) == 3 and isinstance(response.get(item_key), dict):
+
+            def change(index):
+                index.add(response[item_key])
+
+        elif method == "DELETE" and len(parts) == 3:
+
+            def change(index):
+                index.remove(parts[2])
+
+        elif method == "PUT" and parts[3:] == ["label"] and data and "labels" in data:
+
+            def change(index):
+                index.set_labels(parts[2], data["labels"])
+
+        else:
+            return
+        with self._lock:
+            index = self._indexes.get(kind)
+            if index is not None:
+                change(index)
+                records = list(index.records.values())
+            if kind in self._journals:
+                # Replayed onto the listing in flight, which may have been taken before this change
+                self._journals[kind].append(change)
+        if index is not None and self.store is not None:
+            self.store.save_records(kind, records)
+
+    def _lookup(self, kind, index_name, value):
+        if kind not in KINDS:
+            raise ValueError(f"Invalid kind specified. Use one of: {', '.join(KINDS)}")
+        with self._lock:
+            index = self._indexes.get(kind)
+            if index is not None and time.monotonic() - self._loaded_at[kind] <= self.max_age:
+                return self._select(index, index_name, value)
+        index = (self._restore(kind) if index is None and self.store is not None else None) or self._refresh(kind)
+        with self._lock:
+            return self._select(index, index_name, value)
+
+    @staticmethod
+    def _select(index, index_name, value):
+        if index_name == "records":
+            return list(index.records.values())
+        return index.lookup(getattr(index, index_name), value)
+
+    def _restore(self, kind):
+        records, refreshed_at = self.store.load_records(kind)
+        age = time.time() - refreshed_at if refreshed_at is not None else None
+        if age is None or not 0 <= age <= self.max_age:
+            return None
+        index = _Index(records)
+        with self._lock:
+            if kind in self._indexes:
+                return self._indexes[kind]
+            self._indexes[kind] = index
+            self._loaded_at[kind] = time.monotonic() - age
+        return index
+
+    def _refresh(self, kind):
+        endpoint, list_key, _, paginated = KINDS[kind]
+        started_at = time.monotonic()
+        listed_at = time.time()
+        with self._lock:
+            journal = self._journals.setdefault(kind, [])
+        try:
+            if paginated:
+                records = list(self.client.iter_pages(endpoint, list_key))
+            else:
+                records = self.client.get(endpoint).get(list_key) or []
+            index = _Index(records)
+            with self._lock:
+                for change in journal:
+                    change(index)
+                self._indexes[kind] = index
+                self._loaded_at[kind] = started_at
+                self.refreshes += 1
+                records = list(index.records.values())
+            if self.store is not None:
+                changes = self.store.save_records(kind, records, refreshed_at=listed_at)
+                with self._lock:
+                    self.changes[kind] = changes
+            return index
+        finally:
+            with self._lock:
+                if self._journals.get(kind) is journal:
+                    del self._journals[kind]
@@ -0,0 +1,242 @@
+import sys
+
+
+class Nested:
+    """
+    Field holding a nested object, kept as the decoded dict until it is first accessed.
+
+    The first access turns the dict (or list of dicts when ``many`` is True) into models and stores them in
+    place of the dict.
+    """
+
+    def __init__(self, model, many=False):
+        self.model = model
+        self.many = many
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = owner.__dict__[f"_{name}"]
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self.slot.__get__(instance, owner)
+        if self.many:
+            if value and isinstance(value[0], dict):
+                value = [self.model.from_dict(item) for item in value]
+                self.slot.__set__(instance, value)
+        elif isinstance(value, dict):
+            value = self.model.from_dict(value)
+            self.slot.__set__(instance, value)
+        return value
+
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, value)
+
+
+class Model:
+    """
+    Base class for the compact models returned by the api functions when called with ``typed=True``.
+
+    Fields live in ``__slots__`` instead of a per-object dict, keys the model doesn't know are dropped, and the
+    string values of ``_interned`` fields, which repeat across records (statuses, regions, GPU models), are
+    shared between models instead of stored once per record.
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _interned = ()
+    _nested = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._nested = tuple(name for name, value in vars(cls).items() if isinstance(value, Nested))
+
+    def __init__(self, **fields):
+        for name in self._fields + self._nested:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a model from a decoded API object.
+
+        :param data: The decoded object, e.g. one of the "instances" of list_virtual_machines.
+        :return: The model.
+        """
+        model = cls.__new__(cls)
+        for name in cls._fields:
+            setattr(model, name, data.get(name))
+        for name in cls._interned:
+            value = data.get(name)
+            if type(value) is str:
+                setattr(model, name, sys.intern(value))
+        for name in cls._nested:
+            setattr(model, name, data.get(name))
+        return model
+
+    def to_dict(self):
+        """Returns the fields of the model as a dict, with nested models converted back to dicts."""
+        data = {name: getattr(self, name) for name in self._fields}
+        for name in self._nested:
+            value = getattr(self, name)
+            if isinstance(value, Model):
+                value = value.to_dict()
+            elif isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, Model) else item for item in value]
+            data[name] = value
+        return data
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in ("id", "name") if name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class Environment(Model):
+    _fields = ("id", "name", "org_id", "region", "created_at")
+    _interned = ("name", "region")
+    __slots__ = _fields
+
+
+class Flavor(Model):
+    _fields = (
+        "id",
+        "name",
+        "region_name",
+        "cpu",
+        "ram",
+        "disk",
+        "ephemeral",
+        "gpu",
+        "gpu_count",
+        "stock_available",
+    )
+    _interned = ("name", "region_name", "gpu")
+    __slots__ = _fields
+
+
+class Image(Model):
+    _fields = (
+        "id",
+        "name",
+        "region_name",
+        "type",
+        "version",
+        "size",
+        "display_size",
+        "description",
+        "is_public",
+        "labels",
+    )
+    _interned = ("name", "region_name", "type", "version", "display_size", "description")
+    __slots__ = _fields
+
+
+class SecurityRule(Model):
+    _fields = (
+        "id",
+        "direction",
+        "protocol",
+        "ethertype",
+        "remote_ip_prefix",
+        "port_range_min",
+        "port_range_max",
+        "status",
+        "created_at",
+    )
+    _interned = ("direction", "protocol", "ethertype", "remote_ip_prefix", "status")
+    __slots__ = _fields
+
+
+class VirtualMachine(Model):
+    _fields = (
+        "id",
+        "name",
+        "status",
+        "power_state",
+        "vm_state",
+        "fixed_ip",
+        "floating_ip",
+        "floating_ip_status",
+        "keypair",
+        "volume_attachments",
+        "labels",
+        "created_at",
+    )
+    _interned = ("status", "power_state", "vm_state", "floating_ip_status")
+    __slots__ = _fields + ("_environment", "_image", "_flavor", "_security_rules")
+
+    environment = Nested(Environment)
+    image = Nested(Image)
+    flavor = Nested(Flavor)
+    security_rules = Nested(SecurityRule, many=True)
+
+
+class Volume(Model):
+    _fields = ("id", "name", "volume_type", "size", "status", "bootable", "description", "image_id", "created_at")
+    _interned = ("volume_type", "status")
+    __slots__ = _fields + ("_environment",)
+
+    environment = Nested(Environment)
+
+
+class Stock(Model):
+    _fields = ("region", "model", "available", "planned_7_days", "planned_30_days", "configurations")
+    _interned = ("region", "model")
+    __slots__ = _fields
+
+
+class Profile(Model):
+    _fields = ("id", "name", "description", "data", "created_at")
+    __slots__ = _fields
+
+
+def parse_one(model, key):
+    """Returns a function building one model from the object under ``key`` in a response."""
+
+    def parse(response):
+        return model.from_dict(response[key])
+
+    return parse
+
+
+def parse_many(model, key):
+    """Returns a function building a list of models from the list under ``key`` in a response."""
+
+    def parse(response):
+        return [model.from_dict(item) for item in response.get(key) or []]
+
+    return parse
+
+
+def parse_grouped(model, key, items_key, inherit=()):
+    """
+    Returns a function building a flat list of models from a response listing groups of items, such as the
+    flavors of list_flavors grouped by GPU.
+
+    :param inherit: Keys of the group copied into each of its items, e.g. the region of a stock entry.
+    """
+
+    def parse(response):
+        models = []
+        for group in response.get(key) or []:
+            shared = {name: group.get(name) for name in inherit}
+            for item in group.get(items_key) or []:
+                models.append(model.from_dict({**shared, **item} if shared else item))
+        return models
+
+    return parse
+
+
+def parse_each(model):
+    """Returns a function building the list of models for one item yielded by an iter_* function."""
+
+    def parse(item):
+        return [model.from_dict(item)]
+
+    return parse
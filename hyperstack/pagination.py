@@ -0,0 +1,127 @@
+import codecs
+import json
+import re
+from json.decoder import scanstring
+
+_TOKEN = re.compile(r'["{}\[\]:,]')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def is_last_page(response, key, page, page_size):
+    """
+    Tells whether a page of a paginated list endpoint is the last one.
+
+    :param response: The decoded response for the page.
+    :param key: The key holding the list of items in the response.
+    :param page: The number of the page, starting at 1.
+    :param page_size: The number of items requested per page.
+    :return: True if there are no more pages to request.
+    """
+    items = response.get(key) or []
+    # A short page is the last one, and an endpoint ignoring the page parameters returns everything at once
+    if len(items) != page_size:
+        return True
+    count = response.get("count")
+    return count is not None and page * page_size >= count
+
+
+class JSONArrayParser:
+    """
+    Incremental parser for the items of one array in a JSON object, fed with the response body as it arrives.
+
+    Only the array held by ``key`` at the top level of the object is decoded, one item at a time, so memory use
+    is bounded by the size of an item and of a chunk rather than by the size of the whole body.
+    """
+
+    def __init__(self, key):
+        """
+        :param key: The top-level key holding the array, e.g. "instances".
+        """
+        self.key = key
+        self.done = False
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._expect_key = False
+        self._last_key = None
+        self._in_array = False
+
+    def feed(self, data, final=False):
+        """
+        Feeds the next chunk of the body to the parser.
+
+        :param data: The next bytes of the body.
+        :param final: Whether this is the end of the body.
+        :return: The list of array items completed by this chunk.
+        """
+        if self.done:
+            return []
+        self._buffer = self._buffer[self._pos :] + self._text.decode(data, final)
+        self._pos = 0
+        if not self._in_array:
+            self._seek()
+            if not self._in_array:
+                if final:
+                    # The body has no such array
+                    self.done = True
+                return []
+        return self._parse_items(final)
+
+    def _seek(self):
+        buffer = self._buffer
+        while True:
+            match = _TOKEN.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                return
+            char, index = match.group(), match.start()
+            if char == '"':
+                try:
+                    value, end = scanstring(buffer, index + 1)
+                except json.JSONDecodeError:
+                    # The rest of the string is in the next chunk
+                    self._pos = index
+                    return
+                if self._depth == 1 and self._expect_key:
+                    self._last_key = value
+                self._expect_key = False
+                self._pos = end
+                continue
+            self._pos = index + 1
+            if char == "[" and self._depth == 1 and self._last_key == self.key:
+                self._in_array = True
+                return
+            if char in "{[":
+                self._depth += 1
+                self._expect_key = char == "{"
+            elif char in "}]":
+                self._depth -= 1
+            elif char == ",":
+                self._expect_key = True
+
+    def _parse_items(self, final):
+        buffer = self._buffer
+        items = []
+        while True:
+            pos = _SEPARATORS.match(buffer, self._pos).end()
+            self._pos = pos
+            if pos == len(buffer):
+                if final:
+                    raise json.JSONDecodeError("Unterminated array", buffer, pos)
+                return items
+            if buffer[pos] == "]":
+                self.done = True
+                return items
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                return items
+            # A number at the end of the chunk may continue in the next one
+            if end == len(buffer) and not final and not isinstance(item, (dict, list, str)):
+                return items
+            items.append(item)
+            self._pos = end
@@ -0,0 +1,168 @@
+import json
+import os
+import random
+import statistics
+import threading
+
+
+class ExponentialBackoff:
+    """Polls after delays growing by ``factor`` up to ``max_delay``, each shifted by up to ``jitter`` of itself."""
+
+    def __init__(self, initial=2, factor=2, max_delay=30, jitter=0.1, timeout=600):
+        """
+        :param initial: Seconds before the second poll (default 2).
+        :param factor: Factor the delay grows by after each poll (default 2).
+        :param max_delay: Maximum number of seconds between polls (default 30).
+        :param jitter: Fraction of each delay added or removed at random, so that many waiters don't poll in step
+                       (default 0.1).
+        :param timeout: Seconds after the first poll at which to give up (default 600).
+        """
+        self.initial = initial
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def delays(self, key=None):
+        """Yields the seconds to sleep before each poll after the first, until the timeout is used up."""
+        elapsed = 0
+        delay = self.initial
+        while elapsed < self.timeout:
+            sleep = min(delay * random.uniform(1 - self.jitter, 1 + self.jitter), self.timeout - elapsed)
+            yield sleep
+            elapsed += sleep
+            delay = min(delay * self.factor, self.max_delay)
+
+    def record(self, key, seconds):
+        pass
+
+
+class DeadlinePolling:
+    """Polls every ``interval`` seconds until ``timeout`` seconds have passed, however many polls that takes."""
+
+    def __init__(self, timeout=600, interval=10):
+        """
+        :param timeout: Seconds after the first poll at which to give up (default 600).
+        :param interval: Seconds between polls (default 10).
+        """
+        self.timeout = timeout
+        self.interval = interval
+
+    def delays(self, key=None):
+        elapsed = 0
+        while elapsed < self.timeout:
+            sleep = min(self.interval, self.timeout - elapsed)
+            yield sleep
+            elapsed += sleep
+
+    def record(self, key, seconds):
+        pass
+
+
+def default_store_path():
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "hyperstack", "boot_times.json")
+
+
+class BootTimeStore:
+    """
+    The most recent boot times per flavor and image, kept in a small JSON file.
+
+    Samples are keyed by "<flavor>|<image>". Without a path, the samples only live as long as the store.
+    """
+
+    def __init__(self, path=None, max_samples=20):
+        """
+        :param path: The JSON file to keep the samples in, e.g. default_store_path().
+        :param max_samples: Number of most recent samples kept per key (default 20).
+        """
+        self.path = path
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = None
+
+    def _load(self):
+        if self._samples is None:
+            self._samples = {}
+            if self.path is not None:
+                try:
+                    with open(self.path) as f:
+                        self._samples = json.load(f)
+                except (OSError, ValueError):
+                    # A missing or corrupt store only means there's nothing learned yet
+                    pass
+        return self._samples
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._load().setdefault(key, [])
+            samples.append(round(seconds, 3))
+            del samples[: -self.max_samples]
+            if self.path is not None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                temporary = f"{self.path}.{os.getpid()}.tmp"
+                with open(temporary, "w") as f:
+                    json.dump(self._samples, f)
+                os.replace(temporary, self.path)
+
+    def estimate(self, key):
+        """
+        :return: The median boot time of the key and the median deviation from it, or (None, None) without
+                 samples.
+        """
+        with self._lock:
+            samples = list(self._load().get(key, ()))
+        if not samples:
+            return None, None
+        median = statistics.median(samples)
+        return median, statistics.median(abs(sample - median) for sample in samples)
+
+
+class AdaptivePolling:
+    """
+    Learns how long VMs of each flavor and image take to boot, and polls tightly around the expected time.
+
+    The first wait for a flavor and image falls back to exponential backoff. Later waits sleep until shortly
+    before the median boot time, poll every ``interval`` seconds until shortly after it, then back off again
+    for VMs that are unusually slow.
+    """
+
+    def __init__(self, store=None, interval=3, margin=0.1, fallback=None, timeout=900):
+        """
+        :param store: A BootTimeStore. Defaults to one kept at default_store_path().
+        :param interval: Seconds between polls around the expected boot time (default 3).
+        :param margin: Fraction of the expected boot time polled before and after it, widened to the spread of
+                       the past boot times when that is larger (default 0.1).
+        :param fallback: Strategy used until a flavor and image have a boot time (default ExponentialBackoff()).
+        :param timeout: Seconds after the first poll at which to give up (default 900).
+        """
+        self.store = store if store is not None else BootTimeStore(default_store_path())
+        self.interval = interval
+        self.margin = margin
+        self.fallback = fallback if fallback is not None else ExponentialBackoff(timeout=timeout)
+        self.timeout = timeout
+
+    def delays(self, key=None):
+        expected, spread = self.store.estimate(key) if key is not None else (None, None)
+        if expected is None:
+            yield from self.fallback.delays(key)
+            return
+        window = max(self.margin * expected, spread, self.interval)
+        elapsed = min(max(expected - window, self.interval), self.timeout)
+        yield elapsed
+        while elapsed < min(expected + window, self.timeout):
+            yield self.interval
+            elapsed += self.interval
+        backoff = ExponentialBackoff(initial=self.interval * 2, timeout=self.timeout - elapsed)
+        yield from backoff.delays(key)
+
+    def record(self, key, seconds):
+        if key is not None:
+            self.store.record(key, seconds)
+
+
+def boot_key(instance):
+    """The flavor and image of a VM, as used to key boot times."""
+    flavor = (instance.get("flavor") or {}).get("name")
+    image = (instance.get("image") or {}).get("name")
+    return f"{flavor}|{image}" if flavor and image else None
@@ -0,0 +1,388 @@
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+
+from .api.network import plan_sg_rules
+from .context import ContextThreadPoolExecutor
+
+_REPLICA_NAME = re.compile(r"^(.*)-(\d+)$")
+
+
+@dataclass
+class VMSpec:
+    """
+    The desired state of a group of VMs, named "<name>-1" to "<name>-<count>".
+
+    sg_rules are dicts of set_sg_rules arguments, e.g. {"port_range_min": 22, "port_range_max": 22}.
+    """
+
+    name: str
+    flavor_name: str
+    image_name: str
+    count: int = 1
+    labels: list = field(default_factory=list)
+    sg_rules: list = field(default_factory=list)
+    key_name: str = "development-key"
+    user_data: str = ""
+    assign_floating_ip: bool = False
+
+    def names(self):
+        return [f"{self.name}-{replica}" for replica in range(1, self.count + 1)]
+
+
+@dataclass
+class Action:
+    """
+    One change to make. kind is "create", "wait", "label", "sg-rules", "resize" or "delete".
+
+    vm_id is None for actions on a VM that the plan creates. They run after its "create" action.
+    """
+
+    kind: str
+    name: str
+    vm_id: object = None
+    params: dict = field(default_factory=dict)
+    after: tuple = ()
+
+    @property
+    def key(self):
+        return (self.kind, self.name, self.vm_id)
+
+    def __str__(self):
+        target = self.name if self.vm_id is None else f"{self.name} ({self.vm_id})"
+        details = ", ".join(f"{key}={value!r}" for key, value in self.params.items())
+        return f"{self.kind} {target}" + (f": {details}" if details else "")
+
+
+@dataclass
+class Plan:
+    """
+    The actions that bring the actual VMs to the desired state.
+
+    unchanged lists the names of VMs already in the desired state, and drift the (name, field, actual, desired)
+    differences that the plan leaves alone, such as an image change without recreate.
+    """
+
+    actions: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    drift: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.actions)
+
+    def counts(self):
+        counts = {}
+        for action in self.actions:
+            counts[action.kind] = counts.get(action.kind, 0) + 1
+        return counts
+
+    def __str__(self):
+        return "\n".join(str(action) for action in self.actions) or "No changes"
+
+
+def _environment_name(instance):
+    return (instance.get("environment") or {}).get("name")
+
+
+def _field_name(instance, field_name):
+    return (instance.get(field_name) or {}).get("name")
+
+
+def plan_reconcile(specs, instances, environment=None, prune=True, recreate=False):
+    """
+    Works out the actions that bring a snapshot of the VMs to the desired state.
+
+    The snapshot is indexed by name once, so planning takes time linear in the number of VMs and specs.
+
+    :param specs: The desired state, a list of VMSpec.
+    :param instances: VM records, as returned in the "instances" of list_virtual_machines.
+    :param environment: Only consider the VMs of this environment, and those whose record doesn't name one.
+    :param prune: Whether to delete the replicas of a spec beyond its count, e.g. "web-4" when count is 3
+                  (default True). VMs that are not named after a spec are never touched.
+    :param recreate: Whether to delete and create again a VM whose image differs from its spec (default False).
+    :return: A Plan.
+    """
+    by_name = {}
+    for instance in instances:
+        if environment is None or _environment_name(instance) in (None, environment):
+            by_name.setdefault(instance.get("name"), []).append(instance)
+
+    plan = Plan()
+    for spec in specs:
+        for name in spec.names():
+            existing = sorted(by_name.pop(name, []), key=lambda instance: instance["id"])
+            # The oldest of several VMs with the same name is kept
+            deletes = [Action("delete", name, instance["id"]) for instance in existing[1:]]
+            vm = existing[0] if existing else None
+            if vm is not None and _field_name(vm, "image") != spec.image_name:
+                if recreate:
+                    deletes.append(Action("delete", name, vm["id"]))
+                    vm = None
+                else:
+                    plan.drift.append((name, "image", _field_name(vm, "image"), spec.image_name))
+            plan.actions.extend(deletes)
+            if vm is None:
+                plan.actions.extend(_create_actions(spec, name, [delete.key for delete in deletes]))
+            else:
+                changes = _update_actions(spec, name, vm)
+                plan.actions.extend(changes)
+                if not changes and not deletes:
+                    plan.unchanged.append(name)
+
+    if prune:
+        names = {spec.name for spec in specs}
+        for name, extra in by_name.items():
+            match = _REPLICA_NAME.match(name or "")
+            if match and match.group(1) in names:
+                plan.actions.extend(Action("delete", name, instance["id"]) for instance in extra)
+    return plan
+
+
+def _create_actions(spec, name, after):
+    create = Action(
+        "create",
+        name,
+        params={
+            "image_name": spec.image_name,
+            "flavor_name": spec.flavor_name,
+            "key_name": spec.key_name,
+            "user_data": spec.user_data,
+            "assign_floating_ip": spec.assign_floating_ip,
+        },
+        after=tuple(after),
+    )
+    actions = [create, Action("wait", name, after=(create.key,))]
+    if spec.labels:
+        actions.append(Action("label", name, params={"labels": list(spec.labels)}, after=(create.key,)))
+    if spec.sg_rules:
+        actions.append(Action("sg-rules", name, params={"rules": list(spec.sg_rules)}, after=(actions[1].key,)))
+    return actions
+
+
+def _update_actions(spec, name, vm):
+    vm_id = vm["id"]
+    actions = []
+    if _field_name(vm, "flavor") != spec.flavor_name:
+        actions.append(Action("resize", name, vm_id, {"flavor": spec.flavor_name}))
+    if sorted(vm.get("labels") or []) != sorted(spec.labels):
+        actions.append(Action("label", name, vm_id, {"labels": list(spec.labels)}))
+    pending, _ = plan_sg_rules([vm], [vm_id], spec.sg_rules)
+    if pending:
+        actions.append(Action("sg-rules", name, vm_id, {"rules": [rule for _, rule in pending]}))
+    return actions
+
+
+class _ActivePoller:
+    """
+    Waits for many VMs to become ACTIVE with one list call per tick, however many threads are waiting.
+
+    A failed list call doesn't fail the waiters: the poller backs off and tries again, and each waiter gives up
+    at its own timeout.
+    """
+
+    max_backoff = 30
+
+    def __init__(self, client, poll_interval, timeout):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+        self._error = None
+
+    def wait(self, vm_id):
+        entry = {"event": threading.Event(), "error": None}
+        with self._lock:
+            self._pending[str(vm_id)] = entry
+            if self._thread is None:
+                # Polls in the context of the first waiter, so that a using_environment scope carries over
+                self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self._poll,), daemon=True)
+                self._thread.start()
+        if not entry["event"].wait(self.timeout):
+            with self._lock:
+                self._pending.pop(str(vm_id), None)
+                error = self._error
+            raise TimeoutError(f"VM {vm_id} did not become active within {self.timeout} seconds") from error
+        if entry["error"] is not None:
+            raise entry["error"]
+
+    def _poll(self):
+        delay = self.poll_interval
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            try:
+                instances = self.client.list_virtual_machines().get("instances", [])
+            except Exception as e:
+                # Keep the waiters registered and poll a failing API less often until it recovers
+                with self._lock:
+                    self._error = e
+                time.sleep(delay)
+                delay = min(delay * 2, max(self.max_backoff, self.poll_interval))
+                continue
+            delay = self.poll_interval
+            with self._lock:
+                self._error = None
+                for instance in instances:
+                    key = str(instance["id"])
+                    if key in self._pending and instance["status"] in ("ACTIVE", "ERROR"):
+                        entry = self._pending.pop(key)
+                        if instance["status"] == "ERROR":
+                            entry["error"] = Exception(f"VM {key} entered ERROR state")
+                        entry["event"].set()
+            time.sleep(self.poll_interval)
+
+
+class _Executor:
+    def __init__(self, client, poll_interval, timeout):
+        self.client = client
+        self.poller = _ActivePoller(client, poll_interval, timeout)
+
+    def perform(self, action, vm_id, attempt):
+        client = self.client
+        if action.kind == "create":
+            if attempt:
+                # The failed attempt may have created the VM after all
+                existing = self._find(action.name)
+                if existing is not None:
+                    return existing["id"]
+            response = client.create_vm(name=action.name, **action.params)
+            return response["instances"][0]["id"]
+        if action.kind == "wait":
+            return self.poller.wait(vm_id)
+        if action.kind == "label":
+            return client.update_virtual_machine_labels(vm_id, action.params["labels"])
+        if action.kind == "sg-rules":
+            rules = action.params["rules"]
+            if attempt:
+                instance = client.retrieve_vm_details(vm_id)["instance"]
+                rules = [rule for _, rule in plan_sg_rules([instance], [vm_id], rules)[0]]
+            for rule in rules:
+                client.set_sg_rules(vm_id, **rule)
+            return None
+        if action.kind == "resize":
+            if attempt:
+                instance = client.retrieve_vm_details(vm_id)["instance"]
+                if instance["status"] == "RESIZING" or _field_name(instance, "flavor") == action.params["flavor"]:
+                    return None
+            return client.resize_virtual_machine(vm_id, action.params["flavor"])
+        if action.kind == "delete":
+            if attempt and self._find_id(vm_id) is None:
+                return None
+            return client.delete_virtual_machine(vm_id)
+        raise ValueError(f"Invalid action kind: {action.kind}")
+
+    def _instances(self):
+        instances = self.client.list_virtual_machines().get("instances", [])
+        environment = self.client.environment
+        return [instance for instance in instances if _environment_name(instance) in (None, environment)]
+
+    def _find(self, name):
+        # A VM being deleted to make way for this one doesn't count
+        return next(
+            (
+                instance
+                for instance in self._instances()
+                if instance.get("name") == name and instance.get("status") not in ("DELETING", "DELETED")
+            ),
+            None,
+        )
+
+    def _find_id(self, vm_id):
+        return next((instance for instance in self._instances() if str(instance["id"]) == str(vm_id)), None)
+
+
+def apply_plan(client, plan, max_workers=8, retries=2, retry_delay=1, poll_interval=10, timeout=900):
+    """
+    Carries out a plan, each action as soon as the actions it comes after are done.
+
+    A failed action is retried after checking whether it took effect anyway, so a create is never sent twice
+    for a VM that exists. Actions that come after a failed action are skipped, the others carry on.
+
+    :param client: A Hyperstack client, with its environment set.
+    :param plan: A Plan from plan_reconcile.
+    :param max_workers: Maximum number of actions running at the same time (default 8).
+    :param retries: Number of times a failed action is retried (default 2).
+    :param retry_delay: Seconds before the first retry, doubled for each further one (default 1).
+    :param poll_interval: Seconds between list calls while waiting for new VMs to become ACTIVE (default 10).
+    :param timeout: Maximum number of seconds to wait for a new VM to become ACTIVE (default 900).
+    :return: A report dict with "applied", "failed" and "skipped" lists. Applied and skipped entries are
+             dicts with the "action", plus the "result" for applied ones (the new VM ID for creates). Failed
+             entries have the "action" and the "error".
+    """
+    client._check_environment_set()
+    executor = _Executor(client, poll_interval, timeout)
+    results = {}
+    report = {"applied": [], "failed": [], "skipped": []}
+
+    def run(action, vm_id):
+        # A VM that failed to boot or timed out won't do better on a second wait
+        attempts = 1 if action.kind == "wait" else retries + 1
+        for attempt in range(attempts):
+            try:
+                return executor.perform(action, vm_id, attempt)
+            except Exception:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(retry_delay * 2**attempt)
+
+    pending = list(plan.actions)
+    running = {}
+    failed = set()
+    with ContextThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            waiting = []
+            for action in pending:
+                if any(key in failed for key in action.after):
+                    failed.add(action.key)
+                    report["skipped"].append({"action": action})
+                elif all(key in results for key in action.after):
+                    vm_id = action.vm_id if action.vm_id is not None else results.get(("create", action.name, None))
+                    running[pool.submit(run, action, vm_id)] = action
+                else:
+                    waiting.append(action)
+            pending = waiting
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                action = running.pop(future)
+                try:
+                    results[action.key] = future.result()
+                    report["applied"].append({"action": action, "result": results[action.key]})
+                except Exception as e:
+                    failed.add(action.key)
+                    report["failed"].append({"action": action, "error": e})
+    return report
+
+
+def reconcile(client, specs, dry_run=False, prune=True, recreate=False, **kwargs):
+    """
+    Brings the VMs of the client's environment to the desired state.
+
+    The actual state is read with a single list call. Only the differences are sent to the API: creates for
+    missing replicas, resizes, label and security rule updates, and deletes of duplicates and surplus replicas.
+
+    :param client: A Hyperstack client, with its environment set.
+    :param specs: The desired state, a list of VMSpec.
+    :param dry_run: Only plan, without changing anything (default False).
+    :param prune: See plan_reconcile.
+    :param recreate: See plan_reconcile.
+    :param kwargs: Passed on to apply_plan, e.g. max_workers.
+    :return: The report of apply_plan, with the "plan" added. On a dry run, nothing is applied.
+    """
+    client._check_environment_set()
+    instances = client.list_virtual_machines().get("instances", [])
+    plan = plan_reconcile(specs, instances, client.environment, prune=prune, recreate=recreate)
+    if dry_run:
+        report = {"applied": [], "failed": [], "skipped": []}
+    else:
+        report = apply_plan(client, plan, **kwargs)
+    report["plan"] = plan
+    return report
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from .codecs import get_codec
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    scope TEXT NOT NULL, kind TEXT NOT NULL, id TEXT NOT NULL, hash TEXT NOT NULL, body BLOB NOT NULL,
+    PRIMARY KEY (scope, kind, id)
+);
+CREATE TABLE IF NOT EXISTS kinds (
+    scope TEXT NOT NULL, kind TEXT NOT NULL, refreshed_at REAL NOT NULL,
+    PRIMARY KEY (scope, kind)
+);
+CREATE TABLE IF NOT EXISTS responses (
+    scope TEXT NOT NULL, key TEXT NOT NULL, endpoint TEXT NOT NULL, body BLOB NOT NULL, expires_at REAL NOT NULL,
+    etag TEXT, last_modified TEXT,
+    PRIMARY KEY (scope, key)
+);
+"""
+
+
+def default_snapshot_path():
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "hyperstack", "snapshot.db")
+
+
+class SnapshotStore:
+    """
+    SQLite file keeping the inventory and the cached catalog responses of a client between processes.
+
+    Records are stored one row each with a hash of their content, so saving a fresh listing only writes the
+    records that were added, changed or removed. Data is kept apart per API key, and several processes can
+    share the file.
+    """
+
+    def __init__(self, path=None, codec=None):
+        """
+        :param path: The SQLite file. Defaults to default_snapshot_path(), under the user's cache directory.
+        :param codec: The JSON codec used for the stored records, see get_codec.
+        """
+        self.path = path or default_snapshot_path()
+        self.codec = get_codec(codec)
+        self.scope = ""
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def set_api_key(self, api_key):
+        """Keeps the data of this API key apart from that of others sharing the file."""
+        self.scope = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+    def _connect(self):
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def load_records(self, kind):
+        """
+        :return: The stored records of a kind and the time.time() they were listed at, or (None, None).
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT refreshed_at FROM kinds WHERE scope = ? AND kind = ?", (self.scope, kind)
+            ).fetchone()
+            if row is None:
+                return None, None
+            bodies = connection.execute(
+                "SELECT body FROM records WHERE scope = ? AND kind = ?", (self.scope, kind)
+            ).fetchall()
+        return [self.codec.loads(body) for (body,) in bodies], row[0]
+
+    def save_records(self, kind, records, refreshed_at=None):
+        """
+        Replaces the stored records of a kind, writing only the rows that changed.
+
+        :param kind: The kind of resource, e.g. "virtual_machines".
+        :param records: All records of the kind.
+        :param refreshed_at: The time.time() the records were listed at. None keeps the stored one, for
+                             changes made through the client since.
+        :return: A dict with the number of records "added", "updated", "removed" and "unchanged".
+        """
+        rows = {}
+        for record in records:
+            body = self.codec.dumps(record)
+            rows[str(record["id"])] = (hashlib.sha1(body).hexdigest(), body)
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                stored = dict(
+                    connection.execute(
+                        "SELECT id, hash FROM records WHERE scope = ? AND kind = ?", (self.scope, kind)
+                    ).fetchall()
+                )
+                changed = [
+                    (self.scope, kind, key, digest, body)
+                    for key, (digest, body) in rows.items()
+                    if stored.get(key) != digest
+                ]
+                removed = [(self.scope, kind, key) for key in stored if key not in rows]
+                connection.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)", changed)
+                connection.executemany("DELETE FROM records WHERE scope = ? AND kind = ? AND id = ?", removed)
+                if refreshed_at is not None:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO kinds VALUES (?, ?, ?)", (self.scope, kind, refreshed_at)
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        added = sum(1 for _, _, key, _, _ in changed if key not in stored)
+        return {
+            "added": added,
+            "updated": len(changed) - added,
+            "removed": len(removed),
+            "unchanged": len(rows) - len(changed),
+        }
+
+    def expire(self, kind=None):
+        """Marks the stored records of a kind, or of every kind, as needing a refresh."""
+        with self._lock:
+            connection = self._connect()
+            if kind is None:
+                connection.execute("UPDATE kinds SET refreshed_at = 0 WHERE scope = ?", (self.scope,))
+            else:
+                connection.execute("UPDATE kinds SET refreshed_at = 0 WHERE scope = ? AND kind = ?", (self.scope, kind))
+
+    def load_response(self, key):
+        """
+        :return: A stored response as (value, expires_at, etag, last_modified), with expires_at a time.time(),
+                 or None.
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT body, expires_at, etag, last_modified FROM responses WHERE scope = ? AND key = ?",
+                    (self.scope, _response_key(key)),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        return (self.codec.loads(row[0]),) + tuple(row[1:])
+
+    def save_response(self, key, value, expires_at, etag=None, last_modified=None):
+        """Stores a response, with expires_at a time.time()."""
+        body = self.codec.dumps(value)
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.scope, _response_key(key), key[0], body, expires_at, etag, last_modified),
+            )
+
+    def delete_responses(self, endpoint=None):
+        """Removes the stored responses of an endpoint, or all of them."""
+        with self._lock:
+            if endpoint is None:
+                self._connect().execute("DELETE FROM responses WHERE scope = ?", (self.scope,))
+            else:
+                self._connect().execute(
+                    "DELETE FROM responses WHERE scope = ? AND endpoint = ?", (self.scope, endpoint)
+                )
+
+
+def _response_key(key):
+    endpoint, params = key
+    return json.dumps([endpoint, [list(param) for param in params]])
@@ -0,0 +1,692 @@
+"""
+In-process stand-in for the Hyperstack infrahub v1 API, for tests and benchmarks.
+
+    with MockAPIServer(latency=0.01, boot_time=0.5) as server:
+        client = server.client()
+        client.set_environment("default-NORWAY-1")
+        vm_id = client.create_vm("vm", "Ubuntu Server 22.04 LTS R535 CUDA 12.2", "n3-A100x1")["instances"][0]["id"]
+        client.wait_for_vms([vm_id], poll_interval=0.1)
+
+The server keeps its state in memory, simulates VM state transitions over time, and can add latency and
+inject errors so that retries, waiters and deploy flows can be exercised without the real API.
+"""
+
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+REGIONS = ["NORWAY-1", "CANADA-1"]
+IMAGE_NAME = "Ubuntu Server 22.04 LTS R535 CUDA 12.2"
+
+# (gpu model, flavor name prefix, cpus per gpu, ram per gpu)
+GPU_MODELS = [
+    ("A100-80G-PCIe", "n3-A100", 28, 120.0),
+    ("H100-80G-PCIe", "n3-H100", 28, 180.0),
+    ("RTX-A6000", "n3-RTX-A6000", 8, 58.0),
+]
+GPU_COUNTS = [1, 2, 4, 8]
+
+
+class _Route:
+    def __init__(self, method, pattern, handler):
+        self.method = method
+        self.pattern = re.compile(f"^/v1/{pattern}$")
+        self.handler = handler
+
+
+class MockAPIServer:
+    """
+    Threaded HTTP server implementing the endpoints used by the Hyperstack client.
+
+    VMs go through BUILD to ACTIVE ``boot_time`` seconds after they are created, power actions take
+    ``transition_time`` seconds, and the floating IP of a VM appears ``floating_ip_delay`` seconds after it
+    becomes ACTIVE. Catalog endpoints send an ETag and answer 304 to a matching If-None-Match.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        latency_jitter=0.0,
+        boot_time=1.0,
+        transition_time=0.5,
+        floating_ip_delay=0.0,
+        boot_error_rate=0.0,
+        error_rate=0.0,
+        seed=None,
+    ):
+        """
+        :param latency: Seconds added to every response (default 0).
+        :param latency_jitter: Maximum random seconds added on top of latency (default 0).
+        :param boot_time: Seconds from creating a VM until it is ACTIVE (default 1).
+        :param transition_time: Seconds power actions, resizes and deletes take (default 0.5).
+        :param floating_ip_delay: Seconds from ACTIVE until the floating IP is assigned (default 0).
+        :param boot_error_rate: Probability that a new VM ends up in ERROR instead of ACTIVE (default 0).
+        :param error_rate: Probability that any request fails with a 500 (default 0).
+        :param seed: Seed for the random latency and errors.
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.boot_time = boot_time
+        self.transition_time = transition_time
+        self.floating_ip_delay = floating_ip_delay
+        self.boot_error_rate = boot_error_rate
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._injected_errors = []
+        self.request_log = []
+
+        self.environments = {}
+        self.virtual_machines = {}
+        self.volumes = {}
+        self.profiles = {}
+        self.flavors = self._build_flavors()
+        self.images = self._build_images()
+        self.stock = self._build_stock()
+        self.volume_types = ["Cloud-SSD"]
+        for region in REGIONS:
+            self.add_environment(f"default-{region}", region)
+
+        self._routes = [
+            _Route("GET", "core/environments", self._list_environments),
+            _Route("POST", "core/environments", self._create_environment),
+            _Route("GET", r"core/environments/(\d+)", self._get_environment),
+            _Route("PUT", r"core/environments/(\d+)", self._update_environment),
+            _Route("DELETE", r"core/environments/(\d+)", self._delete_environment),
+            _Route("GET", "core/virtual-machines", self._list_virtual_machines),
+            _Route("POST", "core/virtual-machines", self._create_virtual_machines),
+            _Route("GET", r"core/virtual-machines/(\d+)", self._get_virtual_machine),
+            _Route("DELETE", r"core/virtual-machines/(\d+)", self._delete_virtual_machine),
+            _Route(
+                "GET",
+                r"core/virtual-machines/(\d+)/(start|stop|hard-reboot|hibernate|hibernate-restore)",
+                self._virtual_machine_action,
+            ),
+            _Route("POST", r"core/virtual-machines/(\d+)/resize", self._resize_virtual_machine),
+            _Route("PUT", r"core/virtual-machines/(\d+)/label", self._label_virtual_machine),
+            _Route("POST", r"core/virtual-machines/(\d+)/sg-rules", self._create_sg_rule),
+            _Route("DELETE", r"core/virtual-machines/(\d+)/sg-rules/(\d+)", self._delete_sg_rule),
+            _Route("POST", r"core/virtual-machines/(\d+)/(attach|detach)-floatingip", self._floating_ip_action),
+            _Route("GET", "core/flavors", self._list_flavors),
+            _Route("GET", "core/images", self._list_images),
+            _Route("GET", "core/stocks", self._list_stock),
+            _Route("GET", "core/regions", self._list_regions),
+            _Route("GET", "core/volume-types", self._list_volume_types),
+            _Route("GET", "core/volumes", self._list_volumes),
+            _Route("POST", "core/volumes", self._create_volume),
+            _Route("GET", r"core/volumes/(\d+)", self._get_volume),
+            _Route("DELETE", r"core/volumes/(\d+)", self._delete_volume),
+            _Route("GET", "core/profiles", self._list_profiles),
+            _Route("POST", "core/profiles", self._create_profile),
+            _Route("GET", r"core/profiles/(\d+)", self._get_profile),
+            _Route("DELETE", r"core/profiles/(\d+)", self._delete_profile),
+        ]
+        self._httpd = None
+        self._thread = None
+
+    # Lifecycle
+
+    def start(self):
+        """Starts serving on a free local port."""
+        server = self
+
+        class Handler(_Handler):
+            mock = server
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1/"
+
+    def client(self, **kwargs):
+        """
+        Returns a Hyperstack client pointed at this server.
+
+        :param kwargs: Passed on to Hyperstack.
+        """
+        from .client import Hyperstack
+
+        client = Hyperstack(api_key=kwargs.pop("api_key", "mock-api-key"), **kwargs)
+        client.base_url = self.base_url
+        return client
+
+    # Test controls
+
+    def inject_error(self, status=503, count=1, method=None, path=None, retry_after=None):
+        """
+        Makes the next matching requests fail.
+
+        :param status: The HTTP status to answer with (default 503).
+        :param count: Number of requests to fail (default 1).
+        :param method: Only fail requests with this method.
+        :param path: Only fail requests whose path (e.g. "core/stocks") matches this regular expression.
+        :param retry_after: Value of the Retry-After header to send.
+        """
+        with self._lock:
+            self._injected_errors.append(
+                {
+                    "status": status,
+                    "count": count,
+                    "method": method,
+                    "path": re.compile(path) if path else None,
+                    "retry_after": retry_after,
+                }
+            )
+
+    def request_count(self, method=None, path=None):
+        """
+        Returns the number of requests received.
+
+        :param method: Only count requests with this method.
+        :param path: Only count requests whose path matches this regular expression.
+        """
+        pattern = re.compile(path) if path else None
+        with self._lock:
+            return sum(
+                1
+                for logged_method, logged_path in self.request_log
+                if (method is None or logged_method == method) and (pattern is None or pattern.search(logged_path))
+            )
+
+    def add_environment(self, name, region="NORWAY-1"):
+        with self._lock:
+            environment = {
+                "id": next(self._ids),
+                "name": name,
+                "region": region,
+                "org_id": 1,
+                "created_at": _timestamp(),
+            }
+            self.environments[environment["id"]] = environment
+            return environment
+
+    def add_virtual_machines(self, count, environment="default-NORWAY-1", status="ACTIVE", **fields):
+        """Adds VMs directly in the given status, e.g. to benchmark large list responses."""
+        with self._lock:
+            vms = [self._new_vm(f"vm-{i}", environment, "n3-A100x1", IMAGE_NAME, True, "") for i in range(count)]
+            for vm in vms:
+                vm.update(status=status, **fields)
+                vm["_transitions"] = []
+            return vms
+
+    def set_vm_status(self, vm_id, status):
+        with self._lock:
+            vm = self.virtual_machines[int(vm_id)]
+            vm["status"] = status
+            vm["_transitions"] = []
+
+    # Catalog
+
+    def _build_flavors(self):
+        flavors = []
+        for region in REGIONS:
+            for gpu, prefix, cpus, ram in GPU_MODELS:
+                flavors.append(
+                    {
+                        "gpu": gpu,
+                        "region_name": region,
+                        "flavors": [
+                            {
+                                "id": next(self._ids),
+                                "name": f"{prefix}x{count}",
+                                "region_name": region,
+                                "cpu": cpus * count,
+                                "ram": ram * count,
+                                "disk": 100 * count,
+                                "ephemeral": 0,
+                                "gpu": gpu,
+                                "gpu_count": count,
+                                "stock_available": True,
+                            }
+                            for count in GPU_COUNTS
+                        ],
+                    }
+                )
+        return flavors
+
+    def _build_images(self):
+        return [
+            {
+                "region_name": region,
+                "type": "Ubuntu",
+                "logo": "",
+                "images": [
+                    {
+                        "id": next(self._ids),
+                        "name": IMAGE_NAME,
+                        "region_name": region,
+                        "type": "Ubuntu",
+                        "version": "22.04",
+                        "size": 12.5,
+                        "display_size": "12.5 GB",
+                        "description": "Ubuntu Server with NVIDIA drivers and CUDA preinstalled",
+                        "is_public": True,
+                        "labels": [],
+                    }
+                ],
+            }
+            for region in REGIONS
+        ]
+
+    def _build_stock(self):
+        return [
+            {
+                "region": region,
+                "stock-type": "GPU",
+                "models": [
+                    {
+                        "model": gpu,
+                        "available": "24",
+                        "planned_7_days": "32",
+                        "planned_30_days": "48",
+                        "configurations": {"1x": 8, "2x": 4, "4x": 2, "8x": 1},
+                    }
+                    for gpu, _, _, _ in GPU_MODELS
+                ],
+            }
+            for region in REGIONS
+        ]
+
+    # State
+
+    def _find_flavor(self, name):
+        for group in self.flavors:
+            for flavor in group["flavors"]:
+                if flavor["name"] == name:
+                    return flavor
+        return None
+
+    def _environment_by_name(self, name):
+        for environment in self.environments.values():
+            if environment["name"] == name:
+                return environment
+        return None
+
+    def _new_vm(self, name, environment_name, flavor_name, image_name, assign_floating_ip, user_data):
+        environment = self._environment_by_name(environment_name)
+        flavor = self._find_flavor(flavor_name)
+        now = time.monotonic()
+        vm_id = next(self._ids)
+        vm = {
+            "id": vm_id,
+            "name": name,
+            "status": "BUILD",
+            "power_state": "NOSTATE",
+            "vm_state": "building",
+            "fixed_ip": f"10.0.{vm_id // 256 % 256}.{vm_id % 256}",
+            "floating_ip": None,
+            "floating_ip_status": "NOT_ATTACHED",
+            "environment": {
+                "id": environment["id"],
+                "name": environment["name"],
+                "org_id": 1,
+                "region": environment["region"],
+            },
+            "image": {"name": image_name},
+            "flavor": {key: flavor[key] for key in ("id", "name", "cpu", "ram", "disk", "gpu", "gpu_count")},
+            "keypair": {"name": "development-key"},
+            "volume_attachments": [],
+            "security_rules": [],
+            "labels": [],
+            "user_data": user_data,
+            "created_at": _timestamp(),
+            "_transitions": [],
+        }
+        if self._random.random() < self.boot_error_rate:
+            vm["_transitions"].append((now + self.boot_time, {"status": "ERROR", "vm_state": "error"}))
+        else:
+            vm["_transitions"].append(
+                (now + self.boot_time, {"status": "ACTIVE", "power_state": "RUNNING", "vm_state": "active"})
+            )
+            if assign_floating_ip:
+                floating_ip = f"185.0.{vm_id // 256 % 256}.{vm_id % 256}"
+                vm["_transitions"].append(
+                    (
+                        now + self.boot_time + self.floating_ip_delay,
+                        {"floating_ip": floating_ip, "floating_ip_status": "ATTACHED"},
+                    )
+                )
+        self.virtual_machines[vm_id] = vm
+        return vm
+
+    def _advance(self, now=None):
+        now = time.monotonic() if now is None else now
+        for vm_id, vm in list(self.virtual_machines.items()):
+            while vm["_transitions"] and vm["_transitions"][0][0] <= now:
+                _, updates = vm["_transitions"].pop(0)
+                if updates is None:
+                    del self.virtual_machines[vm_id]
+                    break
+                vm.update(updates)
+
+    def _transition(self, vm, status, final):
+        now = time.monotonic()
+        vm["status"] = status
+        vm["_transitions"] = [(now + self.transition_time, final)]
+
+    # Request handling
+
+    def handle(self, method, raw_path, headers, body):
+        """Handles one request. Returns (status, headers, payload)."""
+        url = urlsplit(raw_path)
+        path = url.path
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        with self._lock:
+            self.request_log.append((method, path[len("/v1/") :]))
+            injected = self._take_injected_error(method, path[len("/v1/") :])
+            fail_randomly = self._random.random() < self.error_rate
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+        if delay:
+            time.sleep(delay)
+
+        if injected is not None:
+            response_headers = {}
+            if injected["retry_after"] is not None:
+                response_headers["Retry-After"] = str(injected["retry_after"])
+            return injected["status"], response_headers, {"status": False, "message": "Injected error"}
+        if fail_randomly:
+            return 500, {}, {"status": False, "message": "Internal server error"}
+        if not headers.get("api_key"):
+            return 401, {}, {"status": False, "message": "Missing api_key header"}
+
+        for route in self._routes:
+            if route.method != method:
+                continue
+            match = route.pattern.match(path)
+            if match:
+                with self._lock:
+                    self._advance()
+                    try:
+                        return route.handler(*match.groups(), query=query, body=body, headers=headers)
+                    except KeyError:
+                        return 404, {}, {"status": False, "message": "Not found"}
+        return 404, {}, {"status": False, "message": f"No route for {method} {path}"}
+
+    def _take_injected_error(self, method, path):
+        for injected in self._injected_errors:
+            if injected["method"] not in (None, method):
+                continue
+            if injected["path"] is not None and not injected["path"].search(path):
+                continue
+            injected["count"] -= 1
+            if injected["count"] <= 0:
+                self._injected_errors.remove(injected)
+            return injected
+        return None
+
+    def _catalog(self, payload, headers):
+        etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, None
+        return 200, {"ETag": etag}, payload
+
+    # Environments
+
+    def _list_environments(self, query, body, headers):
+        return 200, {}, {"status": True, "environments": list(self.environments.values())}
+
+    def _create_environment(self, query, body, headers):
+        environment = self.add_environment(body["name"], body["region"])
+        return 200, {}, {"status": True, "environment": environment}
+
+    def _get_environment(self, environment_id, query, body, headers):
+        return 200, {}, {"status": True, "environment": self.environments[int(environment_id)]}
+
+    def _update_environment(self, environment_id, query, body, headers):
+        environment = self.environments[int(environment_id)]
+        environment["name"] = body["name"]
+        return 200, {}, {"status": True, "environment": environment}
+
+    def _delete_environment(self, environment_id, query, body, headers):
+        del self.environments[int(environment_id)]
+        return 200, {}, {"status": True, "message": "Environment deleted"}
+
+    # Virtual machines
+
+    def _list_virtual_machines(self, query, body, headers):
+        instances = [_public(vm) for vm in self.virtual_machines.values()]
+        if "environment" in query:
+            instances = [vm for vm in instances if vm["environment"]["name"] == query["environment"]]
+        return 200, {}, {"status": True, "message": "Getting instances success", **_paginate(instances, query)}
+
+    def _create_virtual_machines(self, query, body, headers):
+        if self._environment_by_name(body.get("environment_name")) is None:
+            return 400, {}, {"status": False, "message": "Environment not found"}
+        if self._find_flavor(body.get("flavor_name")) is None:
+            return 400, {}, {"status": False, "message": "Flavor not found"}
+        count = body.get("count", 1)
+        vms = [
+            self._new_vm(
+                body["name"] if count == 1 else f"{body['name']}-{i + 1}",
+                body["environment_name"],
+                body["flavor_name"],
+                body["image_name"],
+                body.get("assign_floating_ip", False),
+                body.get("user_data", ""),
+            )
+            for i in range(count)
+        ]
+        return 200, {}, {"status": True, "message": "Creating instances", "instances": [_public(vm) for vm in vms]}
+
+    def _get_virtual_machine(self, vm_id, query, body, headers):
+        return 200, {}, {"status": True, "instance": _public(self.virtual_machines[int(vm_id)])}
+
+    def _delete_virtual_machine(self, vm_id, query, body, headers):
+        vm = self.virtual_machines[int(vm_id)]
+        self._transition(vm, "DELETING", None)
+        return 200, {}, {"status": True, "message": "Deleting instance"}
+
+    def _virtual_machine_action(self, vm_id, action, query, body, headers):
+        vm = self.virtual_machines[int(vm_id)]
+        status, final = {
+            "start": ("STARTING", {"status": "ACTIVE", "power_state": "RUNNING"}),
+            "stop": ("STOPPING", {"status": "SHUTOFF", "power_state": "SHUTDOWN"}),
+            "hard-reboot": ("HARD_REBOOT", {"status": "ACTIVE", "power_state": "RUNNING"}),
+            "hibernate": ("HIBERNATING", {"status": "HIBERNATED", "power_state": "SHUTDOWN"}),
+            "hibernate-restore": ("RESTORING", {"status": "ACTIVE", "power_state": "RUNNING"}),
+        }[action]
+        self._transition(vm, status, final)
+        return 200, {}, {"status": True, "message": f"Instance {action} requested"}
+
+    def _resize_virtual_machine(self, vm_id, query, body, headers):
+        vm = self.virtual_machines[int(vm_id)]
+        flavor = self._find_flavor(body.get("flavor_name"))
+        if flavor is None:
+            return 400, {}, {"status": False, "message": "Flavor not found"}
+        self._transition(
+            vm,
+            "RESIZING",
+            {
+                "status": "ACTIVE",
+                "flavor": {key: flavor[key] for key in ("id", "name", "cpu", "ram", "disk", "gpu", "gpu_count")},
+            },
+        )
+        return 200, {}, {"status": True, "message": "Resizing instance"}
+
+    def _label_virtual_machine(self, vm_id, query, body, headers):
+        self.virtual_machines[int(vm_id)]["labels"] = list(body["labels"])
+        return 200, {}, {"status": True, "message": "Labels updated"}
+
+    def _create_sg_rule(self, vm_id, query, body, headers):
+        vm = self.virtual_machines[int(vm_id)]
+        rule = {
+            "id": next(self._ids),
+            "direction": body["direction"],
+            "protocol": body["protocol"],
+            "ethertype": body["ethertype"],
+            "remote_ip_prefix": body["remote_ip_prefix"],
+            "port_range_min": body.get("port_range_min"),
+            "port_range_max": body.get("port_range_max"),
+            "status": "SUCCESS",
+            "created_at": _timestamp(),
+        }
+        vm["security_rules"].append(rule)
+        return 200, {}, {"status": True, "security_rule": rule}
+
+    def _delete_sg_rule(self, vm_id, rule_id, query, body, headers):
+        vm = self.virtual_machines[int(vm_id)]
+        vm["security_rules"] = [rule for rule in vm["security_rules"] if rule["id"] != int(rule_id)]
+        return 200, {}, {"status": True, "message": "Security rule deleted"}
+
+    def _floating_ip_action(self, vm_id, action, query, body, headers):
+        vm = self.virtual_machines[int(vm_id)]
+        if action == "attach":
+            vm.update(floating_ip=f"185.0.{vm['id'] // 256 % 256}.{vm['id'] % 256}", floating_ip_status="ATTACHED")
+        else:
+            vm.update(floating_ip=None, floating_ip_status="NOT_ATTACHED")
+        return 200, {}, {"status": True, "message": f"Floating IP {action}ed"}
+
+    # Catalog endpoints
+
+    def _list_flavors(self, query, body, headers):
+        flavors = [group for group in self.flavors if query.get("region") in (None, group["region_name"])]
+        return self._catalog({"status": True, "data": flavors}, headers)
+
+    def _list_images(self, query, body, headers):
+        images = [group for group in self.images if query.get("region") in (None, group["region_name"])]
+        return self._catalog({"status": True, "images": images}, headers)
+
+    def _list_stock(self, query, body, headers):
+        return self._catalog({"status": True, "stocks": self.stock}, headers)
+
+    def _list_regions(self, query, body, headers):
+        regions = [
+            {"id": i, "name": region, "description": region}
+            for i, region in enumerate(REGIONS, 1)
+            if query.get("region") in (None, region)
+        ]
+        return self._catalog({"status": True, "regions": regions}, headers)
+
+    def _list_volume_types(self, query, body, headers):
+        return self._catalog({"status": True, "volume_types": self.volume_types}, headers)
+
+    # Volumes
+
+    def _list_volumes(self, query, body, headers):
+        volumes = list(self.volumes.values())
+        if "environment" in query:
+            volumes = [volume for volume in volumes if volume["environment"]["name"] == query["environment"]]
+        return 200, {}, {"status": True, **_paginate(volumes, query, key="volumes")}
+
+    def _create_volume(self, query, body, headers):
+        environment = self._environment_by_name(body.get("environment_name"))
+        if environment is None:
+            return 400, {}, {"status": False, "message": "Environment not found"}
+        volume = {
+            "id": next(self._ids),
+            "name": body["name"],
+            "environment": {"name": environment["name"]},
+            "volume_type": body["volume_type"],
+            "size": body.get("size", 50),
+            "status": "available",
+            "bootable": False,
+            "description": body.get("description"),
+            "image_id": body.get("image_id"),
+            "created_at": _timestamp(),
+        }
+        self.volumes[volume["id"]] = volume
+        return 200, {}, {"status": True, "volume": volume}
+
+    def _get_volume(self, volume_id, query, body, headers):
+        return 200, {}, {"status": True, "volume": self.volumes[int(volume_id)]}
+
+    def _delete_volume(self, volume_id, query, body, headers):
+        del self.volumes[int(volume_id)]
+        return 200, {}, {"status": True, "message": "Volume deleted"}
+
+    # Profiles
+
+    def _list_profiles(self, query, body, headers):
+        return 200, {}, {"status": True, "profiles": list(self.profiles.values())}
+
+    def _create_profile(self, query, body, headers):
+        profile = {
+            "id": next(self._ids),
+            "name": body["name"],
+            "description": body.get("description"),
+            "data": body["data"],
+            "created_at": _timestamp(),
+        }
+        self.profiles[profile["id"]] = profile
+        return 200, {}, {"status": True, "profile": profile}
+
+    def _get_profile(self, profile_id, query, body, headers):
+        return 200, {}, {"status": True, "profile": self.profiles[int(profile_id)]}
+
+    def _delete_profile(self, profile_id, query, body, headers):
+        del self.profiles[int(profile_id)]
+        return 200, {}, {"status": True, "message": "Profile deleted"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The headers and body go out in separate writes on a kept-alive connection, which with Nagle's algorithm
+    # would hold the body back until the client's delayed ACK, about 40 ms per request
+    disable_nagle_algorithm = True
+    mock = None
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            status, headers, payload = 400, {}, {"status": False, "message": "Invalid JSON body"}
+        else:
+            status, headers, payload = self.mock.handle(self.command, self.path, self.headers, body)
+
+        content = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _public(vm):
+    return {key: value for key, value in vm.items() if not key.startswith("_")}
+
+
+def _paginate(items, query, key="instances"):
+    if "page" not in query and "pageSize" not in query:
+        return {key: items}
+    page = int(query.get("page", 1))
+    page_size = int(query.get("pageSize", 50))
+    start = (page - 1) * page_size
+    return {key: items[start : start + page_size], "page": page, "pageSize": page_size, "count": len(items)}
+
+
+def _timestamp():
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
@@ -0,0 +1,264 @@
+import email.utils
+import random
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter that keeps track of how often pooled connections are reused.
+
+    Every request sent through the adapter is counted, as is every socket urllib3 has to connect.
+    The difference between the two is the number of requests that were served over an existing
+    keep-alive connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self.requests_sent = 0
+        self.new_connections = 0
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self):
+                adapter._record_new_connection()
+                super().connect()
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                adapter._record_new_connection()
+                super().connect()
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = CountingHTTPConnection
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = CountingHTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def _record_new_connection(self):
+        with self._stats_lock:
+            self.new_connections += 1
+
+    def send(self, request, **kwargs):
+        with self._stats_lock:
+            self.requests_sent += 1
+        return super().send(request, **kwargs)
+
+    def stats(self):
+        """
+        Returns the connection counters for this adapter.
+
+        :return: A dict with the number of requests sent, new connections opened and connections reused.
+        """
+        with self._stats_lock:
+            return {
+                "requests": self.requests_sent,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests_sent - self.new_connections, 0),
+            }
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried, and how long to wait before retrying.
+
+    Idempotent requests are retried on connection errors and on the statuses in ``status_forcelist``.
+    Any request is retried on 429 Too Many Requests, since the server did not process it. The wait is an
+    exponential backoff with full jitter, unless the server asked for a specific wait with Retry-After.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_backoff=30,
+        status_forcelist=(429, 500, 502, 503, 504),
+        jitter=True,
+    ):
+        """
+        :param max_retries: Maximum number of retries per request (default 3).
+        :param backoff_factor: Base wait in seconds, doubled after every attempt (default 0.5).
+        :param max_backoff: Maximum backoff wait in seconds (default 30).
+        :param status_forcelist: Response statuses that are retried (default 429, 500, 502, 503 and 504).
+        :param jitter: Whether to randomise the backoff wait between 0 and its maximum (default True).
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = frozenset(status_forcelist)
+        self.jitter = jitter
+
+    def should_retry(self, method, attempt, response=None):
+        """
+        Returns whether a request should be retried.
+
+        :param method: The HTTP method of the request.
+        :param attempt: The number of retries already made.
+        :param response: The response, or None if the request failed with a connection error.
+        """
+        if attempt >= self.max_retries:
+            return False
+        if response is None:
+            return method.upper() in self.IDEMPOTENT_METHODS
+        if response.status_code == 429:
+            return 429 in self.status_forcelist
+        return response.status_code in self.status_forcelist and method.upper() in self.IDEMPOTENT_METHODS
+
+    def backoff(self, attempt, response=None):
+        """
+        Returns the number of seconds to wait before the next retry.
+
+        :param attempt: The number of retries already made.
+        :param response: The failed response, whose Retry-After header is honoured if present.
+        """
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_backoff, self.backoff_factor * (2**attempt))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date.
+
+    :return: The number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the rate of requests.
+
+    Each request takes one token. Tokens refill at ``rate`` per second up to ``capacity``. A request that finds
+    the bucket empty reserves the next free token and sleeps until it is due, so concurrent callers are served
+    in order and the allowed rate is filled without being exceeded.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        :param rate: Number of requests allowed per second.
+        :param capacity: Maximum burst size. Defaults to one second's worth of requests.
+        """
+        if rate <= 0:
+            raise ValueError("'rate' must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Takes a token, sleeping until one is available.
+
+        :return: The number of seconds spent waiting.
+        """
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def reserve(self):
+        """
+        Takes a token without waiting for it, e.g. for callers that sleep in an event loop.
+
+        :return: The number of seconds until the token is due.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def pause(self, seconds):
+        """Holds back all callers for the given number of seconds, e.g. when the server answers 429."""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Leave the bucket in debt so that the next token is due in `seconds`
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls so that only one of them does the work.
+
+    The first caller for a key runs the function. Callers arriving with the same key while it is running
+    wait for it and receive the same result, or the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Runs fn, or waits for the in-flight call with the same key.
+
+        :param key: Hashable key identifying identical calls.
+        :param fn: Callable taking no arguments.
+        :return: The result of fn.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hyperstack import AsyncHyperstack, Hyperstack
+
+pytest.importorskip("aiohttp")
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        server = self.server
+        with server.lock:
+            server.calls.append((self.command, self.path, body))
+            server.headers.append(dict(self.headers))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        payload = json.dumps(server.response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    server.lock = threading.Lock()
+    server.calls = []
+    server.headers = []
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.delay = 0
+    server.response = {"status": "success", "instance": {"status": "ACTIVE", "floating_ip": "1.2.3.4"}}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    client = AsyncHyperstack(api_key="test_api_key", **kwargs)
+    client.base_url = server.base_url
+    client.environment = "test-env"
+    return client
+
+
+def test_async_client_forwards_every_sync_method():
+    sync_methods = {name for name in vars(Hyperstack) if not name.startswith("_")}
+    sync_methods -= {"close", "transport_stats"}
+    for name in sync_methods:
+        assert hasattr(AsyncHyperstack, name), name
+
+
+def test_async_create_vm_uses_shared_payload(local_server):
+    async def run():
+        async with make_client(local_server) as client:
+            return await client.create_vm(name="test-vm", image_name="ubuntu-20.04", flavor_name="standard-1")
+
+    result = asyncio.run(run())
+    assert result["status"] == "success"
+    assert local_server.calls == [
+        (
+            "POST",
+            "/v1/core/virtual-machines",
+            {
+                "name": "test-vm",
+                "environment_name": "test-env",
+                "image_name": "ubuntu-20.04",
+                "create_bootable_volume": False,
+                "flavor_name": "standard-1",
+                "key_name": "development-key",
+                "user_data": "",
+                "assign_floating_ip": False,
+                "count": 1,
+            },
+        )
+    ]
+
+
+def test_async_request_merges_headers(local_server):
+    async def main():
+        async with make_client(local_server) as client:
+            await client.get("core/flavors", headers={"X-Request-Id": "abc"})
+
+    asyncio.run(main())
+
+    (headers,) = local_server.headers
+    assert headers["X-Request-Id"] == "abc"
+    assert headers["api_key"] == "test_api_key"
+
+
+def test_async_get_floating_ip_and_wait(local_server):
+    async def run():
+        async with make_client(local_server) as client:
+            active = await client.wait_for_vm_active("vm-123", initial_delay=0)
+            return active, await client.get_floating_ip("vm-123")
+
+    assert asyncio.run(run()) == (True, "1.2.3.4")
+    assert [call[1] for call in local_server.calls] == ["/v1/core/virtual-machines/vm-123"] * 2
+
+
+def test_async_semaphore_bounds_concurrency(local_server):
+    local_server.delay = 0.05
+
+    async def run():
+        async with make_client(local_server, max_concurrency=3) as client:
+            await asyncio.gather(*(client.retrieve_vm_details(f"vm-{i}") for i in range(12)))
+
+    asyncio.run(run())
+    assert len(local_server.calls) == 12
+    assert local_server.max_in_flight <= 3
+
+
+def test_async_environment_not_set():
+    client = AsyncHyperstack(api_key="test_api_key")
+    with pytest.raises(EnvironmentError, match="Environment is not set"):
+        client.list_virtual_machines()
+
+
+def test_async_wait_for_vms(local_server):
+    local_server.response = {"instances": [{"id": 1, "status": "ACTIVE"}, {"id": 2, "status": "ACTIVE"}]}
+
+    async def run():
+        async with make_client(local_server) as client:
+            return [vm_id async for vm_id, _ in client.wait_for_vms([1, 2])]
+
+    assert asyncio.run(run()) == [1, 2]
+    assert len(local_server.calls) == 1
@@ -0,0 +1,135 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hyperstack import Hyperstack
+from hyperstack.cache import ResponseCache
+
+
+def make_response(content=b'{"flavors": []}', status_code=200, headers=None):
+    response = MagicMock()
+    response.content = content
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def decode(response):
+    return response.content
+
+
+@pytest.fixture
+def clock():
+    with patch('hyperstack.cache.time.monotonic') as mock_monotonic:
+        mock_monotonic.return_value = 1000
+        yield mock_monotonic
+
+
+def test_fresh_entry_is_a_hit(clock):
+    cache = ResponseCache(ttls={"core/flavors": 60})
+    send = MagicMock(return_value=make_response())
+
+    assert cache.fetch("core/flavors", {}, send, decode) == b'{"flavors": []}'
+    assert cache.fetch("core/flavors", {}, send, decode) == b'{"flavors": []}'
+
+    send.assert_called_once_with({})
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidations": 0, "evictions": 0, "size": 1}
+
+
+def test_params_are_part_of_the_key(clock):
+    cache = ResponseCache(ttls={"core/flavors": 60})
+    send = MagicMock(return_value=make_response())
+
+    cache.fetch("core/flavors", {"region": "NORWAY-1"}, send, decode)
+    cache.fetch("core/flavors", {"region": "CANADA-1"}, send, decode)
+
+    assert send.call_count == 2
+
+
+def test_expired_entry_is_revalidated(clock):
+    cache = ResponseCache(ttls={"core/images": 60})
+    send = MagicMock(
+        side_effect=[
+            make_response(headers={"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+            make_response(content=b"", status_code=304),
+        ]
+    )
+
+    first = cache.fetch("core/images", None, send, decode)
+    clock.return_value = 1061
+    second = cache.fetch("core/images", None, send, decode)
+
+    assert second is first
+    send.assert_called_with({"If-None-Match": '"v1"', "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert cache.stats()["revalidations"] == 1
+
+    # The 304 refreshed the entry
+    clock.return_value = 1100
+    cache.fetch("core/images", None, send, decode)
+    assert send.call_count == 2
+
+
+def test_expired_entry_without_validators_is_refetched(clock):
+    cache = ResponseCache(ttls={"core/stocks": 30})
+    send = MagicMock(side_effect=[make_response(b"old"), make_response(b"new")])
+
+    cache.fetch("core/stocks", None, send, decode)
+    clock.return_value = 1031
+
+    assert cache.fetch("core/stocks", None, send, decode) == b"new"
+    send.assert_called_with({})
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction(clock):
+    cache = ResponseCache(ttls={"core/flavors": 60}, maxsize=2)
+    send = MagicMock(return_value=make_response())
+
+    cache.fetch("core/flavors", {"region": "a"}, send, decode)
+    cache.fetch("core/flavors", {"region": "b"}, send, decode)
+    cache.fetch("core/flavors", {"region": "a"}, send, decode)
+    cache.fetch("core/flavors", {"region": "c"}, send, decode)
+    cache.fetch("core/flavors", {"region": "a"}, send, decode)
+
+    assert send.call_count == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_invalidate(clock):
+    cache = ResponseCache(ttls={"core/flavors": 60, "core/images": 60})
+    send = MagicMock(return_value=make_response())
+    cache.fetch("core/flavors", None, send, decode)
+    cache.fetch("core/images", None, send, decode)
+
+    cache.invalidate("core/flavors")
+    assert cache.stats()["size"] == 1
+
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+
+@patch('hyperstack.client.Hyperstack._request')
+def test_client_caches_catalog_endpoints(mock_request):
+    mock_request.return_value = make_response()
+    hs = Hyperstack(api_key="test_api_key")
+
+    hs.list_flavors()
+    hs.list_flavors()
+    hs.list_environments()
+    hs.list_environments()
+
+    assert mock_request.call_count == 3
+    assert hs.cache.stats()["hits"] == 1
+
+
+@patch('hyperstack.client.Hyperstack._request')
+def test_client_cache_disabled(mock_request):
+    mock_request.return_value = make_response()
+    hs = Hyperstack(api_key="test_api_key", cache=False)
+
+    hs.list_flavors()
+    hs.list_flavors()
+
+    assert hs.cache is None
+    assert mock_request.call_count == 2
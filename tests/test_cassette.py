@@ -0,0 +1,94 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from hyperstack import Hyperstack
+from hyperstack.cassette import Cassette
+from hyperstack.testing import MockAPIServer
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cassette")
+
+
+def record(path, **kwargs):
+    with MockAPIServer(boot_time=0.1, seed=1) as server:
+        server.add_virtual_machines(50, name="worker", labels=["team-ml"])
+        with server.client(api_key="secret-api-key", cassette=Cassette(path, record=True, **kwargs)) as client:
+            client.environment = "default-NORWAY-1"
+            vms = client.list_virtual_machines()
+            images = list(client.iter_images())
+            (instance,) = client.create_vm("trainer", images[0]["images"][0]["name"], "n3-A100x1")["instances"]
+            client.wait_for_vm_active(instance["id"], initial_delay=0, delay=0.05, max_attempts=50)
+    return vms, images, instance
+
+
+def test_replay_without_server(path):
+    vms, images, instance = record(path)
+
+    with Hyperstack(api_key="other-api-key", cassette=Cassette(path)) as client:
+        client.environment = "default-NORWAY-1"
+        assert client.list_virtual_machines() == vms
+        assert list(client.iter_images()) == images
+        assert client.create_vm("trainer", images[0]["images"][0]["name"], "n3-A100x1")["instances"] == [instance]
+        with patch("hyperstack.api.virtual_machines.time.sleep"):
+            assert client.wait_for_vm_active(instance["id"], initial_delay=0, delay=0.05, max_attempts=50)
+        # The last recorded response answers any further polls
+        assert client.retrieve_vm_details(instance["id"])["instance"]["status"] == "ACTIVE"
+
+        with pytest.raises(LookupError, match="No recorded response for GET .*/core/volumes"):
+            client.list_volumes()
+
+
+def test_secrets_are_not_recorded(path):
+    record(path)
+
+    for name in os.listdir(path):
+        with open(os.path.join(path, name), "rb") as f:
+            assert b"secret-api-key" not in f.read()
+
+
+def test_large_bodies_are_memory_mapped(path):
+    record(path, mmap_threshold=4096)
+    cassette = Cassette(path)
+
+    interaction, body = cassette.next(
+        "GET", "https://example.com/v1/core/virtual-machines?environment=default-NORWAY-1"
+    )
+    assert interaction["body"][2] == "identity"
+    assert isinstance(body, memoryview)
+
+    interaction, body = cassette.next("POST", "https://example.com/v1/core/virtual-machines")
+    assert interaction["body"][2] == "zlib"
+
+
+def test_realtime_replay(path):
+    record(path)
+
+    with Hyperstack(api_key="key", cassette=Cassette(path, realtime=True)) as client:
+        client.environment = "default-NORWAY-1"
+        with patch("hyperstack.cassette.time.sleep") as sleep:
+            client.list_virtual_machines()
+    (elapsed,) = [call.args[0] for call in sleep.call_args_list]
+    assert 0 < elapsed < 5
+
+
+def test_replay_unmaps_bodies_on_close(path):
+    vms, _, _ = record(path, mmap_threshold=4096)
+    cassette = Cassette(path)
+
+    with Hyperstack(api_key="key", cassette=cassette) as client:
+        client.environment = "default-NORWAY-1"
+        assert client.list_virtual_machines() == vms
+        mapping = cassette._map
+    assert mapping.closed
+
+    with Cassette(path) as cassette:
+        _, body = cassette.next("GET", "https://example.com/v1/core/virtual-machines?environment=default-NORWAY-1")
+        mapping = cassette._map
+    # Still used by the body handed out, and unmapped with it
+    assert not mapping.closed and cassette._map is None
+    assert json.loads(bytes(body)) == vms
@@ -1,3 +1,5 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -64,7 +66,7 @@ def test_check_environment_set():
     hs._check_environment_set()  # Should not raise an error
 
 
-@patch('requests.request')
+@patch('requests.Session.request')
 def test_request(mock_request):
     mock_response = MagicMock()
     mock_response.raise_for_status.return_value = None
@@ -78,7 +80,7 @@ def test_request(mock_request):
     )
 
 
-@patch('requests.request')
+@patch('requests.Session.request')
 def test_request_error(mock_request):
     mock_request.side_effect = requests.RequestException("Test error")
 
@@ -120,3 +122,61 @@ def test_put_method(mock_request):
 
     assert result == {"key": "value"}
     mock_request.assert_called_once_with("PUT", "test_endpoint", json={"test": "data"})
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"status": "success"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_pooled_session_reuses_connections(local_server):
+    with Hyperstack(api_key="test_api_key") as hs:
+        hs.base_url = local_server
+        for _ in range(5):
+            assert hs.get("core/environments") == {"status": "success"}
+        stats = hs.transport_stats()
+        assert (stats["requests"], stats["new_connections"], stats["reused_connections"]) == (5, 1, 4)
+
+
+def test_pooled_session_without_keep_alive(local_server):
+    with Hyperstack(api_key="test_api_key", keep_alive=False) as hs:
+        hs.base_url = local_server
+        for _ in range(3):
+            hs.get("core/environments")
+        assert hs.transport_stats()["new_connections"] == 3
+
+
+def test_pooled_session_idle_timeout(local_server):
+    with Hyperstack(api_key="test_api_key", idle_timeout=0) as hs:
+        hs.base_url = local_server
+        hs.get("core/environments")
+        hs._last_request_at -= 1
+        hs.get("core/environments")
+        assert hs.transport_stats()["new_connections"] == 2
+
+
+def test_close_closes_session():
+    hs = Hyperstack(api_key="test_api_key")
+    with patch.object(hs._session, "close") as mock_close:
+        hs.close()
+    mock_close.assert_called_once_with()
@@ -0,0 +1,82 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hyperstack import Hyperstack
+from hyperstack.codecs import CODECS, JSONCodec, StdlibCodec, get_codec
+
+PAYLOAD = {"instances": [{"id": 1, "name": "vm-ü", "labels": ["a"], "floating_ip": None, "ram": 120.5}]}
+
+
+def available_codecs():
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            continue
+    return codecs
+
+
+@pytest.mark.parametrize("codec", available_codecs(), ids=lambda codec: codec.name)
+def test_codec_round_trip(codec):
+    encoded = codec.dumps(PAYLOAD)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == PAYLOAD
+    assert codec.loads(memoryview(encoded)) == PAYLOAD
+    assert codec.loads(bytearray(encoded)) == PAYLOAD
+
+
+def test_get_codec_default_prefers_fastest_installed():
+    codec = get_codec()
+    assert codec.name == available_codecs()[0].name
+
+
+def test_get_codec_falls_back_to_stdlib():
+    with patch.dict(
+        CODECS, {"orjson": MagicMock(side_effect=ImportError), "ujson": MagicMock(side_effect=ImportError)}
+    ):
+        assert isinstance(get_codec(), StdlibCodec)
+
+
+def test_get_codec_instance_and_invalid_name():
+    codec = StdlibCodec()
+    assert get_codec(codec) is codec
+    with pytest.raises(ValueError, match="Invalid codec specified"):
+        get_codec("yaml")
+
+
+def test_incomplete_codec_cannot_be_created():
+    class LoadsOnly(JSONCodec):
+        def loads(self, data):
+            return None
+
+    with pytest.raises(TypeError, match="dumps"):
+        LoadsOnly()
+
+
+@patch('requests.Session.request')
+def test_client_encodes_and_decodes_with_codec(mock_request):
+    codec = MagicMock(spec=JSONCodec)
+    codec.dumps.return_value = b'{"name": "test-env"}'
+    codec.loads.return_value = {"status": "success"}
+    response = MagicMock(status_code=200, content=b'{"status": "success"}')
+    mock_request.return_value = response
+    hs = Hyperstack(api_key="test_api_key", codec=codec)
+
+    assert hs.post("core/environments", data={"name": "test-env"}) == {"status": "success"}
+
+    codec.dumps.assert_called_once_with({"name": "test-env"})
+    codec.loads.assert_called_once_with(response.content)
+    assert mock_request.call_args.kwargs["data"] == b'{"name": "test-env"}'
+    assert "json" not in mock_request.call_args.kwargs
+
+
+@patch('requests.Session.request')
+def test_client_sends_no_body_without_data(mock_request):
+    mock_request.return_value = MagicMock(status_code=200, content=b'{}')
+    hs = Hyperstack(api_key="test_api_key")
+
+    hs.post("core/virtual-machines/1/attach-floatingip")
+
+    assert "data" not in mock_request.call_args.kwargs
@@ -0,0 +1,368 @@
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import hyperstack
+from hyperstack.deploy import (
+    SERVICE_PROBES,
+    HTTPProbe,
+    Pipeline,
+    ServiceNotReadyError,
+    SSHProbe,
+    TCPProbe,
+    create_ollama_vm,
+    deploy_fleet,
+    wait_for_services,
+    wait_until_ready,
+)
+from hyperstack.testing import MockAPIServer
+
+SPEC = {
+    "deployment_type": "ollama",
+    "name": "ollama",
+    "environment": "test-env",
+    "flavor_name": "n2-RTX-A5000x1",
+    "key_name": "test-key",
+}
+
+
+@pytest.fixture
+def mock_api():
+    lock = threading.Lock()
+    created = []
+
+    def create_vm(name, **kwargs):
+        with lock:
+            created.append(name)
+            vm_id = len(created)
+        return {"instances": [{"id": vm_id}]}
+
+    api = {
+        "set_environment": MagicMock(),
+        "create_vm": MagicMock(side_effect=create_vm),
+        "retrieve_vm_details": MagicMock(side_effect=lambda vm_id: {"instance": {"id": vm_id, "status": "ACTIVE"}}),
+        "apply_sg_rules": MagicMock(return_value={"applied": [], "skipped": [], "failed": []}),
+        "get_floating_ip": MagicMock(side_effect=lambda vm_id: f"10.0.0.{vm_id}"),
+    }
+    with patch.multiple('hyperstack.deploy.hyperstack', **api), patch('hyperstack.deploy.time.sleep'):
+        yield api
+
+
+def test_deploy_fleet_replicas(mock_api):
+    results = deploy_fleet(SPEC, replicas=3, max_workers=3)
+
+    assert [result.name for result in results] == ["ollama-1", "ollama-2", "ollama-3"]
+    assert all(result.ok for result in results)
+    assert sorted(result.floating_ip for result in results) == ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    assert mock_api["create_vm"].call_count == 3
+
+
+def test_deploy_fleet_partial_failure(mock_api):
+    def retrieve_vm_details(vm_id):
+        return {"instance": {"id": vm_id, "status": "ERROR" if vm_id == 2 else "ACTIVE"}}
+
+    mock_api["retrieve_vm_details"].side_effect = retrieve_vm_details
+    results = deploy_fleet(SPEC, replicas=3, max_workers=1)
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[1].vm_id == 2
+    assert str(results[1].error) == "VM 2 entered ERROR state"
+    assert results[2].floating_ip == "10.0.0.3"
+
+
+def test_deploy_fleet_progress(mock_api):
+    events = []
+    deploy_fleet(SPEC, progress=lambda name, phase, vm_id: events.append((name, phase, vm_id)))
+
+    assert events == [
+        ("ollama", "creating", None),
+        ("ollama", "booting", 1),
+        ("ollama", "configuring", 1),
+        ("ollama", "ready", 1),
+    ]
+
+
+def test_deploy_fleet_slow_vm_does_not_block_others(mock_api):
+    release = threading.Event()
+    finished = []
+
+    def retrieve_vm_details(vm_id):
+        if vm_id == 1:
+            assert release.wait(timeout=5)
+        return {"instance": {"id": vm_id, "status": "ACTIVE"}}
+
+    def progress(name, phase, vm_id):
+        if phase == "ready":
+            finished.append(vm_id)
+            if len(finished) == 2:
+                release.set()
+
+    mock_api["retrieve_vm_details"].side_effect = retrieve_vm_details
+    results = deploy_fleet(SPEC, replicas=3, max_workers=3, progress=progress)
+
+    assert all(result.ok for result in results)
+    assert finished[-1] == 1
+
+
+def test_deploy_fleet_invalid_type(mock_api):
+    with pytest.raises(ValueError, match="Invalid deployment type"):
+        deploy_fleet({**SPEC, "deployment_type": "invalid"})
+
+
+def test_deploy_applies_sg_rules_in_one_batch(mock_api):
+    deploy_fleet(SPEC)
+
+    mock_api["apply_sg_rules"].assert_called_once_with(
+        [1],
+        [
+            {"port_range_min": 22, "port_range_max": 22},
+            {"port_range_min": 11434, "port_range_max": 11434},
+            {"protocol": "icmp"},
+        ],
+        instances=[{"id": 1, "status": "ACTIVE"}],
+    )
+
+
+def test_deploy_fails_when_sg_rule_fails(mock_api):
+    error = Exception("API Error")
+    mock_api["apply_sg_rules"].return_value = {"applied": [], "skipped": [], "failed": [{"error": error}]}
+
+    results = deploy_fleet(SPEC)
+
+    assert results[0].error is error
+
+
+def test_deploy_fleet_timings(mock_api):
+    instrumentation = MagicMock()
+
+    (result,) = deploy_fleet(SPEC, instrumentation=instrumentation)
+
+    assert set(result.timings) == {"user-data", "create", "wait-active", "sg-rules", "floating-ip"}
+    assert all(duration >= 0 for duration in result.timings.values())
+    assert {call.args[0] for call in instrumentation.record_phase.call_args_list} == set(result.timings)
+
+
+def test_floating_ip_polled_until_assigned(mock_api):
+    mock_api["get_floating_ip"].side_effect = [None, None, "10.0.0.1"]
+
+    (result,) = deploy_fleet(SPEC)
+
+    assert result.floating_ip == "10.0.0.1"
+    assert mock_api["get_floating_ip"].call_count == 3
+
+
+def test_pipeline_runs_independent_steps_together():
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline()
+    pipeline.add("a", lambda results: 1)
+    pipeline.add("b", lambda results: (barrier.wait(), results["a"] + 1)[1], after=["a"])
+    pipeline.add("c", lambda results: (barrier.wait(), results["a"] + 2)[1], after=["a"])
+    pipeline.add("d", lambda results: results["b"] + results["c"], after=["b", "c"])
+    timings = {}
+
+    assert pipeline.run(timings, instrumentation=MagicMock()) == {"a": 1, "b": 2, "c": 3, "d": 5}
+    assert set(timings) == {"a", "b", "c", "d"}
+
+
+def test_pipeline_stops_at_first_error():
+    ran = []
+    pipeline = Pipeline()
+    pipeline.add("a", lambda results: 1 / 0)
+    pipeline.add("b", lambda results: ran.append("b"), after=["a"])
+
+    with pytest.raises(ZeroDivisionError):
+        pipeline.run(instrumentation=MagicMock())
+    assert ran == []
+
+    with pytest.raises(ValueError, match="Step 'c' comes after unknown steps: x"):
+        pipeline.add("c", lambda results: None, after=["x"])
+
+
+def test_deploy_against_mock_server():
+    with MockAPIServer(boot_time=0.2, floating_ip_delay=0.1) as server:
+        client = server.client()
+        with patch.object(hyperstack, "_hyperstack", client):
+            timings = {}
+            vm_id, floating_ip = create_ollama_vm(
+                "ollama", "n3-A100x1", "default-NORWAY-1", "key", poll_interval=0.02, timings=timings
+            )
+
+        vm = server.virtual_machines[vm_id]
+        assert floating_ip == vm["floating_ip"]
+        assert len(vm["security_rules"]) == 3
+        # Ready as soon as the VM and its IP are, instead of after the fixed waits
+        assert sum(timings.values()) < 2
+
+
+def test_deploy_fleet_does_not_list_vms():
+    with MockAPIServer(boot_time=0.1, floating_ip_delay=0) as server:
+        client = server.client()
+        with patch.object(hyperstack, "_hyperstack", client):
+            results = deploy_fleet(
+                {**SPEC, "environment": "default-NORWAY-1", "flavor_name": "n3-A100x1", "poll_interval": 0.02},
+                replicas=3,
+            )
+
+        assert all(result.ok for result in results)
+        assert all(len(server.virtual_machines[result.vm_id]["security_rules"]) == 3 for result in results)
+        # The rules are planned from each VM's own record, not from a listing of every VM
+        assert server.request_count("GET", "core/virtual-machines$") == 0
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def listen():
+    servers = []
+
+    def listen(server):
+        threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield listen
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def http_server(failures=0):
+    """An HTTP server answering 503 to the first `failures` requests, like a service that is still starting."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                requests.append(self.path)
+                status = 503 if len(requests) <= failures else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    lock = threading.Lock()
+    requests = []
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = requests
+    return server
+
+
+def banner_server(banner):
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            self.request.sendall(banner)
+
+    return socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+
+
+def test_probes(listen):
+    ssh_port = listen(banner_server(b"SSH-2.0-OpenSSH_8.9\r\n"))
+    other_port = listen(banner_server(b""))
+    http_port = listen(http_server())
+
+    assert TCPProbe(ssh_port)("127.0.0.1")
+    assert not TCPProbe(closed_port())("127.0.0.1")
+    assert SSHProbe(ssh_port)("127.0.0.1")
+    assert not SSHProbe(other_port)("127.0.0.1")
+    assert HTTPProbe(http_port, "/api/tags")("127.0.0.1")
+    assert not HTTPProbe(other_port)("127.0.0.1", timeout=1)
+    assert not HTTPProbe(closed_port())("127.0.0.1")
+
+
+def test_wait_until_ready_backs_off(listen):
+    server = http_server(failures=2)
+    port = listen(server)
+
+    with patch("hyperstack.deploy.time.sleep") as sleep:
+        wait_until_ready("127.0.0.1", [TCPProbe(port), HTTPProbe(port)], delay=1, backoff_factor=3)
+
+    assert len(server.requests) == 3
+    assert [call.args[0] for call in sleep.call_args_list] == [1, 3]
+
+
+def test_wait_until_ready_timeout():
+    with pytest.raises(TimeoutError, match="TCPProbe.* did not pass on 127.0.0.1 within 0.05 seconds"):
+        wait_until_ready("127.0.0.1", [TCPProbe(closed_port())], timeout=0.05, delay=0.01)
+
+
+def test_wait_for_services(listen):
+    servers = [http_server(failures=failures) for failures in (0, 1, 2)]
+    ports = [listen(server) for server in servers]
+    # One port per host, so each "host" is a (host, port) pair probed through a lambda
+    probe = [lambda host, timeout: HTTPProbe(host[1])(host[0], timeout)]
+    hosts = [("127.0.0.1", port) for port in ports] + [("127.0.0.1", closed_port())]
+
+    report = wait_for_services(hosts, probe, timeout=0.3, delay=0.01)
+
+    assert [entry["host"][1] for entry in report["ready"]] == ports
+    assert [type(entry["error"]) for entry in report["failed"]] == [TimeoutError]
+
+
+def test_deploy_waits_for_services(mock_api):
+    probed = []
+
+    def probe(host, timeout):
+        probed.append(host)
+        return len(probed) > 1
+
+    with patch.dict(SERVICE_PROBES, {"ollama": [probe]}):
+        (result,) = deploy_fleet({**SPEC, "wait_ready": True})
+
+    assert result.ok
+    assert probed == ["10.0.0.1", "10.0.0.1"]
+    assert "service-ready" in result.timings
+
+
+def test_pytorch_deploy_opens_the_probed_ports(mock_api):
+    with patch("hyperstack.deploy.wait_until_ready", return_value=0) as wait_until_ready:
+        (result,) = deploy_fleet({**SPEC, "deployment_type": "pytorch", "wait_ready": True})
+
+    assert result.ok
+    assert wait_until_ready.call_args.args[1] == SERVICE_PROBES["pytorch"]
+    rules = mock_api["apply_sg_rules"].call_args.args[1]
+    assert {"port_range_min": 8888, "port_range_max": 8888} in rules
+    assert {"port_range_min": 22, "port_range_max": 22} in rules
+
+
+def test_pytorch_deploy_keeps_jupyter_closed_without_wait_ready(mock_api):
+    deploy_fleet({**SPEC, "deployment_type": "pytorch"})
+
+    rules = mock_api["apply_sg_rules"].call_args.args[1]
+    assert [rule.get("port_range_min") for rule in rules] == [22, None]
+
+
+def test_service_timeout_keeps_the_vm(mock_api):
+    with patch.dict(SERVICE_PROBES, {"ollama": [lambda host, timeout: False]}):
+        (result,) = deploy_fleet({**SPEC, "wait_ready": True, "ready_timeout": 0.05})
+
+    assert isinstance(result.error, ServiceNotReadyError)
+    assert isinstance(result.error, TimeoutError)
+    assert (result.vm_id, result.floating_ip) == (1, "10.0.0.1")
+    assert (result.error.vm_id, result.error.floating_ip) == (1, "10.0.0.1")
+
+
+def test_deploy_fleet_across_environments_in_parallel():
+    with MockAPIServer(boot_time=0.1, floating_ip_delay=0) as server:
+        client = server.client()
+        specs = [
+            {**SPEC, "environment": environment, "flavor_name": "n3-A100x1"}
+            for environment in ("default-NORWAY-1", "default-CANADA-1")
+        ]
+        with patch.object(hyperstack, "_hyperstack", client):
+            results = deploy_fleet([{**spec, "poll_interval": 0.02} for spec in specs], max_workers=2)
+
+        assert all(result.ok for result in results)
+        assert [server.virtual_machines[result.vm_id]["environment"]["name"] for result in results] == [
+            "default-NORWAY-1",
+            "default-CANADA-1",
+        ]
+        assert client.environment is None
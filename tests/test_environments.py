@@ -1,16 +1,21 @@
+import asyncio
+import threading
 from unittest.mock import patch
 
 import pytest
 
+from hyperstack import Hyperstack
 from hyperstack.api.environments import (
     create_environment,
     delete_environment,
+    environment_items,
     get_environment,
     list_environments,
     set_environment,
     update_environment,
 )
 from hyperstack.api.regions import Region
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
 
 
 @pytest.fixture
@@ -77,3 +82,148 @@ def test_create_environment_with_region_enum(mock_get_region_enum, mock_hypersta
         "POST", "core/environments", data={"name": "test-env", "region": "NORWAY-1"}
     )
     assert result == {"status": "success", "data": {"id": "env-123"}}
+
+
+def test_environment_items_does_not_modify_the_response():
+    response = {
+        "volumes": [
+            {"id": 1},
+            {"id": 2, "environment": {"name": "default-NORWAY-1"}},
+            {"id": 3, "environment": {"name": "default-CANADA-1"}},
+        ]
+    }
+
+    items = environment_items(response, "volumes", "default-NORWAY-1")
+
+    assert items == [
+        {"id": 1, "environment": {"name": "default-NORWAY-1"}},
+        {"id": 2, "environment": {"name": "default-NORWAY-1"}},
+    ]
+    assert response["volumes"][0] == {"id": 1}
+
+
+def test_using_environment_is_scoped_to_the_thread():
+    client = Hyperstack(api_key="test_api_key")
+    client.environment = "default-NORWAY-1"
+    barrier = threading.Barrier(2, timeout=5)
+    seen = {}
+
+    def work(environment):
+        with client.using_environment(environment):
+            barrier.wait()
+            seen[environment] = client.environment
+            with client.using_environment("inner"):
+                assert client.environment == "inner"
+            assert client.environment == environment
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in ("env-a", "env-b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"env-a": "env-a", "env-b": "env-b"}
+    assert client.environment == "default-NORWAY-1"
+    with client.using_environment(None) as environment:
+        assert environment == "default-NORWAY-1"
+    # Scopes belong to one client
+    with client.using_environment("env-a"):
+        assert Hyperstack(api_key="test_api_key").environment is None
+
+
+def test_per_call_environment_and_pools():
+    with MockAPIServer(boot_time=0) as server, server.client() as client:
+        with pytest.raises(EnvironmentError, match="Environment is not set"):
+            client.create_vm("trainer", IMAGE_NAME, "n3-A100x1")
+
+        (instance,) = client.create_vm("trainer", IMAGE_NAME, "n3-A100x1", environment="default-CANADA-1")["instances"]
+        assert instance["environment"]["name"] == "default-CANADA-1"
+        assert (
+            client.retrieve_vm_details(instance["id"], environment="default-CANADA-1")["instance"]["name"] == "trainer"
+        )
+
+        # The workers of bulk_vm_action and apply_sg_rules run in the caller's scope
+        with client.using_environment("default-CANADA-1"):
+            report = client.bulk_vm_action("stop", vm_ids=[instance["id"]])
+            assert [entry["vm_id"] for entry in report["succeeded"]] == [instance["id"]]
+            assert client.apply_sg_rules([instance["id"]], [{"protocol": "icmp"}])["failed"] == []
+        assert client.environment is None
+
+
+def test_fleet_helpers_take_an_environment():
+    with MockAPIServer(boot_time=0, transition_time=0) as server, server.client() as client:
+        canada = "default-CANADA-1"
+        server.add_virtual_machines(1, name="norway", labels=["team-ml"])
+        (instance,) = server.add_virtual_machines(1, environment=canada, labels=["team-ml"])
+
+        assert [vm_id for vm_id, _ in client.wait_for_vms([instance["id"]], environment=canada)] == [instance["id"]]
+        report = client.bulk_vm_action("stop", labels=["team-ml"], wait=True, poll_interval=0.05, environment=canada)
+        assert [entry["vm_id"] for entry in report["succeeded"]] == [instance["id"]]
+        report = client.apply_sg_rules([instance["id"]], [{"protocol": "icmp"}], environment=canada)
+        assert len(report["applied"]) == 1
+        assert client.environment is None
+
+
+def test_async_fleet_helpers_take_an_environment():
+    pytest.importorskip("aiohttp")
+    from hyperstack import AsyncHyperstack
+
+    with MockAPIServer(boot_time=0, transition_time=0) as server:
+        canada = "default-CANADA-1"
+        (instance,) = server.add_virtual_machines(1, environment=canada, labels=["team-ml"])
+
+        async def main():
+            async with AsyncHyperstack(api_key="test_api_key") as client:
+                client.base_url = server.base_url
+                ready = [vm_id async for vm_id, _ in client.wait_for_vms([instance["id"]], environment=canada)]
+                stopped = await client.bulk_vm_action("stop", labels=["team-ml"], wait=True, environment=canada)
+                rules = await client.apply_sg_rules([instance["id"]], [{"protocol": "icmp"}], environment=canada)
+                return ready, stopped, rules
+
+        ready, stopped, rules = asyncio.run(main())
+
+    assert ready == [instance["id"]]
+    assert [entry["vm_id"] for entry in stopped["succeeded"]] == [instance["id"]]
+    assert len(rules["applied"]) == 1
+
+
+def test_list_reads_only_the_requested_environment():
+    with MockAPIServer() as server, server.client() as client:
+        server.add_virtual_machines(2, name="norway")
+        server.add_virtual_machines(1, name="canada", environment="default-CANADA-1")
+        for environment in ("default-NORWAY-1", "default-CANADA-1"):
+            client.create_volume(f"data-{environment}", "Cloud-SSD", environment=environment)
+
+        def names(items):
+            return sorted(item["name"] for item in items)
+
+        canada = client.list_virtual_machines(environment="default-CANADA-1")["instances"]
+        assert names(canada) == ["canada"]
+        assert names(client.iter_virtual_machines(environment="default-CANADA-1")) == ["canada"]
+        assert names(client.list_volumes(environment="default-CANADA-1")["volumes"]) == ["data-default-CANADA-1"]
+        with client.using_environment("default-NORWAY-1"):
+            assert names(client.list_virtual_machines()["instances"]) == ["norway", "norway"]
+            assert names(client.iter_volumes()) == ["data-default-NORWAY-1"]
+
+
+def test_async_using_environment():
+    pytest.importorskip("aiohttp")
+    from hyperstack import AsyncHyperstack
+
+    with MockAPIServer(boot_time=0) as server:
+
+        async def create(client, environment):
+            with client.using_environment(environment):
+                await asyncio.sleep(0)
+                response = await client.create_vm(f"vm-{environment}", IMAGE_NAME, "n3-A100x1")
+                return response["instances"][0]["environment"]["name"]
+
+        async def main():
+            async with AsyncHyperstack(api_key="test_api_key") as client:
+                client.base_url = server.base_url
+                names = ["default-NORWAY-1", "default-CANADA-1"]
+                return names, await asyncio.gather(*(create(client, name) for name in names))
+
+        names, environments = asyncio.run(main())
+
+    assert environments == names
@@ -2,7 +2,7 @@ from unittest.mock import patch
 
 import pytest
 
-from hyperstack.api.images import get_image_enum, list_images
+from hyperstack.api.images import get_image_enum, iter_images, list_images
 from hyperstack.api.regions import Region
 
 
@@ -45,3 +45,11 @@ def test_list_images_region_enum_creation(mock_hyperstack):
     result = list_images(mock_hyperstack, Region.NORWAY_1)
     mock_hyperstack.get.assert_called_once_with("core/images", params={"region": "NORWAY-1"})
     assert result == {"status": "success", "data": {"images": []}}
+
+
+def test_iter_images_with_region(mock_hyperstack):
+    iter_images(mock_hyperstack, Region.CANADA_1)
+    mock_hyperstack.iter_items.assert_called_once_with("core/images", "images", params={"region": "CANADA-1"})
+
+    with pytest.raises(ValueError, match="Invalid region specified"):
+        iter_images(mock_hyperstack, "CANADA-1")
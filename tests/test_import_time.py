@@ -0,0 +1,47 @@
+import os
+import re
+import subprocess
+import sys
+
+# Cumulative time in microseconds `import hyperstack` may take, as reported by -X importtime
+IMPORT_BUDGET_US = 10_000
+
+
+def run_python(code, *args):
+    env = {key: value for key, value in os.environ.items() if key != "HYPERSTACK_API_KEY"}
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+    )
+
+
+def test_import_does_not_need_api_key_or_requests():
+    result = run_python(
+        "import sys, hyperstack; "
+        "print(hyperstack.Region.NORWAY_1.value, hyperstack._hyperstack, "
+        "[m for m in ('requests', 'aiohttp', 'hyperstack.client', 'hyperstack.api.virtual_machines') if m in sys.modules])"
+    )
+    assert result.stdout.strip() == "NORWAY-1 None []"
+
+
+def test_client_is_created_on_first_use():
+    result = run_python(
+        "import os, hyperstack; "
+        "os.environ['HYPERSTACK_API_KEY'] = 'test_api_key'; "
+        "hyperstack.set_environment('test-env'); "
+        "print(hyperstack._hyperstack.environment)"
+    )
+    assert result.stdout.strip().splitlines() == ["Environment set to: test-env", "test-env"]
+
+
+def test_import_time_budget():
+    result = run_python("import hyperstack", "-X", "importtime")
+    cumulative = [
+        int(match.group(1)) for match in re.finditer(r"\|\s*(\d+) \| hyperstack$", result.stderr, re.MULTILINE)
+    ]
+    assert cumulative, result.stderr
+    assert cumulative[0] < IMPORT_BUDGET_US
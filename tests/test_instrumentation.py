@@ -0,0 +1,98 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from hyperstack import Hyperstack
+from hyperstack.instrumentation import Histogram, Instrumentation, template_endpoint
+from hyperstack.testing import MockAPIServer
+
+
+def test_template_endpoint():
+    assert template_endpoint("core/virtual-machines/123/start") == "core/virtual-machines/{id}/start"
+    assert template_endpoint("/core/volumes/") == "core/volumes"
+    assert template_endpoint("core/keypairs/6f1c2a0e-9b7d-4e2a-8c3f-1a2b3c4d5e6f") == "core/keypairs/{id}"
+    assert template_endpoint("core/flavors") == "core/flavors"
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 2, 20):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(0.1, 2), (1, 3), (10, 4), (float("inf"), 5)]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(22.65)
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(0.99) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_hooks_and_counters():
+    instrumentation = Instrumentation()
+    seen = []
+    instrumentation.add_hooks(
+        before=lambda info: seen.append(("before", info.method, info.template)),
+        after=lambda info: seen.append(("after", info.status, info.duration >= 0)),
+    )
+
+    with MockAPIServer(boot_time=0) as server:
+        client = server.client(instrumentation=instrumentation, cache=False)
+        vm_id = server.add_virtual_machines(1)[0]["id"]
+        server.inject_error(status=503, path="core/virtual-machines")
+        client.get(f"core/virtual-machines/{vm_id}")
+        client.close()
+
+    assert seen == [
+        ("before", "GET", "core/virtual-machines/{id}"),
+        ("after", 503, True),
+        ("before", "GET", "core/virtual-machines/{id}"),
+        ("after", 200, True),
+    ]
+    stats = instrumentation.stats()["GET core/virtual-machines/{id}"]
+    assert stats["count"] == 2
+    assert stats["statuses"] == {503: 1, 200: 1}
+    assert stats["errors"] == {}
+
+
+def test_errors_without_response():
+    instrumentation = Instrumentation()
+    client = Hyperstack(api_key="test_api_key", retry=False, instrumentation=instrumentation)
+
+    with patch.object(client._session, "request", side_effect=requests.ConnectionError("refused")):
+        with pytest.raises(requests.ConnectionError):
+            client.get("core/flavors")
+
+    assert instrumentation.errors == {("GET", "core/flavors", "ConnectionError"): 1}
+    assert instrumentation.responses == {}
+
+
+def test_prometheus_output():
+    instrumentation = Instrumentation(buckets=(0.5, 1))
+    instrumentation.finish(instrumentation.start("GET", "core/flavors"), error=ValueError())
+    instrumentation.record_phase("wait-active", 42)
+
+    text = instrumentation.to_prometheus()
+
+    assert "# TYPE hyperstack_request_duration_seconds histogram" in text
+    assert 'hyperstack_request_duration_seconds_bucket{method="GET",endpoint="core/flavors",le="+Inf"} 1' in text
+    assert 'hyperstack_request_errors_total{method="GET",endpoint="core/flavors",error="ValueError"} 1' in text
+    assert "hyperstack_responses_total" not in text
+    assert 'hyperstack_deploy_phase_duration_seconds_bucket{phase="wait-active",le="60.0"} 1' in text
+    assert 'hyperstack_deploy_phase_duration_seconds_sum{phase="wait-active"} 42' in text
+
+
+def test_disabled_by_default():
+    client = Hyperstack(api_key="test_api_key")
+
+    assert client.instrumentation is None
+
+
+def test_tracing_requires_opentelemetry():
+    try:
+        import opentelemetry  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError, match=r"pip install hyperstack\[tracing\]"):
+            Instrumentation(tracing=True)
+    else:
+        assert Instrumentation(tracing=True)._tracer is not None
@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from hyperstack.inventory import Inventory
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = server.client()
+    client.environment = "default-NORWAY-1"
+    yield client
+    client.close()
+
+
+def test_lookups_list_once(client, server):
+    server.add_virtual_machines(3, name="worker")
+    server.add_virtual_machines(1, name="head", environment="default-CANADA-1")
+
+    for _ in range(3):
+        assert client.inventory.vm_by_name("head")["environment"]["name"] == "default-CANADA-1"
+    assert client.inventory.vm_by_name("missing") is None
+    assert len(client.inventory.vms_in_environment("default-NORWAY-1")) == 3
+    assert client.inventory.environment_by_name("default-NORWAY-1")["region"] == "NORWAY-1"
+
+    assert server.request_count("GET", "core/virtual-machines$") == 1
+    assert server.request_count("GET", "core/environments$") == 1
+
+
+def test_ambiguous_name(client, server):
+    server.add_virtual_machines(2, name="worker")
+
+    with pytest.raises(ValueError, match="Several virtual machines are named 'worker'"):
+        client.inventory.vm_by_name("worker")
+
+
+def test_updates_from_client_calls(client, server):
+    assert client.inventory.vm_by_name("trainer") is None
+
+    (instance,) = client.create_vm("trainer", IMAGE_NAME, "n3-A100x1")["instances"]
+    assert client.inventory.vm_by_name("trainer")["id"] == instance["id"]
+
+    client.update_virtual_machine_labels(instance["id"], ["team-ml", "gpu"])
+    assert [vm["id"] for vm in client.inventory.vms_by_label("gpu")] == [instance["id"]]
+
+    client.update_virtual_machine_labels(instance["id"], ["team-ml"])
+    assert client.inventory.vms_by_label("gpu") == []
+
+    client.delete_virtual_machine(instance["id"])
+    assert client.inventory.vm_by_name("trainer") is None
+    assert client.inventory.vms_by_label("team-ml") == []
+
+    volume = client.create_volume("scratch", "Cloud-SSD")["volume"]
+    assert client.inventory.volume_by_name("scratch")["id"] == volume["id"]
+    assert client.inventory.volumes_in_environment("default-NORWAY-1") == [volume]
+
+    environment = client.inventory.environment_by_name("default-CANADA-1")
+    client.update_environment(environment["id"], "renamed")
+    assert client.inventory.environment_by_name("default-CANADA-1") is None
+    assert client.inventory.environment_by_name("renamed")["id"] == environment["id"]
+
+    assert server.request_count("GET", "core/virtual-machines$") == 1
+    assert client.inventory.refreshes == 3
+
+
+def test_refresh_when_stale(client, server):
+    client.inventory.max_age = 0
+    client.inventory.vm_by_name("worker")
+    server.add_virtual_machines(1, name="worker")
+
+    assert client.inventory.vm_by_name("worker") is not None
+    assert server.request_count("GET", "core/virtual-machines$") == 2
+
+
+def test_invalidate(client, server):
+    client.inventory.profile_by_name("profile")
+    server.profiles[1] = {"id": 1, "name": "profile", "data": {}}
+    assert client.inventory.profile_by_name("profile") is None
+
+    client.inventory.invalidate("profiles")
+
+    assert client.inventory.profile_by_name("profile")["id"] == 1
+
+
+def test_changes_during_refresh_are_replayed():
+    inventory = Inventory(MagicMock())
+    inventory.client.get.side_effect = lambda endpoint: (
+        inventory.observe("POST", "core/profiles", {}, {"profile": {"id": 2, "name": "new"}}),
+        {"profiles": [{"id": 1, "name": "old"}]},
+    )[1]
+
+    assert inventory.profile_by_name("new")["id"] == 2
+    assert inventory.profile_by_name("old")["id"] == 1
+
+
+def test_invalid_kind():
+    with pytest.raises(ValueError, match="Invalid kind specified"):
+        Inventory(MagicMock()).by_name("servers", "x")
+
+
+def test_inventory_disabled(server):
+    assert server.client(inventory=False).inventory is None
@@ -0,0 +1,157 @@
+import time
+
+import pytest
+import requests
+
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+from hyperstack.transport import RetryPolicy
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0.2, transition_time=0.1, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = server.client(retry=RetryPolicy(backoff_factor=0.01))
+    client.environment = "default-NORWAY-1"
+    yield client
+    client.close()
+
+
+def create_vms(client, count, **kwargs):
+    response = client.create_vm("vm", IMAGE_NAME, "n3-A100x1", count=count, **kwargs)
+    return [instance["id"] for instance in response["instances"]]
+
+
+def test_kept_alive_requests_are_not_delayed(client, server):
+    (vm_id,) = create_vms(client, 1)
+    client.retrieve_vm_details(vm_id)
+
+    start = time.monotonic()
+    for _ in range(20):
+        client.retrieve_vm_details(vm_id)
+    # Well under the ~40 ms a delayed ACK would add to each request on the reused connection
+    assert (time.monotonic() - start) / 20 < 0.02
+    assert client.transport_stats()["new_connections"] == 1
+
+
+def test_vm_boots_to_active(client):
+    vm_ids = create_vms(client, 3, assign_floating_ip=True)
+
+    assert client.retrieve_vm_details(vm_ids[0])["instance"]["status"] == "BUILD"
+    ready = [vm_id for vm_id, _ in client.wait_for_vms(vm_ids, poll_interval=0.05, timeout=5)]
+
+    assert sorted(ready) == vm_ids
+    assert client.get_floating_ip(vm_ids[0]).startswith("185.0.")
+
+
+def test_vm_lifecycle_actions(client, server):
+    server.boot_time = 0
+    (vm_id,) = create_vms(client, 1)
+
+    client.hibernate_virtual_machine(vm_id)
+    assert client.retrieve_vm_details(vm_id)["instance"]["status"] == "HIBERNATING"
+    list(client.wait_for_vms([vm_id], target_status="HIBERNATED", poll_interval=0.05, timeout=5))
+
+    client.resize_virtual_machine(vm_id, "n3-A100x2")
+    list(client.wait_for_vms([vm_id], poll_interval=0.05, timeout=5))
+    assert client.retrieve_vm_details(vm_id)["instance"]["flavor"]["gpu_count"] == 2
+
+    client.update_virtual_machine_labels(vm_id, ["team-ml"])
+    assert client.retrieve_vm_details(vm_id)["instance"]["labels"] == ["team-ml"]
+
+    client.delete_virtual_machine(vm_id)
+    time.sleep(0.15)
+    assert client.list_virtual_machines()["instances"] == []
+
+
+def test_boot_errors(client, server):
+    server.boot_error_rate = 1
+
+    vm_ids = create_vms(client, 1)
+
+    with pytest.raises(Exception, match="entered ERROR state"):
+        list(client.wait_for_vms(vm_ids, poll_interval=0.05, timeout=5))
+
+
+def test_sg_rules(client, server):
+    server.boot_time = 0
+    vm_ids = create_vms(client, 2)
+
+    report = client.apply_sg_rules(vm_ids, [{"port_range_min": 22, "port_range_max": 22}, {"protocol": "icmp"}])
+    assert len(report["applied"]) == 4
+
+    report = client.apply_sg_rules(vm_ids, [{"port_range_min": 22, "port_range_max": 22}])
+    assert report["applied"] == []
+    assert len(report["skipped"]) == 2
+
+
+def test_injected_errors_are_retried(client, server):
+    server.inject_error(status=503, count=2, path="core/environments")
+
+    assert len(client.list_environments()["environments"]) == 2
+    assert server.request_count("GET", "core/environments") == 3
+    assert client.transport_stats()["retries"] == 2
+
+
+def test_injected_error_without_retry(server):
+    client = server.client(retry=False)
+    server.inject_error(status=429, retry_after=1)
+
+    with pytest.raises(requests.HTTPError, match="429"):
+        client.list_environments()
+
+
+def test_catalog_etag_revalidation(client, server):
+    client.cache.ttls["core/flavors"] = 0
+
+    first = client.list_flavors()
+    second = client.list_flavors()
+
+    assert second is first
+    assert client.cache.stats()["revalidations"] == 1
+    assert server.request_count("GET", "core/flavors") == 2
+
+
+def test_catalog_endpoints(client):
+    assert len(client.list_images()["images"]) == 2
+    assert len(client.retrieve_gpu_stock()["stocks"]) == 2
+    assert [region["name"] for region in client.list_regions()["regions"]] == ["NORWAY-1", "CANADA-1"]
+    assert client.list_volume_types()["volume_types"] == ["Cloud-SSD"]
+
+
+def test_volumes_and_profiles(client):
+    volume = client.create_volume("data", "Cloud-SSD", size=100)["volume"]
+    assert client.get_volume(volume["id"])["volume"]["size"] == 100
+    client.delete_volume(volume["id"])
+    assert client.list_volumes()["volumes"] == []
+
+    profile = client.post("core/profiles", data={"name": "profile", "data": {"count": 1}})["profile"]
+    assert client.retrieve_profile(profile["id"])["profile"]["name"] == "profile"
+
+
+def test_pagination(client, server):
+    server.add_virtual_machines(120)
+
+    page = client.get("core/virtual-machines", params={"page": 3, "pageSize": 50})
+
+    assert len(page["instances"]) == 20
+    assert page["count"] == 120
+
+
+def test_latency(server):
+    server.latency = 0.05
+    client = server.client()
+
+    start = time.monotonic()
+    client.list_environments()
+
+    assert time.monotonic() - start >= 0.05
+
+
+def test_missing_api_key(server):
+    response = requests.get(f"{server.base_url}core/environments")
+    assert response.status_code == 401
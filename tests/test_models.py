@@ -0,0 +1,132 @@
+import asyncio
+import copy
+
+import pytest
+
+from hyperstack import AsyncHyperstack
+from hyperstack.models import Flavor, SecurityRule, Stock, VirtualMachine, parse_grouped
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+
+VM = {
+    "id": 7,
+    "name": "vm-7",
+    "status": "ACTIVE",
+    "floating_ip": "185.0.0.7",
+    "environment": {"id": 1, "name": "default-NORWAY-1", "org_id": 1, "region": "NORWAY-1"},
+    "flavor": {"id": 95, "name": "n3-A100x1", "gpu": "A100-80G-PCIe", "gpu_count": 1},
+    "security_rules": [{"id": 70, "protocol": "tcp", "port_range_min": 22, "port_range_max": 22}],
+    "labels": ["team-ml"],
+    "unknown_field": "dropped",
+}
+
+
+def test_model_from_dict():
+    vm = VirtualMachine.from_dict(VM)
+
+    assert (vm.id, vm.name, vm.status, vm.floating_ip, vm.labels) == (7, "vm-7", "ACTIVE", "185.0.0.7", ["team-ml"])
+    assert vm.power_state is None
+    assert not hasattr(vm, "__dict__")
+    assert not hasattr(vm, "unknown_field")
+    assert repr(vm) == "VirtualMachine(id=7, name='vm-7')"
+
+
+def test_nested_fields_are_parsed_on_first_access():
+    vm = VirtualMachine.from_dict(VM)
+    assert vm._flavor is VM["flavor"]
+
+    flavor = vm.flavor
+
+    assert isinstance(flavor, Flavor)
+    assert (flavor.gpu, flavor.gpu_count) == ("A100-80G-PCIe", 1)
+    assert vm.flavor is flavor
+    assert vm.environment.region == "NORWAY-1"
+    assert [rule.port_range_min for rule in vm.security_rules] == [22]
+    assert isinstance(vm.security_rules[0], SecurityRule)
+    assert vm.image is None
+
+
+def test_to_dict_round_trip():
+    vm = VirtualMachine.from_dict(VM)
+    assert isinstance(vm.flavor, Flavor)
+
+    data = vm.to_dict()
+
+    assert "unknown_field" not in data
+    assert data["flavor"]["name"] == "n3-A100x1"
+    assert VirtualMachine.from_dict(data) == vm
+    assert VirtualMachine(id=7, name="vm-7") != vm
+
+
+def test_repeated_values_are_shared():
+    first = VirtualMachine.from_dict(copy.deepcopy(VM))
+    second = VirtualMachine.from_dict(copy.deepcopy(VM))
+
+    assert first.status is second.status
+    assert first.flavor.gpu is second.flavor.gpu
+
+
+def test_parse_grouped_inherits_group_keys():
+    response = {
+        "stocks": [
+            {"region": "NORWAY-1", "models": [{"model": "A100-80G-PCIe", "available": "24"}]},
+            {"region": "CANADA-1", "models": [{"model": "H100-80G-PCIe", "available": "8"}]},
+        ]
+    }
+
+    stocks = parse_grouped(Stock, "stocks", "models", inherit=("region",))(response)
+
+    assert [(stock.region, stock.model, stock.available) for stock in stocks] == [
+        ("NORWAY-1", "A100-80G-PCIe", "24"),
+        ("CANADA-1", "H100-80G-PCIe", "8"),
+    ]
+    assert "region" not in response["stocks"][0]["models"][0]
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = server.client()
+    client.environment = "default-NORWAY-1"
+    yield client
+    client.close()
+
+
+def test_typed_api_functions(client, server):
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(5)]
+    client.create_volume("data", "Cloud-SSD")
+
+    vms = client.list_virtual_machines(typed=True)
+    assert [vm.id for vm in vms] == vm_ids
+    assert client.retrieve_vm_details(vm_ids[0], typed=True).flavor.gpu_count == 1
+    assert [vm.id for vm in client.iter_virtual_machines(page_size=2, typed=True)] == vm_ids
+    assert [volume.volume_type for volume in client.list_volumes(typed=True)] == ["Cloud-SSD"]
+
+    flavors = client.list_flavors(typed=True)
+    assert len(flavors) == 24
+    assert all(isinstance(flavor, Flavor) for flavor in flavors)
+    assert {image.name for image in client.list_images(typed=True)} == {IMAGE_NAME}
+    assert {image.name for image in client.iter_images(typed=True)} == {IMAGE_NAME}
+    assert len(client.retrieve_gpu_stock(typed=True)) == 6
+
+
+def test_typed_async_api_functions(server):
+    pytest.importorskip("aiohttp")
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(3)]
+
+    async def main():
+        async with AsyncHyperstack(api_key="test_api_key") as client:
+            client.base_url = server.base_url
+            client.environment = "default-NORWAY-1"
+            vms = await client.list_virtual_machines(typed=True)
+            iterated = [vm async for vm in client.iter_virtual_machines(page_size=2, typed=True)]
+            return vms, iterated
+
+    vms, iterated = asyncio.run(main())
+
+    assert [vm.id for vm in vms] == vm_ids
+    assert iterated == vms
@@ -3,9 +3,11 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from hyperstack.api.network import (
+    apply_sg_rules,
     attach_public_ip,
     delete_sg_rules,
     detach_public_ip,
+    plan_sg_rules,
     retrieve_vnc_path,
     retrieve_vnc_url,
     set_sg_rules,
@@ -66,3 +68,61 @@ def test_retrieve_vnc_url(mock_hyperstack):
     result = retrieve_vnc_url(mock_hyperstack, "vm-123", "job-789")
     mock_hyperstack.post.assert_called_once_with("core/virtual-machines/vm-123/console/job-789")
     assert result == {"status": "success", "data": {}}
+
+
+def test_plan_sg_rules_skips_existing_and_duplicates():
+    instances = [
+        {
+            "id": 1,
+            "security_rules": [
+                {
+                    "id": 10,
+                    "direction": "ingress",
+                    "protocol": "tcp",
+                    "ethertype": "IPv4",
+                    "remote_ip_prefix": "0.0.0.0/0",
+                    "port_range_min": 22,
+                    "port_range_max": 22,
+                },
+            ],
+        },
+        {"id": 2, "security_rules": []},
+    ]
+    ssh = {"port_range_min": 22, "port_range_max": 22}
+    icmp = {"protocol": "icmp"}
+
+    pending, skipped = plan_sg_rules(instances, [1, 2], [ssh, icmp, icmp])
+
+    assert pending == [(1, icmp), (2, ssh), (2, icmp)]
+    assert skipped == [(1, ssh), (1, icmp), (2, icmp)]
+
+
+def test_apply_sg_rules(mock_hyperstack):
+    mock_hyperstack.list_virtual_machines.return_value = {
+        "instances": [
+            {
+                "id": 1,
+                "security_rules": [
+                    {"protocol": "icmp", "direction": "ingress", "ethertype": "IPv4", "remote_ip_prefix": "0.0.0.0/0"}
+                ],
+            },
+            {"id": 2, "security_rules": []},
+        ]
+    }
+
+    def set_sg_rules(vm_id, **rule):
+        if vm_id == 2 and rule.get("protocol") == "icmp":
+            raise Exception("API Error")
+        return {"status": "success"}
+
+    mock_hyperstack.set_sg_rules.side_effect = set_sg_rules
+    ssh = {"port_range_min": 22, "port_range_max": 22}
+    icmp = {"protocol": "icmp"}
+
+    report = apply_sg_rules(mock_hyperstack, [1, 2], [ssh, icmp], max_workers=4)
+
+    mock_hyperstack.list_virtual_machines.assert_called_once_with(environment=None)
+    assert mock_hyperstack.set_sg_rules.call_count == 3
+    assert [(entry["vm_id"], entry["rule"]) for entry in report["applied"]] == [(1, ssh), (2, ssh)]
+    assert report["skipped"] == [{"vm_id": 1, "rule": icmp}]
+    assert [(entry["vm_id"], str(entry["error"])) for entry in report["failed"]] == [(2, "API Error")]
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+
+from hyperstack import AsyncHyperstack
+from hyperstack.pagination import JSONArrayParser, is_last_page
+from hyperstack.testing import MockAPIServer
+
+BODY = {
+    "status": True,
+    "message": 'Listed "instances": [ok]',
+    "meta": {"instances": [{"id": "nested"}], "tags": ["a", "b"]},
+    "instances": [
+        {"id": 1, "name": "vm-é\\\"]", "labels": ["x", "}"]},
+        {"id": 2, "name": "vm-2", "flavor": {"gpu_count": 8}},
+        12345,
+        "text",
+        None,
+        [1, [2]],
+    ],
+    "count": 6,
+}
+
+
+def parse(data, chunk_size, key="instances"):
+    parser = JSONArrayParser(key)
+    items = []
+    for start in range(0, len(data), chunk_size):
+        items.extend(parser.feed(data[start : start + chunk_size]))
+    items.extend(parser.feed(b"", final=True))
+    return items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_parser_yields_items_across_chunk_boundaries(chunk_size):
+    data = json.dumps(BODY, ensure_ascii=False).encode()
+
+    assert parse(data, chunk_size) == BODY["instances"]
+
+
+def test_parser_yields_items_before_the_body_ends():
+    parser = JSONArrayParser("instances")
+
+    assert parser.feed(b'{"instances": [{"id": 1}, {"id": 2}, {"id"') == [{"id": 1}, {"id": 2}]
+    assert parser.feed(b': 3}, 4') == [{"id": 3}]
+    assert parser.feed(b'5]') == [45]
+    assert parser.done
+
+
+def test_parser_missing_key():
+    assert parse(json.dumps({"profiles": [1, 2]}).encode(), 4) == []
+
+
+def test_parser_truncated_body():
+    with pytest.raises(json.JSONDecodeError):
+        parse(b'{"instances": [{"id": 1}, {"id": 2', 4)
+
+
+def test_is_last_page():
+    assert is_last_page({"instances": [1, 2]}, "instances", 1, 3)
+    assert not is_last_page({"instances": [1, 2, 3]}, "instances", 1, 3)
+    assert is_last_page({"instances": [1, 2, 3], "count": 6}, "instances", 2, 3)
+    # An endpoint without pagination returns everything in the first page
+    assert is_last_page({"instances": [1, 2, 3, 4]}, "instances", 1, 3)
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = server.client()
+    client.environment = "default-NORWAY-1"
+    yield client
+    client.close()
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_iter_virtual_machines(client, server, prefetch):
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(120)]
+
+    instances = list(client.iter_virtual_machines(page_size=50, prefetch=prefetch))
+
+    assert [instance["id"] for instance in instances] == vm_ids
+    assert server.request_count("GET", "core/virtual-machines$") == 3
+
+
+def test_iter_virtual_machines_stops_early(client, server):
+    server.add_virtual_machines(120)
+
+    iterator = client.iter_virtual_machines(page_size=50, prefetch=False)
+    next(iterator)
+    iterator.close()
+
+    assert server.request_count("GET", "core/virtual-machines$") == 1
+
+
+def test_iter_volumes(client):
+    volume_ids = [client.create_volume(f"data-{i}", "Cloud-SSD")["volume"]["id"] for i in range(5)]
+
+    assert [volume["id"] for volume in client.iter_volumes(page_size=2)] == volume_ids
+
+
+def test_iter_profiles_and_images(client):
+    for i in range(3):
+        client.post("core/profiles", data={"name": f"profile-{i}", "data": {"count": 1}})
+
+    assert [profile["name"] for profile in client.iter_profiles()] == ["profile-0", "profile-1", "profile-2"]
+    assert list(client.iter_images()) == client.list_images()["images"]
+
+
+def test_async_iterators(server):
+    pytest.importorskip("aiohttp")
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(30)]
+
+    async def main():
+        async with AsyncHyperstack(api_key="test_api_key") as client:
+            client.base_url = server.base_url
+            client.environment = "default-NORWAY-1"
+            instances = [instance async for instance in client.iter_virtual_machines(page_size=8)]
+            images = [group async for group in client.iter_images()]
+            return instances, images
+
+    instances, images = asyncio.run(main())
+
+    assert [instance["id"] for instance in instances] == vm_ids
+    assert len(images) == 2
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import pytest
+
+from hyperstack import AsyncHyperstack
+from hyperstack.api.placement import PlacementCatalog, solve_placement
+from hyperstack.api.regions import Region
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+
+
+def flavor(region, gpu, gpu_count, name=None):
+    return {
+        "name": name or f"{gpu}x{gpu_count}",
+        "region_name": region,
+        "gpu": gpu,
+        "gpu_count": gpu_count,
+        "cpu": 8 * gpu_count,
+        "ram": 60 * gpu_count,
+        "disk": 100,
+    }
+
+
+def make_catalog(stock):
+    flavors = {"data": []}
+    stocks = {"stocks": []}
+    for region, models in stock.items():
+        region_stock = {"region": region, "models": []}
+        for gpu, (available, configurations) in models.items():
+            flavors["data"].append(
+                {"gpu": gpu, "region_name": region, "flavors": [flavor(region, gpu, n) for n in (1, 2, 4, 8)]}
+            )
+            region_stock["models"].append({"model": gpu, "available": str(available), "configurations": configurations})
+        stocks["stocks"].append(region_stock)
+    images = {"images": [{"region_name": "NORWAY-1", "images": [{"name": "ubuntu", "region_name": "NORWAY-1"}]}]}
+    return PlacementCatalog(flavors, stocks, images)
+
+
+CATALOG = make_catalog(
+    {
+        "NORWAY-1": {"A100": (24, {"1x": 8, "2x": 4, "4x": 2, "8x": 1}), "H100": (8, {"8x": 1})},
+        "CANADA-1": {"A100": (40, {"8x": 5}), "H100": (0, {})},
+    }
+)
+
+
+def describe(placement):
+    return [(a.region, a.flavor_name, a.vms) for a in placement.allocations]
+
+
+def test_single_region_preferred():
+    placements = solve_placement(CATALOG, {"gpu": "A100"}, 16)
+
+    # Fewer VMs rank first, the order of the regions breaks ties
+    assert [describe(placement) for placement in placements] == [
+        [("CANADA-1", "A100x8", 2)],
+        [("NORWAY-1", "A100x8", 1), ("NORWAY-1", "A100x4", 2)],
+    ]
+    assert all(placement.gpus == 16 for placement in placements)
+
+
+def test_split_across_regions_when_no_region_has_enough():
+    placements = solve_placement(CATALOG, {"gpu": "A100", "regions": [Region.NORWAY_1, Region.CANADA_1]}, 60)
+
+    (placement,) = placements
+    assert describe(placement) == [
+        ("CANADA-1", "A100x8", 5),
+        ("NORWAY-1", "A100x8", 1),
+        ("NORWAY-1", "A100x4", 2),
+        ("NORWAY-1", "A100x2", 2),
+    ]
+    assert placement.gpus == 60
+
+
+def test_gpu_models_and_configurations():
+    placements = solve_placement(CATALOG, {"gpu": ["H100", "A100"], "regions": ["NORWAY-1"]}, 12)
+
+    assert describe(placements[0]) == [("NORWAY-1", "A100x8", 1), ("NORWAY-1", "A100x4", 1)]
+    # The configurations allow a single 8x H100 VM, so H100 only fits when mixed with A100
+    assert placements[1].gpu_models == ["H100", "A100"]
+
+
+def test_requirements_filter():
+    assert solve_placement(CATALOG, {"gpu": "A100", "gpus_per_vm": [8]}, 40)[0].regions == ["CANADA-1"]
+    assert solve_placement(CATALOG, {"image": "ubuntu"}, 40) == []
+    assert solve_placement(CATALOG, {"gpu": "A100", "min_cpu": 32}, 4)[0].allocations[0].flavor_name == "A100x4"
+    assert solve_placement(CATALOG, {}, 1000) == []
+
+
+def test_invalid_requirements():
+    with pytest.raises(ValueError, match="Unknown placement requirements: gpus"):
+        solve_placement(CATALOG, {"gpus": 8}, 8)
+    with pytest.raises(ValueError, match="'count' must be a positive integer"):
+        solve_placement(CATALOG, {}, 0)
+
+
+def test_null_catalog_fields():
+    flavors = {"data": [{"gpu": "A100", "flavors": [{**flavor("NORWAY-1", "A100", 8), "cpu": None, "ram": None}]}]}
+    stocks = {"stocks": [{"region": "NORWAY-1", "models": [{"model": "A100", "available": "8", "configurations": {}}]}]}
+    catalog = PlacementCatalog(flavors, stocks, {"images": []})
+
+    assert describe(solve_placement(catalog, {"min_disk": None}, 8)[0]) == [("NORWAY-1", "A100x8", 1)]
+    assert solve_placement(catalog, {"min_cpu": 1}, 8) == []
+
+
+def test_plan_placement_from_cached_catalogs():
+    with MockAPIServer() as server:
+        client = server.client()
+
+        first = client.plan_placement({"gpu": "A100-80G-PCIe", "image": IMAGE_NAME}, count=40)
+        start = time.perf_counter()
+        second = client.plan_placement({"gpu": "A100-80G-PCIe", "image": IMAGE_NAME}, count=40)
+        elapsed = time.perf_counter() - start
+
+        assert first == second
+        assert first[0].regions == ["NORWAY-1", "CANADA-1"]
+        assert elapsed < 0.05
+        assert server.request_count("GET", "core/(flavors|stocks|images)") == 3
+
+
+def test_async_plan_placement():
+    pytest.importorskip("aiohttp")
+
+    async def main(server):
+        async with AsyncHyperstack(api_key="test_api_key") as client:
+            client.base_url = server.base_url
+            return await client.plan_placement({"gpu": "H100-80G-PCIe"}, count=8)
+
+    with MockAPIServer() as server:
+        placements = asyncio.run(main(server))
+
+    assert [a.flavor_name for a in placements[0].allocations] == ["n3-H100x8"]
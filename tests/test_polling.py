@@ -0,0 +1,117 @@
+import asyncio
+import itertools
+import json
+
+import pytest
+
+from hyperstack import AsyncHyperstack
+from hyperstack.polling import AdaptivePolling, BootTimeStore, DeadlinePolling, ExponentialBackoff, boot_key
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+
+KEY = f"n3-A100x1|{IMAGE_NAME}"
+
+
+def test_exponential_backoff():
+    delays = list(ExponentialBackoff(initial=1, factor=2, max_delay=8, jitter=0, timeout=30).delays())
+
+    assert delays == [1, 2, 4, 8, 8, 7]
+
+
+def test_exponential_backoff_jitter():
+    delays = [next(ExponentialBackoff(initial=10, jitter=0.1).delays()) for _ in range(20)]
+
+    assert all(9 <= delay <= 11 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_deadline_polling():
+    assert list(DeadlinePolling(timeout=25, interval=10).delays()) == [10, 10, 5]
+
+
+def test_boot_time_store(tmp_path):
+    path = tmp_path / "hyperstack" / "boot_times.json"
+    store = BootTimeStore(str(path), max_samples=3)
+    for seconds in (50, 40, 42, 44):
+        store.record(KEY, seconds)
+
+    assert json.loads(path.read_text()) == {KEY: [40, 42, 44]}
+    assert BootTimeStore(str(path)).estimate(KEY) == (42, 2)
+    assert store.estimate("other") == (None, None)
+
+    path.write_text("not json")
+    assert BootTimeStore(str(path)).estimate(KEY) == (None, None)
+
+
+def test_adaptive_polling_around_expected_boot_time():
+    store = BootTimeStore()
+    strategy = AdaptivePolling(store, interval=3, margin=0.1, fallback=DeadlinePolling(interval=5))
+
+    assert list(itertools.islice(strategy.delays(KEY), 3)) == [5, 5, 5]
+
+    for seconds in (40, 42, 44):
+        strategy.record(KEY, seconds)
+    delays = list(itertools.islice(strategy.delays(KEY), 5))
+
+    # Sleeps until 42 - 4.2 seconds, polls every 3 seconds until 42 + 4.2, then backs off
+    assert delays[:4] == pytest.approx([37.8, 3, 3, 3])
+    assert delays[4] > 3
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0.1) as server:
+        yield server
+
+
+def create(client):
+    client.environment = "default-NORWAY-1"
+    return client.create_vm("vm", IMAGE_NAME, "n3-A100x1")["instances"][0]["id"]
+
+
+def test_wait_for_vm_active_with_strategy(server):
+    client = server.client()
+    strategy = AdaptivePolling(BootTimeStore(), fallback=DeadlinePolling(interval=0.02))
+    vm_id = create(client)
+
+    assert client.wait_for_vm_active(vm_id, strategy=strategy) is True
+    (sample,) = strategy.store._samples[KEY]
+    assert 0.1 <= sample < 1
+
+    # An already active VM is not a boot time
+    assert client.wait_for_vm_active(vm_id, strategy=strategy) is True
+    assert len(strategy.store._samples[KEY]) == 1
+
+
+def test_wait_for_vm_active_strategy_errors(server):
+    client = server.client()
+    server.boot_time = 10
+    vm_id = create(client)
+
+    with pytest.raises(TimeoutError, match=f"VM {vm_id} did not become active"):
+        client.wait_for_vm_active(vm_id, strategy=DeadlinePolling(timeout=0.05, interval=0.01))
+
+    server.boot_time = 0.1
+    server.boot_error_rate = 1
+    vm_id = create(client)
+    with pytest.raises(Exception, match=f"VM {vm_id} entered ERROR state"):
+        client.wait_for_vm_active(vm_id, strategy=DeadlinePolling(interval=0.02))
+
+
+def test_async_wait_for_vm_active_with_strategy(server):
+    pytest.importorskip("aiohttp")
+    strategy = AdaptivePolling(BootTimeStore(), fallback=DeadlinePolling(interval=0.02))
+    vm_id = create(server.client())
+
+    async def main():
+        async with AsyncHyperstack(api_key="test_api_key") as client:
+            client.base_url = server.base_url
+            client.environment = "default-NORWAY-1"
+            return await client.wait_for_vm_active(vm_id, strategy=strategy)
+
+    assert asyncio.run(main()) is True
+    assert len(strategy.store._samples[KEY]) == 1
+
+
+def test_boot_key():
+    assert boot_key({"flavor": {"name": "n3-A100x1"}, "image": {"name": "ubuntu"}}) == "n3-A100x1|ubuntu"
+    assert boot_key({"flavor": None, "image": {"name": "ubuntu"}}) is None
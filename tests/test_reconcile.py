@@ -0,0 +1,206 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hyperstack.reconcile import VMSpec, apply_plan, plan_reconcile, reconcile
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+
+SSH = {"port_range_min": 22, "port_range_max": 22}
+
+
+def vm(vm_id, name, flavor="n3-A100x1", image=IMAGE_NAME, labels=(), rules=(), environment="default-NORWAY-1"):
+    return {
+        "id": vm_id,
+        "name": name,
+        "status": "ACTIVE",
+        "flavor": {"name": flavor},
+        "image": {"name": image},
+        "labels": list(labels),
+        "security_rules": [{"protocol": "tcp", "remote_ip_prefix": "0.0.0.0/0", **rule} for rule in rules],
+        "environment": {"name": environment},
+    }
+
+
+SPEC = VMSpec("web", "n3-A100x1", IMAGE_NAME, count=3, labels=["web"], sg_rules=[SSH])
+
+
+def describe(plan):
+    return [(action.kind, action.name, action.vm_id) for action in plan.actions]
+
+
+def test_plan_reconcile():
+    instances = [
+        vm(1, "web-1", labels=["web"], rules=[SSH]),
+        vm(2, "web-2", flavor="n3-A100x2", labels=["web"], rules=[SSH]),
+        vm(3, "web-4"),
+        vm(4, "web-1"),
+        vm(5, "db-1"),
+        vm(6, "web-3", environment="default-CANADA-1"),
+    ]
+
+    plan = plan_reconcile([SPEC], instances, environment="default-NORWAY-1")
+
+    assert describe(plan) == [
+        ("delete", "web-1", 4),
+        ("resize", "web-2", 2),
+        ("create", "web-3", None),
+        ("wait", "web-3", None),
+        ("label", "web-3", None),
+        ("sg-rules", "web-3", None),
+        ("delete", "web-4", 3),
+    ]
+    assert plan.unchanged == []
+    assert plan.counts() == {"delete": 2, "resize": 1, "create": 1, "wait": 1, "label": 1, "sg-rules": 1}
+    assert str(plan.actions[1]) == "resize web-2 (2): flavor='n3-A100x1'"
+
+
+def test_plan_updates_labels_and_rules():
+    instances = [vm(1, "web-1", labels=["old"]), vm(2, "web-2", labels=["web"], rules=[SSH]), vm(3, "web-3")]
+
+    plan = plan_reconcile([SPEC], instances, prune=False)
+
+    assert describe(plan) == [
+        ("label", "web-1", 1),
+        ("sg-rules", "web-1", 1),
+        ("label", "web-3", 3),
+        ("sg-rules", "web-3", 3),
+    ]
+    assert plan.unchanged == ["web-2"]
+
+
+def test_plan_keeps_vms_without_environment():
+    instances = [{**vm(1, "web-1", labels=["web"], rules=[SSH]), "environment": None}, vm(2, "web-2", environment="x")]
+
+    plan = plan_reconcile([SPEC], instances, environment="default-NORWAY-1")
+
+    # web-1 has no environment and is kept, web-2 of another environment is not counted
+    assert [name for kind, name, _ in describe(plan) if kind == "create"] == ["web-2", "web-3"]
+    assert plan.counts() == {"create": 2, "wait": 2, "label": 2, "sg-rules": 2}
+
+
+def test_plan_image_drift():
+    instances = [vm(1, "web-1", image="old")]
+    spec = VMSpec("web", "n3-A100x1", IMAGE_NAME)
+
+    plan = plan_reconcile([spec], instances)
+    assert not plan
+    assert plan.drift == [("web-1", "image", "old", IMAGE_NAME)]
+    assert str(plan) == "No changes"
+
+    plan = plan_reconcile([spec], instances, recreate=True)
+    assert describe(plan) == [("delete", "web-1", 1), ("create", "web-1", None), ("wait", "web-1", None)]
+    assert plan.actions[1].after == (("delete", "web-1", 1),)
+
+
+def test_plan_is_linear():
+    specs = [VMSpec(f"group{i}", "n3-A100x1", IMAGE_NAME, count=100) for i in range(100)]
+    instances = [vm(i * 100 + r, f"group{i}-{r + 1}") for i in range(100) for r in range(100)]
+
+    start = time.perf_counter()
+    plan = plan_reconcile(specs, instances)
+
+    assert time.perf_counter() - start < 1
+    assert not plan
+    assert len(plan.unchanged) == 10000
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0.05, transition_time=0.05) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = server.client()
+    client.environment = "default-NORWAY-1"
+    yield client
+    client.close()
+
+
+def test_reconcile_against_mock_server(client, server):
+    report = reconcile(client, [SPEC], poll_interval=0.02)
+
+    assert report["failed"] == [] and report["skipped"] == []
+    assert report["plan"].counts() == {"create": 3, "wait": 3, "label": 3, "sg-rules": 3}
+    vms = sorted(server.virtual_machines.values(), key=lambda vm: vm["name"])
+    assert [vm["name"] for vm in vms] == ["web-1", "web-2", "web-3"]
+    assert all(vm["labels"] == ["web"] and len(vm["security_rules"]) == 1 for vm in vms)
+
+    before = server.request_count()
+    report = reconcile(client, [SPEC])
+    assert not report["plan"]
+    assert server.request_count() - before == 1
+
+    report = reconcile(client, [VMSpec("web", "n3-A100x1", IMAGE_NAME, count=1, labels=["web"], sg_rules=[SSH])])
+    assert sorted(str(entry["action"]) for entry in report["applied"]) == [
+        f"delete web-2 ({vms[1]['id']})",
+        f"delete web-3 ({vms[2]['id']})",
+    ]
+
+
+def test_reconcile_many_vms_in_one_list_call(client, server):
+    server.add_virtual_machines(1000, name="placeholder")
+    for index, vm in enumerate(server.virtual_machines.values(), 1):
+        vm["name"] = f"web-{index}"
+        vm["labels"] = ["web"]
+    spec = VMSpec("web", "n3-A100x1", IMAGE_NAME, count=1000, labels=["web"])
+    first = next(iter(server.virtual_machines.values()))
+    first["flavor"] = {"name": "n3-A100x2"}
+    before = server.request_count()
+
+    report = reconcile(client, [spec])
+
+    assert [str(entry["action"]) for entry in report["applied"]] == [
+        f"resize web-1 ({first['id']}): flavor='n3-A100x1'"
+    ]
+    assert server.request_count() - before == 2
+
+
+def test_failed_boot_skips_dependent_actions(client, server):
+    server.boot_error_rate = 1
+
+    report = reconcile(
+        client, [VMSpec("gpu", "n3-A100x1", IMAGE_NAME, labels=["x"], sg_rules=[SSH])], poll_interval=0.02
+    )
+
+    assert [str(entry["action"]) for entry in report["failed"]] == ["wait gpu-1"]
+    vm_id = report["applied"][0]["result"]
+    assert str(report["failed"][0]["error"]) == f"VM {vm_id} entered ERROR state"
+    assert [str(entry["action"]) for entry in report["skipped"]] == [
+        "sg-rules gpu-1: rules=[{'port_range_min': 22, 'port_range_max': 22}]"
+    ]
+
+
+def test_failed_poll_does_not_fail_waiters(client, server):
+    list_virtual_machines = client.list_virtual_machines
+    calls = []
+
+    def flaky_list(*args, **kwargs):
+        calls.append(args)
+        # The first call plans the fleet, the second is the poller's first tick
+        if len(calls) == 2:
+            raise ConnectionError("connection reset")
+        return list_virtual_machines(*args, **kwargs)
+
+    with patch.object(client, "list_virtual_machines", side_effect=flaky_list):
+        report = reconcile(client, [SPEC], poll_interval=0.02)
+
+    assert len(calls) > 2
+    assert report["failed"] == [] and report["skipped"] == []
+    assert report["plan"].counts() == {"create": 3, "wait": 3, "label": 3, "sg-rules": 3}
+    assert all(len(vm["security_rules"]) == 1 for vm in server.virtual_machines.values())
+
+
+def test_create_retry_is_idempotent():
+    client = MagicMock(environment="default-NORWAY-1")
+    client.create_vm.side_effect = ConnectionError("connection reset")
+    client.list_virtual_machines.return_value = {"instances": [vm(7, "web-1")]}
+    plan = plan_reconcile([VMSpec("web", "n3-A100x1", IMAGE_NAME)], [])
+    plan.actions = plan.actions[:1]
+
+    report = apply_plan(client, plan, retry_delay=0)
+
+    assert report["applied"][0]["result"] == 7
+    assert client.create_vm.call_count == 1
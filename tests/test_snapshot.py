@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from hyperstack.snapshot import SnapshotStore
+from hyperstack.testing import IMAGE_NAME, MockAPIServer
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "snapshot.db")
+
+
+def test_warm_start_makes_no_requests(server, path):
+    server.add_virtual_machines(3, name="worker")
+    with server.client(snapshot=path) as client:
+        assert len(client.inventory.records("virtual_machines")) == 3
+        assert client.inventory.environment_by_name("default-NORWAY-1")["region"] == "NORWAY-1"
+
+    with server.client(snapshot=path) as client:
+        assert len(client.inventory.vms_in_environment("default-NORWAY-1")) == 3
+        assert client.inventory.environment_by_name("default-NORWAY-1") is not None
+        assert client.inventory.refreshes == 0
+
+    assert server.request_count("GET", "core/virtual-machines$") == 1
+    assert server.request_count("GET", "core/environments$") == 1
+
+
+def test_stale_snapshot_is_refreshed(server, path):
+    server.add_virtual_machines(2, name="worker")
+    with server.client(snapshot=path) as client:
+        client.inventory.records("virtual_machines")
+
+    with server.client(snapshot=path) as client:
+        client.inventory.max_age = 0
+        client.inventory.records("virtual_machines")
+        assert client.inventory.refreshes == 1
+
+    assert server.request_count("GET", "core/virtual-machines$") == 2
+
+
+def test_refresh_writes_only_changes(server, path):
+    first, second, third = server.add_virtual_machines(3, name="worker")
+    with server.client(snapshot=path) as client:
+        client.inventory.records("virtual_machines")
+        assert client.inventory.changes["virtual_machines"] == {
+            "added": 3,
+            "updated": 0,
+            "removed": 0,
+            "unchanged": 0,
+        }
+
+        server.set_vm_status(first["id"], "SHUTOFF")
+        del server.virtual_machines[third["id"]]
+        client.inventory.refresh("virtual_machines")
+        assert client.inventory.changes["virtual_machines"] == {
+            "added": 0,
+            "updated": 1,
+            "removed": 1,
+            "unchanged": 1,
+        }
+
+
+def test_client_changes_are_persisted(server, path):
+    with server.client(snapshot=path) as client:
+        client.environment = "default-NORWAY-1"
+        assert client.inventory.vm_by_name("trainer") is None
+        (instance,) = client.create_vm("trainer", IMAGE_NAME, "n3-A100x1")["instances"]
+
+    with server.client(snapshot=path) as client:
+        assert client.inventory.vm_by_name("trainer")["id"] == instance["id"]
+        client.inventory.invalidate("virtual_machines")
+
+    with server.client(snapshot=path) as client:
+        client.inventory.vm_by_name("trainer")
+        assert client.inventory.refreshes == 1
+
+
+def test_fresh_catalog_served_after_restart(server, path):
+    with server.client(snapshot=path) as client:
+        flavors = client.list_flavors()
+
+    with server.client(snapshot=path) as client:
+        assert client.list_flavors() == flavors
+        assert client.cache.restored == 1
+    assert server.request_count("GET", "core/flavors") == 1
+
+
+def test_expired_catalog_revalidated_after_restart(server, path):
+    with server.client(snapshot=path) as client:
+        client.cache.ttls["core/flavors"] = 0
+        flavors = client.list_flavors()
+
+    with server.client(snapshot=path) as client:
+        assert client.list_flavors() == flavors
+        assert client.cache.stats()["revalidations"] == 1
+    assert server.request_count("GET", "core/flavors") == 2
+
+
+def test_api_keys_are_kept_apart(path):
+    store = SnapshotStore(path)
+    store.set_api_key("first")
+    store.save_records("volumes", [{"id": 1, "name": "data"}], refreshed_at=time.time())
+    store.set_api_key("second")
+
+    assert store.load_records("volumes") == (None, None)
+    store.close()
@@ -0,0 +1,268 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from hyperstack import Hyperstack
+from hyperstack.transport import RetryPolicy, SingleFlight, TokenBucket, parse_retry_after
+
+
+def make_response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(f"{status_code} Error")
+    return response
+
+
+@pytest.mark.parametrize(
+    "method, status_code, expected",
+    [
+        ("GET", 502, True),
+        ("DELETE", 503, True),
+        ("POST", 502, False),
+        ("POST", 429, True),
+        ("GET", 404, False),
+    ],
+)
+def test_retry_policy_should_retry(method, status_code, expected):
+    assert RetryPolicy().should_retry(method, 0, make_response(status_code)) is expected
+
+
+def test_retry_policy_connection_errors_only_for_idempotent_methods():
+    policy = RetryPolicy()
+    assert policy.should_retry("GET", 0) is True
+    assert policy.should_retry("POST", 0) is False
+
+
+def test_retry_policy_max_retries():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.should_retry("GET", 1, make_response(503)) is True
+    assert policy.should_retry("GET", 2, make_response(503)) is False
+
+
+def test_retry_policy_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+    assert [policy.backoff(attempt) for attempt in range(4)] == [1, 2, 4, 5]
+
+    jittered = RetryPolicy(backoff_factor=1, max_backoff=5)
+    assert all(0 <= jittered.backoff(3) <= 5 for _ in range(20))
+
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(jitter=False)
+    assert policy.backoff(0, make_response(429, {"Retry-After": "7"})) == 7
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after("invalid") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    future = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 55 < parse_retry_after(future) <= 60
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(6)]
+    elapsed = time.monotonic() - start
+
+    assert waits[0] == 0
+    assert elapsed >= 0.045
+
+
+def test_token_bucket_shared_across_threads():
+    bucket = TokenBucket(rate=200, capacity=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 20 tokens at 200/s with a burst of 1 cannot be handed out in less than 95ms
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_reserve_does_not_sleep():
+    bucket = TokenBucket(rate=10, capacity=1)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(0.05)
+    assert bucket.acquire() == pytest.approx(0.05, abs=0.01)
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError, match="'rate' must be positive"):
+        TokenBucket(0)
+
+
+@patch('hyperstack.client.time.sleep')
+@patch('requests.Session.request')
+def test_request_retries_and_counts(mock_request, mock_sleep):
+    mock_request.side_effect = [
+        make_response(502),
+        make_response(429, {"Retry-After": "2"}),
+        requests.ConnectionError("reset"),
+        make_response(200),
+    ]
+    hs = Hyperstack(api_key="test_api_key")
+
+    response = hs._request("GET", "core/virtual-machines")
+
+    assert response.status_code == 200
+    assert mock_request.call_count == 4
+    assert mock_sleep.call_args_list[1].args == (2.0,)
+    stats = hs.transport_stats()
+    assert (stats["retries"], stats["throttled"]) == (3, 1)
+
+
+@patch('hyperstack.client.time.sleep')
+@patch('requests.Session.request')
+def test_request_does_not_retry_post_on_server_error(mock_request, mock_sleep):
+    mock_request.return_value = make_response(502)
+    hs = Hyperstack(api_key="test_api_key")
+
+    with pytest.raises(requests.HTTPError, match="502 Error"):
+        hs._request("POST", "core/virtual-machines")
+
+    mock_request.assert_called_once()
+    mock_sleep.assert_not_called()
+
+
+@patch('hyperstack.client.time.sleep')
+@patch('requests.Session.request')
+def test_request_gives_up_after_max_retries(mock_request, mock_sleep):
+    mock_request.return_value = make_response(503)
+    hs = Hyperstack(api_key="test_api_key", retry=RetryPolicy(max_retries=2))
+
+    with pytest.raises(requests.HTTPError, match="503 Error"):
+        hs._request("GET", "core/virtual-machines")
+
+    assert mock_request.call_count == 3
+
+
+@patch('requests.Session.request')
+def test_request_retry_disabled(mock_request):
+    mock_request.return_value = make_response(503)
+    hs = Hyperstack(api_key="test_api_key", retry=False)
+
+    with pytest.raises(requests.HTTPError):
+        hs._request("GET", "core/virtual-machines")
+
+    mock_request.assert_called_once()
+
+
+@patch('requests.Session.request')
+def test_request_rate_limit(mock_request):
+    mock_request.return_value = make_response(200)
+    hs = Hyperstack(api_key="test_api_key", rate_limit=TokenBucket(rate=100, capacity=1))
+
+    for _ in range(3):
+        hs._request("GET", "core/virtual-machines")
+
+    stats = hs.transport_stats()
+    assert stats["rate_limited"] == 2
+    assert stats["rate_limit_wait"] > 0
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        assert release.wait(timeout=5)
+        return {"instances": []}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do("key", fetch)))
+    leader.start()
+    assert started.wait(timeout=5)
+    followers = [threading.Thread(target=lambda: results.append(single_flight.do("key", fetch))) for _ in range(20)]
+    for thread in followers:
+        thread.start()
+    while single_flight.coalesced < 20:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 21
+    assert all(result is results[0] for result in results)
+
+
+def test_single_flight_shares_errors_and_forgets_finished_calls():
+    single_flight = SingleFlight()
+
+    with pytest.raises(ValueError, match="boom"):
+        single_flight.do("key", MagicMock(side_effect=ValueError("boom")))
+
+    assert single_flight.do("key", lambda: "fresh") == "fresh"
+    assert single_flight.coalesced == 0
+
+
+def test_single_flight_under_contention():
+    single_flight = SingleFlight()
+    lock = threading.Lock()
+    counts = {"calls": 0}
+
+    def fetch():
+        with lock:
+            counts["calls"] += 1
+        time.sleep(0.001)
+        return "value"
+
+    def worker():
+        for _ in range(50):
+            assert single_flight.do("key", fetch) == "value"
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counts["calls"] + single_flight.coalesced == 16 * 50
+    assert single_flight._calls == {}
+
+
+@patch('hyperstack.client.Hyperstack._request')
+def test_client_coalesces_identical_gets(mock_request):
+    release = threading.Event()
+
+    def slow_request(method, endpoint, **kwargs):
+        assert release.wait(timeout=5)
+        response = MagicMock()
+        response.content = b'{"instances": []}'
+        return response
+
+    mock_request.side_effect = slow_request
+    hs = Hyperstack(api_key="test_api_key")
+    threads = [threading.Thread(target=hs.get, args=("core/virtual-machines",)) for _ in range(5)]
+    threads.append(threading.Thread(target=hs.get, args=("core/virtual-machines/1",)))
+    for thread in threads:
+        thread.start()
+    while hs.transport_stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert mock_request.call_count == 2
+    assert hs.transport_stats()["coalesced"] == 4
@@ -1,3 +1,5 @@
+import asyncio
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -12,10 +14,13 @@ from hyperstack.api.virtual_machines import (
     resize_virtual_machine,
     restore_hibernated_virtual_machine,
     retrieve_vm_details,
+    settled_vms,
     start_virtual_machine,
     stop_virtual_machine,
     update_virtual_machine_labels,
+    wait_for_vms,
 )
+from hyperstack.testing import MockAPIServer
 
 
 @pytest.fixture
@@ -77,7 +82,7 @@ def test_create_vm_with_optional_params(mock_hyperstack):
 
 def test_list_virtual_machines(mock_hyperstack):
     result = list_virtual_machines(mock_hyperstack)
-    mock_hyperstack.get.assert_called_once_with("core/virtual-machines")
+    mock_hyperstack.get.assert_called_once_with("core/virtual-machines", params={"environment": "test-env"})
     assert result == {"status": "success", "data": {}}
 
 
@@ -167,3 +172,215 @@ def test_api_error_handling(mock_hyperstack, function, args):
 
     with pytest.raises(Exception, match="API Error"):
         function(mock_hyperstack, **args)
+
+
+def vm_list(*statuses):
+    return {"status": True, "instances": [{"id": vm_id, "status": status} for vm_id, status in statuses]}
+
+
+@patch('hyperstack.api.virtual_machines.time.sleep')
+def test_wait_for_vms_yields_as_each_vm_is_ready(mock_sleep, mock_hyperstack):
+    mock_hyperstack.list_virtual_machines.side_effect = [
+        vm_list((1, "BUILD"), (2, "ACTIVE"), (3, "BUILD"), (99, "BUILD")),
+        vm_list((1, "ACTIVE"), (2, "ACTIVE"), (3, "BUILD")),
+        vm_list((1, "ACTIVE"), (2, "ACTIVE"), (3, "ACTIVE")),
+    ]
+
+    ready = [vm_id for vm_id, _ in wait_for_vms(mock_hyperstack, [1, 2, 3], poll_interval=5)]
+
+    assert ready == [2, 1, 3]
+    assert mock_hyperstack.list_virtual_machines.call_count == 3
+    assert mock_sleep.call_count == 2
+
+
+@patch('hyperstack.api.virtual_machines.time.sleep')
+def test_wait_for_vms_raises_on_error(mock_sleep, mock_hyperstack):
+    mock_hyperstack.list_virtual_machines.return_value = vm_list((1, "BUILD"), (2, "ERROR"))
+
+    with pytest.raises(Exception, match="VM 2 entered ERROR state"):
+        list(wait_for_vms(mock_hyperstack, [1, 2]))
+    mock_sleep.assert_not_called()
+
+
+@patch('hyperstack.api.virtual_machines.time.sleep')
+def test_wait_for_vms_yields_error_when_not_raising(mock_sleep, mock_hyperstack):
+    mock_hyperstack.list_virtual_machines.return_value = vm_list(("1", "ACTIVE"), ("2", "ERROR"))
+
+    result = dict(wait_for_vms(mock_hyperstack, ["1", "2"], raise_on_error=False))
+
+    assert result["1"]["status"] == "ACTIVE"
+    assert result["2"]["status"] == "ERROR"
+
+
+@patch('hyperstack.api.virtual_machines.time.monotonic')
+@patch('hyperstack.api.virtual_machines.time.sleep')
+def test_wait_for_vms_timeout(mock_sleep, mock_monotonic, mock_hyperstack):
+    mock_monotonic.side_effect = [0, 5, 11]
+    mock_hyperstack.list_virtual_machines.return_value = vm_list((1, "ACTIVE"), (2, "BUILD"))
+
+    waiter = wait_for_vms(mock_hyperstack, [1, 2], timeout=10, poll_interval=5)
+    assert next(waiter)[0] == 1
+    with pytest.raises(TimeoutError, match="VMs 2 did not reach ACTIVE"):
+        next(waiter)
+    mock_sleep.assert_called_once_with(5)
+
+
+@patch('hyperstack.api.virtual_machines.time.sleep')
+def test_wait_for_vms_deleted(mock_sleep, mock_hyperstack):
+    mock_hyperstack.list_virtual_machines.side_effect = [
+        vm_list((1, "DELETING"), (2, "DELETING")),
+        vm_list((2, "DELETING")),
+        vm_list(),
+    ]
+
+    assert list(wait_for_vms(mock_hyperstack, [1, 2], target_status="DELETED")) == [(1, None), (2, None)]
+
+
+@pytest.fixture
+def server():
+    with MockAPIServer(boot_time=0, transition_time=0.05) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = server.client()
+    client.environment = "default-NORWAY-1"
+    yield client
+    client.close()
+
+
+def test_bulk_vm_action_by_label(client, server):
+    nightly = [vm["id"] for vm in server.add_virtual_machines(5, labels=["nightly"])]
+    other = server.add_virtual_machines(2)
+
+    report = client.bulk_vm_action("hibernate", labels=["nightly"], wait=True, poll_interval=0.02)
+
+    assert [entry["vm_id"] for entry in report["succeeded"]] == nightly
+    assert report["failed"] == []
+    assert all(entry["instance"]["status"] == "HIBERNATED" for entry in report["succeeded"])
+    assert {vm["status"] for vm in other} == {"ACTIVE"}
+    assert server.request_count("GET", "core/virtual-machines/\\d+/hibernate$") == 5
+
+    report = client.bulk_vm_action("restore", vm_ids=nightly, wait=True, poll_interval=0.02)
+    assert [entry["instance"]["status"] for entry in report["succeeded"]] == ["ACTIVE"] * 5
+
+
+def test_bulk_vm_action_results_per_vm(client, server):
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(3)]
+
+    report = client.bulk_vm_action("delete", vm_ids=vm_ids + [999], wait=True, poll_interval=0.02)
+
+    assert [entry["vm_id"] for entry in report["succeeded"]] == vm_ids
+    assert all(entry["instance"] is None for entry in report["succeeded"])
+    assert [entry["vm_id"] for entry in report["failed"]] == [999]
+    assert server.virtual_machines == {}
+
+
+def test_bulk_vm_action_resize_and_timeout(client, server):
+    server.transition_time = 10
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(2)]
+
+    report = client.bulk_vm_action(
+        "resize", vm_ids=vm_ids, flavor="n3-A100x2", wait=True, timeout=0.1, poll_interval=0.02
+    )
+
+    assert report["succeeded"] == []
+    assert [type(entry["error"]) for entry in report["failed"]] == [TimeoutError, TimeoutError]
+    assert all(entry["response"]["status"] for entry in report["failed"])
+
+
+def test_bulk_vm_action_rate_limit(client, server):
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(4)]
+
+    start = time.monotonic()
+    report = client.bulk_vm_action("stop", vm_ids=vm_ids, rate_limit=20)
+
+    # The actions are spaced 1/20 s apart
+    assert time.monotonic() - start >= 0.14
+    assert len(report["succeeded"]) == 4
+    assert "instance" not in report["succeeded"][0]
+
+
+def test_bulk_vm_action_invalid(client):
+    with pytest.raises(ValueError, match="Invalid action specified"):
+        client.bulk_vm_action("pause", vm_ids=[1])
+    with pytest.raises(ValueError, match="Pass either 'vm_ids' or 'labels'"):
+        client.bulk_vm_action("start")
+
+
+def test_async_bulk_vm_action(server):
+    pytest.importorskip("aiohttp")
+    from hyperstack import AsyncHyperstack
+
+    vm_ids = [vm["id"] for vm in server.add_virtual_machines(4, labels=["batch"])]
+
+    async def main():
+        async with AsyncHyperstack(api_key="test_api_key") as client:
+            client.base_url = server.base_url
+            client.environment = "default-NORWAY-1"
+            return await client.bulk_vm_action(
+                "stop", labels=["batch"], max_workers=2, rate_limit=100, wait=True, poll_interval=0.02
+            )
+
+    report = asyncio.run(main())
+
+    assert [entry["vm_id"] for entry in report["succeeded"]] == vm_ids
+    assert {entry["instance"]["status"] for entry in report["succeeded"]} == {"SHUTOFF"}
+
+
+def test_list_virtual_machines_across_environments(server):
+    server.add_virtual_machines(3)
+    server.add_virtual_machines(2, environment="default-CANADA-1")
+    client = server.client()
+
+    response = client.list_virtual_machines(environments="*")
+
+    assert response["environments"] == ["default-NORWAY-1", "default-CANADA-1"]
+    assert [vm["environment"]["name"] for vm in response["instances"]] == ["default-NORWAY-1"] * 3 + [
+        "default-CANADA-1"
+    ] * 2
+    assert response["failed"] == []
+    # Other calls still need an environment: the fan-out doesn't set one
+    assert client.environment is None
+
+    server.inject_error(status=400, path="core/virtual-machines$")
+    response = client.list_virtual_machines(environments=["default-NORWAY-1", "default-CANADA-1"], typed=True)
+    (failed,) = response["failed"]
+    assert len(response["environments"]) == 1
+    assert [vm.environment.name for vm in response["instances"]] == [response["environments"][0]] * len(
+        response["instances"]
+    )
+    assert "400" in str(failed["error"])
+
+
+def test_async_list_virtual_machines_across_environments(server):
+    pytest.importorskip("aiohttp")
+    from hyperstack import AsyncHyperstack
+
+    server.add_virtual_machines(2)
+    server.add_virtual_machines(1, environment="default-CANADA-1")
+
+    async def main():
+        async with AsyncHyperstack(api_key="test_api_key") as client:
+            client.base_url = server.base_url
+            return await client.list_virtual_machines(environments=["default-CANADA-1", "missing"])
+
+    response = asyncio.run(main())
+
+    assert [vm["environment"]["name"] for vm in response["instances"]] == ["default-CANADA-1"]
+    assert response["environments"] == ["default-CANADA-1", "missing"]
+
+
+def test_settled_vms_pops_finished_vms():
+    response = {
+        "instances": [{"id": 1, "status": "ACTIVE"}, {"id": 2, "status": "BUILD"}, {"id": 3, "status": "ERROR"}]
+    }
+    pending = {"1": 1, "2": 2, "3": 3}
+
+    settled = list(settled_vms(response, pending, "ACTIVE", raise_on_error=False))
+
+    assert [vm_id for vm_id, _ in settled] == [1, 3]
+    assert pending == {"2": 2}
+    assert list(settled_vms({"instances": []}, pending, "DELETED", raise_on_error=True)) == [(2, None)]
+    assert pending == {}
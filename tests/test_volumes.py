@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from hyperstack.api.volumes import create_volume, delete_volume, get_volume, list_volume_types, list_volumes
+from hyperstack.testing import MockAPIServer
 
 
 @pytest.fixture
@@ -49,7 +50,7 @@ def test_create_volume_with_optional_params(mock_hyperstack):
 
 def test_list_volumes(mock_hyperstack):
     result = list_volumes(mock_hyperstack)
-    mock_hyperstack.get.assert_called_once_with("core/volumes")
+    mock_hyperstack.get.assert_called_once_with("core/volumes", params={"environment": "test-env"})
     assert result == {"status": "success", "data": {}}
 
 
@@ -76,3 +77,16 @@ def test_environment_not_set(mock_hyperstack):
     mock_hyperstack._check_environment_set.side_effect = EnvironmentError("Environment is not set")
     with pytest.raises(EnvironmentError, match="Environment is not set"):
         create_volume(mock_hyperstack, name="test-volume", volume_type="ssd")
+
+
+def test_list_volumes_across_environments():
+    with MockAPIServer() as server, server.client() as client:
+        for environment in ("default-NORWAY-1", "default-CANADA-1"):
+            client.environment = environment
+            client.create_volume(f"data-{environment}", "Cloud-SSD")
+        client.environment = None
+
+        response = client.list_volumes(environments=["default-CANADA-1", "default-NORWAY-1"])
+
+    assert [volume["name"] for volume in response["volumes"]] == ["data-default-CANADA-1", "data-default-NORWAY-1"]
+    assert response["failed"] == []